@@ -0,0 +1,98 @@
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QApplication
+from src.ui import main_window
+from src.ui.main_window import MainWindow
+
+LINE_COUNT = 1000000
+# Give up on a search after this many seconds
+SEARCH_TIMEOUT = 120
+
+
+def write_source(path, line_count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(line_count):
+            f.write(f'    result_{i} = compute("item {i}", {i % 997})  # step {i}\n')
+
+
+def wait_for_results(app, window, editor):
+    # Seconds until the match count is final, and the longest gap between
+    # event loop iterations meanwhile
+    started = last = time.perf_counter()
+    longest = 0
+    while ((editor.search is None or editor.search.searching or window.search_timer.isActive())
+           and last - started < SEARCH_TIMEOUT):
+        app.processEvents()
+        now = time.perf_counter()
+        longest = max(longest, now - last)
+        last = now
+    return last - started, longest
+
+
+def report(name, app, window, editor):
+    elapsed, longest = wait_for_results(app, window, editor)
+    print(f"{name:<28} {window.find_dialog.match_count.text():>18} "
+          f"in {elapsed * 1000:6.0f} ms, longest stall {longest * 1000:4.0f} ms")
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else LINE_COUNT
+    app = QApplication(sys.argv)
+    # Measure searching, not streaming the file in
+    main_window.STREAM_LOAD_BYTES = 1 << 62
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the session and settings of the real editor out of it
+        os.environ['APPDATA'] = os.environ['XDG_DATA_HOME'] = tmp
+        os.environ['XDG_CONFIG_HOME'] = tmp
+        path = os.path.join(tmp, 'module.py')
+        write_source(path, line_count)
+        window = MainWindow()
+        window.resize(1200, 800)
+        window.show()
+        window.open_file_by_path(path)
+        editor = window.editor_tabs.currentWidget()
+        print(f"Searching a {line_count:,}-line file")
+
+        started = time.perf_counter()
+        window.search_for(editor).take_snapshot()
+        print(f"{'text snapshot':<28} {'':>18} in {(time.perf_counter() - started) * 1000:6.0f} ms")
+
+        window.show_find_dialog()
+        dialog = window.find_dialog
+        for char in 'comp':
+            dialog.find_text.insert(char)
+            app.processEvents()
+        report("type 'comp'", app, window, editor)
+        dialog.find_text.insert('ute')
+        report("extend to 'compute'", app, window, editor)
+        dialog.find_text.setText('result_12345')
+        report("'result_12345'", app, window, editor)
+        dialog.whole_word.setChecked(True)
+        report("  whole word", app, window, editor)
+        dialog.whole_word.setChecked(False)
+        dialog.regex.setChecked(True)
+        dialog.find_text.setText(r'step 9+$')
+        report("regex 'step 9+$'", app, window, editor)
+
+        dialog.regex.setChecked(False)
+        dialog.find_text.setText('compute')
+        wait_for_results(app, window, editor)
+        cursor = QTextCursor(editor.document())
+        started = time.perf_counter()
+        for i in range(100):
+            cursor.setPosition(i * 1000)
+            cursor.insertText('compute ')
+        elapsed = (time.perf_counter() - started) / 100
+        print(f"{'edit with 1M matches':<28} {dialog.match_count.text():>18} "
+              f"in {elapsed * 1000:6.2f} ms per edit")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ui.excludes import DEFAULT_EXCLUDES, compile_excludes, walk_files
+from src.ui.find_in_files import find_in_files, get_process_pool, pool_size, search_files
+from src.ui.search import compile_query
+from src.ui.workers import Worker
+
+FILE_COUNT = 100000
+FILES_PER_DIRECTORY = 500
+LINES_PER_FILE = 40
+
+
+def write_tree(root, file_count):
+    for i in range(file_count):
+        directory = os.path.join(root, f'package_{i // FILES_PER_DIRECTORY}')
+        if not i % FILES_PER_DIRECTORY:
+            os.makedirs(directory)
+        with open(os.path.join(directory, f'module_{i}.py'), 'w', encoding='utf-8') as f:
+            for j in range(LINES_PER_FILE):
+                f.write(f'    value_{j} = compute("item {i}", {j})  # step {i * j}\n')
+            if not i % 100:
+                f.write('    needle = find_me()\n')
+    # Things the search leaves out
+    os.makedirs(os.path.join(root, '.git'))
+    with open(os.path.join(root, '.git', 'packed'), 'w') as f:
+        f.write('needle = find_me()\n' * 1000)
+    with open(os.path.join(root, 'data.bin'), 'wb') as f:
+        f.write(b'\0needle = find_me()\n' * 1000)
+
+
+def count_matches(found):
+    return sum(len(matches) for _, matches in found)
+
+
+def serial(root, pattern):
+    names, paths = compile_excludes(DEFAULT_EXCLUDES)
+    files = [path for path, _ in walk_files(root, names, paths)]
+    return search_files(files, pattern)
+
+
+def parallel(root, pattern):
+    job = Worker(find_in_files)
+    batches = []
+    job.report = batches.append
+    searched, _ = find_in_files(job, root, pattern)
+    return searched, [result for _, found in batches for result in found]
+
+
+def run(name, fn, *args):
+    started = time.perf_counter()
+    searched, found = fn(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<34} {count_matches(found):>8,} matches, {searched:>8,} files "
+          f"in {elapsed * 1000:7.0f} ms")
+
+
+def run_tool(name, command):
+    started = time.perf_counter()
+    output = subprocess.run(command, capture_output=True, text=True).stdout
+    elapsed = time.perf_counter() - started
+    print(f"{name:<34} {output.count(chr(10)):>8,} matches, {'':>8}       "
+          f"in {elapsed * 1000:7.0f} ms")
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else FILE_COUNT
+    with tempfile.TemporaryDirectory() as root:
+        write_tree(root, file_count)
+        print(f"Searching {file_count:,} files with {pool_size()} pool processes")
+        # Start the pool up front so that its start-up cost is not counted
+        get_process_pool().submit(pool_size).result()
+        if not shutil.which('rg'):
+            print("ripgrep is not installed, skipping the comparison")
+
+        for query in ('find_me', 'compute'):
+            pattern = compile_query(query, True, False, False)
+            run(f"'{query}' in one process", serial, root, pattern)
+            run(f"'{query}' in the pool", parallel, root, pattern)
+            if shutil.which('rg'):
+                run_tool(f"'{query}' with ripgrep", ['rg', '-n', '--no-heading', query, root])
+
+
+if __name__ == '__main__':
+    main()
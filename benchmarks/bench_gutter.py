@@ -0,0 +1,87 @@
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QApplication
+from src.ui.main_window import CodeEditor
+
+LINE_COUNT = 1000000
+SCROLL_STEPS = 200
+# Naive gutter paints timed; each walks the whole document
+NAIVE_PAINTS = 3
+# One frame at 60 Hz, in ms
+FRAME_MS = 1000 / 60
+
+
+def naive_paint(editor, image):
+    # A gutter that walks every block on each paint and skips the ones
+    # outside the viewport
+    painter = QPainter(image)
+    height = image.height()
+    offset = editor.contentOffset()
+    block = editor.document().firstBlock()
+    while block.isValid():
+        top = editor.blockBoundingGeometry(block).translated(offset).top()
+        if 0 <= top <= height:
+            painter.drawText(0, int(top), image.width(), 16, Qt.AlignRight,
+                             str(block.blockNumber() + 1))
+        block = block.next()
+    painter.end()
+
+
+def main():
+    app = QApplication(sys.argv)
+    editor = CodeEditor()
+    editor.resize(1000, 800)
+    editor.set_lazy_highlighting(True)
+    editor.setText('\n'.join(f'    value_{i} = compute({i})  # step' for i in range(LINE_COUNT)))
+    editor.show()
+    app.processEvents()
+    editor.highlighter.idle_timer.stop()
+    gutter = editor.gutter
+    scroll_bar = editor.verticalScrollBar()
+
+    random.seed(1)
+    frames = []
+    paints = []
+    for step in range(SCROLL_STEPS):
+        # Small steps like wheel scrolling, with a jump every tenth step
+        if step % 10:
+            value = scroll_bar.value() + 3
+        else:
+            value = random.randint(0, scroll_bar.maximum())
+        started = time.perf_counter()
+        scroll_bar.setValue(value)
+        editor.viewport().repaint()
+        gutter.repaint()
+        frames.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        gutter.repaint()
+        paints.append(time.perf_counter() - started)
+
+    image = QImage(gutter.width(), editor.viewport().height(), QImage.Format_RGB32)
+    naive = []
+    for _ in range(NAIVE_PAINTS):
+        started = time.perf_counter()
+        naive_paint(editor, image)
+        naive.append(time.perf_counter() - started)
+
+    frames.sort()
+    paints.sort()
+    print(f"{LINE_COUNT:,} lines, {SCROLL_STEPS} scroll steps")
+    print(f"Scroll frame (editor and gutter): median {frames[len(frames) // 2] * 1000:.2f} ms, "
+          f"slowest {frames[-1] * 1000:.2f} ms ({FRAME_MS:.1f} ms budget)")
+    print(f"Gutter paint: median {paints[len(paints) // 2] * 1000:.2f} ms, "
+          f"slowest {paints[-1] * 1000:.2f} ms")
+    print(f"Gutter walking every block: {min(naive) * 1000:.0f} ms")
+    editor.release()
+
+
+if __name__ == '__main__':
+    main()
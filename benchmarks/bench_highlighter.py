@@ -0,0 +1,81 @@
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ui.syntax import KEYWORDS, LANGUAGES, KEYWORD, STRING, COMMENT, NUMBER, get_tokenizer
+
+LINE_COUNT = 100000
+
+SAMPLE = [
+    'def fibonacci(n):',
+    '    """Calculate the nth Fibonacci number"""',
+    '    if n <= 0 and not cache:  # base case',
+    '        return fibonacci(n-1) + fibonacci(n-2)',
+    "    const label = 'h1' + \"div\" // render 42 items",
+    '    for (var i = 0; i < 10; i++) { /* loop */ total += i; }',
+    '    <div class="header"><h1>Title 2024</h1></div>',
+    '    value = obj instanceof Base ? 1 : 0',
+    '',
+]
+
+
+def legacy_rules():
+    # The rule list and loop CodeHighlighter used before the tokenizer
+    rules = []
+    for lang_keywords in KEYWORDS.values():
+        for word in lang_keywords:
+            rules.append((f"\\b{word}\\b", KEYWORD))
+    rules.extend([
+        ('".*"', STRING),
+        ("'.*'", STRING),
+        ("#.*", COMMENT),
+        ("//.*", COMMENT),
+        ("/\\*.*\\*/", COMMENT),
+        ("\\b\\d+\\b", NUMBER),
+    ])
+    return rules
+
+
+def legacy_highlight(rules, text):
+    spans = []
+    for pattern, kind in rules:
+        for match in re.finditer(pattern, text):
+            spans.append((match.start(), match.end() - match.start(), kind))
+    return spans
+
+
+def run(name, highlight, lines):
+    start = time.perf_counter()
+    state = 0
+    for line in lines:
+        state = highlight(line, state)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {elapsed:8.3f} s  {len(lines) / elapsed:12,.0f} lines/s")
+    return elapsed
+
+
+def tokenize_with(tokenizer):
+    def highlight(line, state):
+        return tokenizer.tokenize(line, state)[1]
+    return highlight
+
+
+def main():
+    lines = [SAMPLE[i % len(SAMPLE)] for i in range(LINE_COUNT)]
+    rules = legacy_rules()
+
+    print(f"Highlighting {LINE_COUNT:,} lines ({len(rules)} legacy rules)")
+    legacy_time = run("legacy", lambda text, state: legacy_highlight(rules, text), lines)
+    tokenizer_time = run("tokenizer", tokenize_with(get_tokenizer()), lines)
+    print(f"speedup      {legacy_time / tokenizer_time:8.1f}x")
+
+    print("Per-language rule sets on the same input")
+    for language in LANGUAGES:
+        run(language, tokenize_with(get_tokenizer(language)), lines)
+
+
+if __name__ == '__main__':
+    main()
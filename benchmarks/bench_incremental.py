@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QTextDocument, QTextCursor
+from PyQt5.QtWidgets import QApplication, QPlainTextDocumentLayout
+from src.ui.main_window import CodeHighlighter
+
+LINE_COUNT = 50000
+
+SAMPLE = [
+    'def fibonacci(n):',
+    '    """Calculate the nth',
+    '    Fibonacci number"""',
+    '    if n <= 0:  # base case',
+    '        return 0',
+    '    return fibonacci(n-1) + fibonacci(n-2)',
+    '',
+]
+
+
+class CountingHighlighter(CodeHighlighter):
+    def __init__(self, parent=None, language='python'):
+        self.calls = 0
+        super().__init__(parent, language)
+
+    def highlightBlock(self, text):
+        self.calls += 1
+        super().highlightBlock(text)
+
+
+def edit(document, highlighter, line, text):
+    # Insert text at the start of a line and count the blocks re-highlighted
+    highlighter.calls = 0
+    cursor = QTextCursor(document.findBlockByNumber(line))
+    start = time.perf_counter()
+    cursor.insertText(text)
+    elapsed = time.perf_counter() - start
+    return highlighter.calls, elapsed
+
+
+def main():
+    app = QApplication(sys.argv)
+    document = QTextDocument()
+    # Without a layout the document never reports changes to the highlighter
+    document.setDocumentLayout(QPlainTextDocumentLayout(document))
+    document.setPlainText("\n".join(SAMPLE[i % len(SAMPLE)] for i in range(LINE_COUNT)))
+
+    highlighter = CountingHighlighter(None, 'python')
+    start = time.perf_counter()
+    highlighter.setDocument(document)
+    highlighter.rehighlight()
+    print(f"Full highlight of {document.blockCount():,} blocks: "
+          f"{highlighter.calls:,} calls, {time.perf_counter() - start:.3f} s")
+
+    middle = LINE_COUNT // 2
+    cases = [
+        ("type a character", middle + 3, "x"),
+        ("type 100 characters", middle + 3, "y" * 100),
+        ("type inside a docstring", middle + 6, "z"),
+        ("open a comment", middle + 3, "# "),
+        # These flip the state of every later docstring, so every later
+        # block really does change
+        ("unbalance the docstrings", middle + 4, '"""'),
+        ("balance them again", middle + 4, '"""'),
+    ]
+    for name, line, text in cases:
+        calls, elapsed = edit(document, highlighter, line, text)
+        print(f"{name:<28} {calls:>7,} blocks  {elapsed * 1000:8.2f} ms")
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import os
+import resource
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+from src.ui.main_window import MainWindow
+
+SIZE_MB = 300
+# Give up on indexing after this many seconds
+INDEX_TIMEOUT = 600
+# Repaints timed at each position
+REPAINTS = 20
+
+
+def write_log(path, size):
+    line = ('2024-01-01 12:00:00 INFO worker-3 request {:010d} handled in 12 ms '
+            '"GET /api/items/42"\n')
+    with open(path, 'w', encoding='utf-8') as f:
+        i = 0
+        while f.tell() < size:
+            f.write(''.join(line.format(i + j) for j in range(10000)))
+            i += 10000
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def time_jump(viewer, line):
+    # Go to a line and repaint the viewport, as one keypress would
+    started = time.perf_counter()
+    for _ in range(REPAINTS):
+        viewer.go_to_line(line)
+        viewer.viewport().repaint()
+    return (time.perf_counter() - started) / REPAINTS * 1000
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else SIZE_MB
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the session and settings of the real editor out of it
+        os.environ['APPDATA'] = os.environ['XDG_DATA_HOME'] = tmp
+        os.environ['XDG_CONFIG_HOME'] = tmp
+        path = os.path.join(tmp, 'server.log')
+        write_log(path, size_mb * 1024 * 1024)
+
+        window = MainWindow()
+        window.resize(1200, 800)
+        window.show()
+        app.processEvents()
+        baseline = peak_rss_mb()
+        print(f"Viewing a {os.path.getsize(path) / 1048576:.0f} MB file "
+              f"(baseline peak RSS {baseline:.0f} MB)")
+
+        started = time.perf_counter()
+        window.open_file_by_path(path)
+        viewer = window.editor_tabs.currentWidget()
+        viewer.viewport().repaint()
+        print(f"open and first paint {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        # Longest gap between event loop iterations while the index builds
+        longest = 0
+        last = time.perf_counter()
+        while not viewer.index.complete and last - started < INDEX_TIMEOUT:
+            app.processEvents()
+            now = time.perf_counter()
+            longest = max(longest, now - last)
+            last = now
+        app.processEvents()
+        print(f"indexed {viewer.line_count():,} lines in {time.perf_counter() - started:.1f} s, "
+              f"longest event loop stall {longest * 1000:.0f} ms")
+
+        line_count = viewer.line_count()
+        for line in (1, line_count // 2, line_count):
+            print(f"go to line {line:>12,} and repaint {time_jump(viewer, line):6.2f} ms")
+        print(f"peak RSS {peak_rss_mb():.0f} MB "
+              f"({peak_rss_mb() - baseline:.0f} MB over baseline)")
+        window.close_tab(window.editor_tabs.indexOf(viewer))
+
+
+if __name__ == '__main__':
+    main()
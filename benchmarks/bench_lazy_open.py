@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+from src.ui import main_window
+from src.ui.main_window import MainWindow
+
+LINE_COUNT = 200000
+# Give up on a paint after this many seconds
+PAINT_TIMEOUT = 60
+# How long to watch the idle pass after the first paint
+IDLE_WATCH = 5
+
+
+def write_log(path, line_count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(line_count):
+            f.write(f'2024-01-01 12:00:{i % 60:02d} INFO worker-{i % 8} '
+                    f'request {i} handled in {i % 997} ms "GET /api/items/{i}"\n')
+
+
+def open_and_wait(app, window, path):
+    # Open the file and spin the event loop until the editor has painted
+    window.open_file_by_path(path)
+    editor = window.editor_tabs.currentWidget()
+    deadline = time.perf_counter() + PAINT_TIMEOUT
+    while editor.first_paint_ms is None and time.perf_counter() < deadline:
+        app.processEvents()
+    return editor
+
+
+def watch_idle_pass(app, editor):
+    # Longest gap between event loop iterations while the idle pass runs
+    longest = 0
+    last = start = time.perf_counter()
+    while editor.highlighter.idle_timer.isActive() and last - start < IDLE_WATCH:
+        app.processEvents()
+        now = time.perf_counter()
+        longest = max(longest, now - last)
+        last = now
+    return editor.highlighter.highlighted_upto + 1, longest
+
+
+def report(name, editor):
+    if editor.first_paint_ms is None:
+        print(f"{name:<6} first paint  > {PAINT_TIMEOUT * 1000:7.0f} ms")
+    else:
+        print(f"{name:<6} first paint {editor.first_paint_ms:9.0f} ms")
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else LINE_COUNT
+    app = QApplication(sys.argv)
+    # Measure the setText path, not streaming
+    main_window.STREAM_LOAD_BYTES = 1 << 62
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the session and settings of the real editor out of it
+        os.environ['APPDATA'] = os.environ['XDG_DATA_HOME'] = tmp
+        os.environ['XDG_CONFIG_HOME'] = tmp
+        path = os.path.join(tmp, 'server.log')
+        write_log(path, line_count)
+        print(f"Opening a {line_count:,}-line log "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+
+        window = MainWindow()
+        window.resize(1200, 800)
+        window.show()
+        app.processEvents()
+
+        editor = open_and_wait(app, window, path)
+        report("lazy", editor)
+        blocks, longest = watch_idle_pass(app, editor)
+        print(f"lazy   idle pass reached block {blocks:,}, "
+              f"longest event loop stall {longest * 1000:.0f} ms")
+
+        # Opening a path that is already open only switches to its tab
+        window.close_tab(window.editor_tabs.currentIndex())
+        app.processEvents()
+        main_window.LAZY_HIGHLIGHT_BLOCKS = line_count + 1
+        report("eager", open_and_wait(app, window, path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+from src.ui.main_window import CodeEditor
+from src.ui.minimap import MINIMAP_DELAY, MINIMAP_WIDTH, render_minimap
+
+# Lines in each file: one with a row per line, one sampled
+FILES = (2000, 1000000)
+KEYSTROKES = 100
+# Give up waiting on the minimap after this many seconds
+WAIT_TIMEOUT = 120
+
+
+class Job:
+    # Stands in for the Worker when render_minimap runs on this thread
+    def check(self):
+        pass
+
+
+def wait_rendered(app, minimap):
+    # Until no row is dirty and no render is running
+    deadline = time.perf_counter() + WAIT_TIMEOUT
+    while time.perf_counter() < deadline and (
+            minimap.render_job is not None or minimap.render_timer.isActive()
+            or any(row[1] for row in minimap.rows)):
+        app.processEvents()
+
+
+def snapshot(minimap, indexes):
+    # What start_render hands the worker for the given rows
+    document = minimap.editor.document()
+    dirty = []
+    for index in indexes:
+        block = document.findBlockByNumber(index * minimap.lines_per_row)
+        runs = [(r.start, r.length, r.format.foreground().color().rgba())
+                for r in block.layout().formats()]
+        dirty.append((index, minimap.rows[index], block.text(), runs))
+    return dirty
+
+
+def render_time(minimap, indexes):
+    # Seconds to draw the given rows and build the images
+    dirty = snapshot(minimap, indexes)
+    pixels = [row[0] for row in minimap.rows]
+    started = time.perf_counter()
+    render_minimap(Job(), pixels, dirty, 0xFFD4D4D4, MINIMAP_WIDTH, minimap.display_size())
+    return time.perf_counter() - started
+
+
+def type_keys(app, editor, line):
+    # Per keystroke seconds for the key event and the event loop pass
+    # after it, and the longest event loop pass until the minimap caught up
+    cursor = QTextCursor(editor.document().findBlockByNumber(line))
+    cursor.movePosition(QTextCursor.EndOfBlock)
+    editor.setTextCursor(cursor)
+    times = []
+    for n in range(KEYSTROKES):
+        started = time.perf_counter()
+        QTest.keyClick(editor, Qt.Key_A if n % 10 else Qt.Key_Return)
+        app.processEvents()
+        times.append(time.perf_counter() - started)
+    longest = 0
+    deadline = time.perf_counter() + (MINIMAP_DELAY * 3) / 1000
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        app.processEvents()
+        longest = max(longest, time.perf_counter() - started)
+    return times, longest
+
+
+def median(times):
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def run(app, line_count):
+    editor = CodeEditor()
+    editor.resize(1000, 800)
+    editor.set_language('python')
+    editor.set_lazy_highlighting(line_count > 20000)
+    editor.setText('\n'.join(f'    value_{i} = compute("{i}")  # step' for i in range(line_count)))
+    editor.show()
+    started = time.perf_counter()
+    minimap = editor.minimap
+    deadline = started + WAIT_TIMEOUT
+    while minimap.image is None and time.perf_counter() < deadline:
+        app.processEvents()
+    first = time.perf_counter() - started
+    # Every row drawn, in the colors of the lines on their own where the
+    # highlighter has not got to them yet
+    while (any(row[0] is None for row in minimap.rows) or minimap.render_job is not None
+           ) and time.perf_counter() < deadline:
+        app.processEvents()
+    colored = time.perf_counter() - started
+    # Typing is timed once the idle highlighting has been through the file,
+    # so no run pays for more of it than another
+    while editor.highlighter.idle_timer.isActive() and time.perf_counter() < deadline:
+        app.processEvents()
+    wait_rendered(app, minimap)
+    complete = time.perf_counter() - started
+
+    full = min(render_time(minimap, range(len(minimap.rows))) for _ in range(3))
+    one = min(render_time(minimap, [len(minimap.rows) // 2]) for _ in range(3))
+
+    middle = line_count // 2
+    editor.verticalScrollBar().setValue(middle)
+    app.processEvents()
+    with_minimap, longest = type_keys(app, editor, middle)
+    wait_rendered(app, minimap)
+
+    # The same typing with a minimap that redraws every row on each key
+    def redraw_all():
+        pixels = [row[0] for row in minimap.rows]
+        dirty = snapshot(minimap, range(len(minimap.rows)))
+        render_minimap(Job(), pixels, dirty, 0xFFD4D4D4, MINIMAP_WIDTH, minimap.display_size())
+    editor.document().contentsChange.connect(redraw_all)
+    naive, _ = type_keys(app, editor, middle + KEYSTROKES)
+    editor.document().contentsChange.disconnect(redraw_all)
+
+    # And with no minimap at all
+    editor.document().contentsChange.disconnect(minimap.document_changed)
+    editor.highlighter.blocks_formatted.disconnect(minimap.blocks_formatted)
+    without, _ = type_keys(app, editor, middle + 2 * KEYSTROKES)
+
+    print(f"{line_count:,} lines, {len(minimap.rows):,} rows of {minimap.lines_per_row} line(s)")
+    print(f"  First picture {first * 1000:.0f} ms after the editor is shown, "
+          f"every row in color {colored * 1000:.0f} ms, "
+          f"in the highlighter's colors {complete * 1000:.0f} ms")
+    print(f"  Redraw all rows {full * 1000:.1f} ms, one changed row {one * 1000:.2f} ms")
+    print(f"  Keystroke: no minimap {median(without):.2f} ms, minimap {median(with_minimap):.2f} ms "
+          f"(longest pass while catching up {longest * 1000:.1f} ms), "
+          f"redrawing every row per key {median(naive):.2f} ms")
+    editor.release()
+    editor.deleteLater()
+
+
+def main():
+    app = QApplication(sys.argv)
+    print(f"Median of {KEYSTROKES} keystrokes")
+    for line_count in FILES:
+        run(app, line_count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ui.path_index import PathIndex, PathSearch
+
+PATH_COUNT = 500000
+# Time budget per slice, as the quick-open dialog uses
+SLICE = 0.008
+WORDS = ('src', 'lib', 'core', 'util', 'component', 'model', 'view', 'test', 'api', 'server',
+         'client', 'data', 'index', 'main', 'config', 'handler', 'parser', 'widget', 'render',
+         'store')
+EXTENSIONS = ('py', 'js', 'ts', 'c', 'h', 'md')
+# Queries typed one character at a time
+TYPED = ('mainwin', 'widgetrend', 'hndlr99', 'core_3/', 'comp/mod/x', 'zzq')
+
+
+def make_paths(count):
+    random.seed(1)
+    paths = []
+    for i in range(count):
+        folders = '/'.join(random.choice(WORDS) + (f'_{random.randint(0, 50)}' if random.random() < 0.5 else '')
+                           for _ in range(random.randint(1, 5)))
+        paths.append(f'{folders}/{random.choice(WORDS)}_{random.choice(WORDS)}{i % 997}.'
+                     f'{random.choice(EXTENSIONS)}')
+    return paths
+
+
+def keystroke(index, query, previous):
+    # (search, ms until the first slice returns, results it had, ms until
+    # complete), narrowed from the previous keystroke's search as the dialog
+    # does
+    started = time.perf_counter()
+    search = PathSearch(index, query, previous=previous)
+    search.run(SLICE)
+    first = time.perf_counter() - started
+    shown = len(search.results)
+    while not search.run(SLICE):
+        pass
+    return search, first * 1000, shown, (time.perf_counter() - started) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else PATH_COUNT
+    paths = make_paths(count)
+    started = time.perf_counter()
+    index = PathIndex(paths)
+    print(f"Indexed {count:,} paths in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    worst_first = worst_complete = 0
+    for query in TYPED:
+        print(f"Typing '{query}':")
+        search = None
+        for end in range(1, len(query) + 1):
+            search, first, shown, complete = keystroke(index, query[:end], search)
+            worst_first = max(worst_first, first)
+            worst_complete = max(worst_complete, complete)
+            print(f"  {query[:end]:<12} first slice {first:5.1f} ms ({shown:>3} results), "
+                  f"complete {complete:6.1f} ms")
+    print(f"Slowest first slice {worst_first:.1f} ms, slowest complete search "
+          f"{worst_complete:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QApplication
+from src.ui import main_window
+from src.ui.main_window import MainWindow
+
+LINE_COUNT = 200000
+# The one-edit-per-match baseline only does this many, then extrapolates
+NAIVE_COUNT = 2000
+# Give up on Replace All after this many seconds
+REPLACE_TIMEOUT = 120
+
+
+def write_source(path, line_count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(line_count):
+            f.write(f'    result_{i} = compute("item {i}", {i % 997})  # step {i}\n')
+
+
+def open_editor(window, path):
+    window.open_file_by_path(path)
+    return window.editor_tabs.currentWidget()
+
+
+def undo_all(editor):
+    # Undo calls it takes to get back to the file as opened, and the time;
+    # editor.undo() is what Ctrl+Z runs
+    document = editor.document()
+    count = 0
+    started = time.perf_counter()
+    while document.isUndoAvailable():
+        editor.undo()
+        count += 1
+    return count, time.perf_counter() - started
+
+
+def redo_all(editor):
+    document = editor.document()
+    count = 0
+    started = time.perf_counter()
+    while document.isRedoAvailable():
+        editor.redo()
+        count += 1
+    return count, time.perf_counter() - started
+
+
+def settle(app, editor):
+    # Seconds until the idle highlighting is done, and the longest gap
+    # between event loop iterations meanwhile
+    started = last = time.perf_counter()
+    longest = 0
+    while editor.highlighter.idle_timer.isActive() and last - started < REPLACE_TIMEOUT:
+        app.processEvents()
+        now = time.perf_counter()
+        longest = max(longest, now - last)
+        last = now
+    return last - started, longest
+
+
+def naive_replace(editor, old, new, limit):
+    # What replacing one match at a time costs: an edit, a layout update and
+    # an undo entry per occurrence
+    document = editor.document()
+    cursor = QTextCursor(document)
+    count = 0
+    started = time.perf_counter()
+    while count < limit:
+        cursor = document.find(old, cursor)
+        if cursor.isNull():
+            break
+        cursor.insertText(new)
+        count += 1
+    return count, time.perf_counter() - started
+
+
+def replace_all(app, window, editor, old, new):
+    # Seconds until the replacement is in, and the longest gap between event
+    # loop iterations meanwhile
+    dialog = window.find_dialog
+    dialog.find_text.setText(old)
+    dialog.replace_text.setText(new)
+    started = last = time.perf_counter()
+    window.replace_all()
+    longest = last - started
+    while editor.search.replace_job is not None and last - started < REPLACE_TIMEOUT:
+        app.processEvents()
+        now = time.perf_counter()
+        longest = max(longest, now - last)
+        last = now
+    return last - started, longest
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else LINE_COUNT
+    app = QApplication(sys.argv)
+    # Measure replacing, not streaming the file in
+    main_window.STREAM_LOAD_BYTES = 1 << 62
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the session and settings of the real editor out of it
+        os.environ['APPDATA'] = os.environ['XDG_DATA_HOME'] = tmp
+        os.environ['XDG_CONFIG_HOME'] = tmp
+        path = os.path.join(tmp, 'module.py')
+        write_source(path, line_count)
+        window = MainWindow()
+        window.resize(1200, 800)
+        window.show()
+        print(f"Replacing 'compute' in a {line_count:,}-line file ({line_count:,} matches)")
+
+        editor = open_editor(window, path)
+        count, elapsed = naive_replace(editor, 'compute', 'evaluate', NAIVE_COUNT)
+        estimate = elapsed / max(count, 1) * line_count
+        print(f"{'one edit per match':<24} {count:>8,} in {elapsed * 1000:7.0f} ms "
+              f"(all {line_count:,}: ~{estimate:.1f} s)")
+        steps, elapsed = undo_all(editor)
+        print(f"{'  undo':<24} {steps:>8,} steps in {elapsed * 1000:7.0f} ms")
+        window.close_tab(window.editor_tabs.currentIndex())
+
+        editor = open_editor(window, path)
+        window.show_replace_dialog()
+        elapsed, longest = replace_all(app, window, editor, 'compute', 'evaluate')
+        print(f"{'Replace All':<24} {line_count:>8,} in {elapsed * 1000:7.0f} ms, "
+              f"longest stall {longest * 1000:.0f} ms")
+        steps, elapsed = undo_all(editor)
+        restored = editor.toPlainText().count('compute')
+        print(f"{'  undo':<24} {steps:>8,} step in {elapsed * 1000:7.0f} ms, "
+              f"{restored:,} matches back")
+        steps, elapsed = redo_all(editor)
+        print(f"{'  redo':<24} {steps:>8,} step in {elapsed * 1000:7.0f} ms")
+        elapsed, longest = settle(app, editor)
+        print(f"{'  highlighting after':<24} {elapsed * 1000:17.0f} ms in idle slices, "
+              f"longest stall {longest * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QThreadPool
+from PyQt5.QtWidgets import QApplication
+
+from src.ui.main_window import CodeEditor, MainWindow
+from src.ui.session import save_session
+
+LINES_PER_FILE = 5000
+TAB_COUNTS = (1, 10, 100)
+
+
+def write_files(directory, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f'module_{i}.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            for j in range(LINES_PER_FILE // 2):
+                f.write(f'def handler_{j}(value):\n    return value * {i + j}  # step\n')
+        paths.append(path)
+    return paths
+
+
+def wait_for_current_tab(app, window):
+    while not isinstance(window.editor_tabs.currentWidget(), CodeEditor):
+        app.processEvents()
+    app.processEvents()
+
+
+def restore(app, paths):
+    # Startup with the tabs in the session file
+    save_session([(path, (0, 0, 0)) for path in paths], len(paths) - 1)
+    started = time.perf_counter()
+    window = MainWindow()
+    window.show()
+    wait_for_current_tab(app, window)
+    elapsed = time.perf_counter() - started
+    window.close()
+    return elapsed
+
+
+def open_all(app, paths):
+    # Startup opening every file, the way test_editor.py does
+    save_session([], -1)
+    started = time.perf_counter()
+    window = MainWindow()
+    window.max_loaded_tabs = len(paths)
+    window.show()
+    for path in paths:
+        window.open_file_by_path(path)
+    wait_for_current_tab(app, window)
+    elapsed = time.perf_counter() - started
+    window.close()
+    return elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        # Keep the session and settings of the real editor out of it
+        os.environ['APPDATA'] = os.environ['XDG_DATA_HOME'] = directory
+        os.environ['XDG_CONFIG_HOME'] = directory
+        app = QApplication(sys.argv)
+        paths = write_files(directory, max(TAB_COUNTS))
+        print(f"Startup until the current tab is loaded, {LINES_PER_FILE:,} lines per file")
+        for count in TAB_COUNTS:
+            lazy = restore(app, paths[:count])
+            eager = open_all(app, paths[:count])
+            print(f"{count:>4} tabs: session restore {lazy * 1000:7.0f} ms, "
+                  f"opening them all {eager * 1000:7.0f} ms")
+        QThreadPool.globalInstance().waitForDone()
+
+
+if __name__ == '__main__':
+    main()
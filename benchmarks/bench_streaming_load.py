@@ -0,0 +1,74 @@
+import os
+import resource
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+from src.ui.main_window import MainWindow
+
+SIZE_MB = 50
+# Give up on the load after this many seconds
+LOAD_TIMEOUT = 600
+
+
+def write_log(path, size):
+    with open(path, 'w', encoding='utf-8') as f:
+        i = 0
+        while f.tell() < size:
+            f.write(f'2024-01-01 12:00:{i % 60:02d} INFO worker-{i % 8} '
+                    f'request {i} handled in {i % 997} ms "GET /api/items/{i}"\n')
+            i += 1
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else SIZE_MB
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the session and settings of the real editor out of it
+        os.environ['APPDATA'] = os.environ['XDG_DATA_HOME'] = tmp
+        os.environ['XDG_CONFIG_HOME'] = tmp
+        path = os.path.join(tmp, 'server.log')
+        write_log(path, size_mb * 1024 * 1024)
+
+        window = MainWindow()
+        window.resize(1200, 800)
+        window.show()
+        app.processEvents()
+        baseline = peak_rss_mb()
+        print(f"Streaming a {os.path.getsize(path) / 1048576:.0f} MB file "
+              f"(baseline peak RSS {baseline:.0f} MB)")
+
+        started = time.perf_counter()
+        window.open_file_by_path(path)
+        editor = window.editor_tabs.currentWidget()
+        opened = time.perf_counter() - started
+
+        # Longest gap between event loop iterations while the file streams in
+        longest = 0
+        last = time.perf_counter()
+        while editor.loader is not None and last - started < LOAD_TIMEOUT:
+            app.processEvents()
+            now = time.perf_counter()
+            longest = max(longest, now - last)
+            last = now
+        elapsed = time.perf_counter() - started
+
+        print(f"open_file_by_path returned after {opened * 1000:.0f} ms, "
+              f"first paint {editor.first_paint_ms or 0:.0f} ms")
+        print(f"loaded {editor.document().blockCount():,} lines in {elapsed:.1f} s, "
+              f"longest event loop stall {longest * 1000:.0f} ms")
+        print(f"peak RSS {peak_rss_mb():.0f} MB "
+              f"({peak_rss_mb() - baseline:.0f} MB over baseline)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QPoint
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QApplication, QTextEdit
+
+LINE_COUNTS = (10000, 100000, 1000000)
+# Scroll steps timed for the FPS figure
+SCROLL_FRAMES = 200
+# Give up on a paint after this many seconds
+PAINT_TIMEOUT = 300
+# Each case runs in its own process so that peak RSS is its own
+CASE_TIMEOUT = 900
+
+
+def write_source(path, line_count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(line_count):
+            f.write(f'    result_{i} = compute("item {i}", {i % 997})  # step {i}\n')
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_rich_editor(main_window):
+    # CodeEditor as it was on QTextEdit: same font, wrapping, highlighter
+    # and lazy mode, with setText going through the rich text engine
+    class RichCodeEditor(QTextEdit):
+        def __init__(self):
+            super().__init__()
+            self.setFont(QFont("Consolas", 10))
+            self.setLineWrapMode(QTextEdit.NoWrap)
+            self.first_paint_ms = None
+            self.open_started = None
+            self.highlighter = main_window.CodeHighlighter(self.document())
+            self.verticalScrollBar().valueChanged.connect(self.update_highlight_window)
+
+        def setText(self, text):
+            if not self.highlighter.lazy:
+                super().setText(text)
+                return
+            document = self.document()
+            blocked = document.blockSignals(True)
+            try:
+                super().setText(text)
+            finally:
+                document.blockSignals(blocked)
+            self.highlighter.set_lazy(True)
+
+        def update_highlight_window(self):
+            first = self.cursorForPosition(QPoint(0, 0)).blockNumber()
+            last = self.cursorForPosition(QPoint(0, self.viewport().height() - 1)).blockNumber()
+            self.highlighter.set_window(first - main_window.HIGHLIGHT_MARGIN,
+                                        last + main_window.HIGHLIGHT_MARGIN)
+
+        def paintEvent(self, event):
+            super().paintEvent(event)
+            if self.open_started is not None:
+                self.first_paint_ms = (time.perf_counter() - self.open_started) * 1000
+                self.open_started = None
+
+    return RichCodeEditor()
+
+
+def run_case(engine, line_count):
+    app = QApplication(sys.argv)
+    from src.ui import main_window
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'module.py')
+        write_source(path, line_count)
+        baseline = peak_rss_mb()
+
+        if engine == 'before':
+            editor = make_rich_editor(main_window)
+        else:
+            editor = main_window.CodeEditor()
+        editor.resize(1200, 800)
+        editor.show()
+        app.processEvents()
+
+        # Open the way open_file_by_path does for files it does not stream
+        editor.open_started = time.perf_counter()
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        editor.highlighter.set_language('python')
+        if content.count('\n') >= main_window.LAZY_HIGHLIGHT_BLOCKS:
+            editor.highlighter.set_lazy(True)
+        editor.setText(content)
+        del content
+        deadline = time.perf_counter() + PAINT_TIMEOUT
+        while editor.first_paint_ms is None and time.perf_counter() < deadline:
+            app.processEvents()
+
+        # Page down through the file with the event loop running
+        scrollbar = editor.verticalScrollBar()
+        started = time.perf_counter()
+        for frame in range(SCROLL_FRAMES):
+            scrollbar.setValue(scrollbar.value() + scrollbar.pageStep())
+            editor.viewport().repaint()
+            app.processEvents()
+        fps = SCROLL_FRAMES / (time.perf_counter() - started)
+
+        first_paint = editor.first_paint_ms
+        print(f"{first_paint if first_paint is not None else -1:.0f} {fps:.1f} "
+              f"{peak_rss_mb() - baseline:.0f}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--case':
+        run_case(sys.argv[2], int(sys.argv[3]))
+        return
+    line_counts = [int(arg) for arg in sys.argv[1:]] or LINE_COUNTS
+    print(f"{'lines':>10} {'engine':>20} {'first paint':>12} {'scroll fps':>11} {'peak RSS':>9}")
+    for line_count in line_counts:
+        for engine, name in (('before', 'QTextEdit'), ('after', 'QPlainTextEdit')):
+            try:
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--case', engine, str(line_count)],
+                    capture_output=True, text=True, timeout=CASE_TIMEOUT).stdout.split()
+                first_paint, fps, rss = output[-3:]
+                print(f"{line_count:>10,} {name:>20} {first_paint:>9} ms {fps:>11} {rss:>6} MB")
+            except (subprocess.TimeoutExpired, ValueError):
+                print(f"{line_count:>10,} {name:>20} {'timed out':>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+from src.ui.main_window import MainWindow
+from src.ui.syntax import KEYWORD, STRING, COMMENT, NUMBER, FUNCTION, CLASS, BUILTIN
+from src.ui.themes import THEMES, theme_formats, theme_stylesheet
+
+OPEN_TABS = 50
+SWITCHES = 20
+NEW_TABS = 40
+TEXT = "def handler(value):\n    return value * 2  # step\n" * 100
+# Lines in the file that is re-highlighted when token colors change
+RECOLOR_LINES = 15000
+# Give up waiting on the editor after this many seconds
+WAIT_TIMEOUT = 60
+# Dark with other token colors, so switching to it re-highlights
+CONTRAST = dict(THEMES['Dark'], syntax={
+    KEYWORD: '#C586C0',
+    STRING: '#D69D85',
+    COMMENT: '#608B4E',
+    NUMBER: '#DCDCAA',
+    FUNCTION: '#FFD700',
+    CLASS: '#3DC9B0',
+    BUILTIN: '#9CDCFE',
+})
+
+# What every editor used to parse for itself before themes.py
+LEGACY_EDITOR_STYLE = """
+    QPlainTextEdit {
+        background-color: #1E1E1E;
+        color: #D4D4D4;
+        border: none;
+        selection-background-color: #264F78;
+        selection-color: #FFFFFF;
+    }
+    QScrollBar:vertical {
+        background-color: #1E1E1E;
+        width: 14px;
+        margin: 0px;
+    }
+    QScrollBar::handle:vertical {
+        background-color: #424242;
+        min-height: 20px;
+        border-radius: 7px;
+    }
+    QScrollBar::handle:vertical:hover {
+        background-color: #4F4F4F;
+    }
+    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+    QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
+        background: none;
+    }
+"""
+
+
+def set_theme(app, window, theme, legacy):
+    if legacy:
+        # The stylesheet on the main window, with the editors' own sheets
+        # on top
+        window.setStyleSheet(theme_stylesheet(theme))
+    else:
+        window.set_theme(theme)
+    app.processEvents()
+
+
+def new_tab(app, window, legacy):
+    window.new_file()
+    if legacy:
+        window.editor_tabs.currentWidget().setStyleSheet(LEGACY_EDITOR_STYLE)
+    app.processEvents()
+
+
+def median(times):
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def run(app, legacy):
+    # (median theme switch, median new tab in Light, in Dark) in ms, and
+    # (loaded highlighters, format tables among them)
+    window = MainWindow()
+    if legacy:
+        # No class palettes, only per-widget sheets style the editors
+        for class_name in ("CodeEditor", "LargeFileViewer"):
+            app.setPalette(app.palette(), class_name)
+    set_theme(app, window, "Light", legacy)
+    window.show()
+    for _ in range(OPEN_TABS):
+        new_tab(app, window, legacy)
+        window.editor_tabs.currentWidget().setPlainText(TEXT)
+    app.processEvents()
+
+    switches = []
+    for theme in ("Dark", "Light") * (SWITCHES // 2):
+        started = time.perf_counter()
+        set_theme(app, window, theme, legacy)
+        switches.append(time.perf_counter() - started)
+
+    # Tabs past the loaded limit are hibernated and have no highlighter
+    editors = [window.editor_tabs.widget(index) for index in range(window.editor_tabs.count())]
+    tables = [id(editor.highlighter.formats) for editor in editors
+              if hasattr(editor, 'highlighter')]
+
+    tabs = {}
+    for theme in ("Light", "Dark"):
+        set_theme(app, window, theme, legacy)
+        times = []
+        for _ in range(NEW_TABS):
+            started = time.perf_counter()
+            new_tab(app, window, legacy)
+            times.append(time.perf_counter() - started)
+            window.close_tab(window.editor_tabs.currentIndex())
+            app.processEvents()
+        tabs[theme] = median(times)
+    window.close()
+    return median(switches), tabs["Light"], tabs["Dark"], (len(tables), len(set(tables)))
+
+
+def wait_idle(app, editor):
+    # Until the file is painted, lexed and every queued block is redone
+    highlighter = editor.highlighter
+    deadline = time.perf_counter() + WAIT_TIMEOUT
+    while time.perf_counter() < deadline and (
+            editor.first_paint_ms is None or highlighter.lex_timer.isActive()
+            or highlighter.lex_job is not None or highlighter.idle_timer.isActive()):
+        app.processEvents()
+
+
+def window_recolored(editor):
+    # Whether every visible block carries the Contrast keyword color
+    color = theme_formats('Contrast')[KEYWORD].foreground().color()
+    first, last = editor.visible_block_range()
+    document = editor.document()
+    for number in range(first, last + 1):
+        block = document.findBlockByNumber(number)
+        if not any(r.format.foreground().color() == color for r in block.layout().formats()):
+            return False
+    return True
+
+
+def recolor(app, directory):
+    # (ms until the visible blocks had the new colors, ms until every block
+    # had them, longest stall in ms, ms for a full rehighlight())
+    path = os.path.join(directory, 'recolor.py')
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(RECOLOR_LINES // 2):
+            f.write(f'def handler_{i}(value):\n    return value * {i}  # step\n')
+    window = MainWindow()
+    window.set_theme("Dark")
+    window.show()
+    window.open_file_by_path(path)
+    editor = window.editor_tabs.currentWidget()
+    wait_idle(app, editor)
+
+    started = time.perf_counter()
+    window.set_theme("Contrast")
+    visible = None
+    longest = 0
+    last = started
+    while visible is None or editor.highlighter.idle_timer.isActive():
+        app.processEvents()
+        now = time.perf_counter()
+        longest = max(longest, now - last)
+        last = now
+        if visible is None and window_recolored(editor):
+            visible = now - started
+    complete = time.perf_counter() - started
+
+    editor.highlighter.formats = theme_formats("Dark")
+    started = time.perf_counter()
+    editor.highlighter.rehighlight()
+    full = time.perf_counter() - started
+    window.close()
+    return visible * 1000, complete * 1000, longest * 1000, full * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        # Keep the theme and session of the real editor out of it
+        os.environ['APPDATA'] = os.environ['XDG_DATA_HOME'] = directory
+        os.environ['XDG_CONFIG_HOME'] = directory
+        app = QApplication(sys.argv)
+        app.setStyle('Fusion')
+        print(f"{OPEN_TABS} open tabs, median of {SWITCHES} theme switches and {NEW_TABS} new tabs")
+        for name, legacy in (("per-widget", True), ("palette", False)):
+            switch, light, dark, (highlighters, tables) = run(app, legacy)
+            print(f"{name:<11} switch {switch:6.1f} ms, new tab {light:5.2f} ms (Light) "
+                  f"{dark:5.2f} ms (Dark)")
+        print(f"{highlighters} loaded highlighters share {tables} format table(s)")
+
+        THEMES['Contrast'] = CONTRAST
+        visible, complete, longest, full = recolor(app, directory)
+        print(f"New token colors, {RECOLOR_LINES:,} lines: visible blocks {visible:.1f} ms, "
+              f"all blocks {complete:.0f} ms (longest stall {longest:.1f} ms); "
+              f"rehighlight() {full:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
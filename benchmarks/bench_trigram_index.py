@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ui.excludes import DEFAULT_EXCLUDES
+from src.ui.find_in_files import find_in_files, get_process_pool, pool_size
+from src.ui.project_tree import list_tree, rescan_tree
+from src.ui.search import compile_query
+from src.ui.trigram_index import (build_trigram_index, find_with_index, index_changes,
+                                  load_trigram_index, required_literals)
+from src.ui.workers import Worker
+
+FILE_COUNT = 20000
+FILES_PER_DIRECTORY = 500
+LINES_PER_FILE = 40
+QUERIES = (
+    ('needle_42', False),
+    ('compute', False),
+    (r'def handler_\d+7\(', True),
+    (r'needle_(1|2)\d', True),
+)
+
+
+def write_tree(root, file_count):
+    for i in range(file_count):
+        directory = os.path.join(root, f'package_{i // FILES_PER_DIRECTORY}')
+        if not i % FILES_PER_DIRECTORY:
+            os.makedirs(directory)
+        with open(os.path.join(directory, f'module_{i}.py'), 'w', encoding='utf-8') as f:
+            f.write(f'def handler_{i}(request):\n')
+            for j in range(LINES_PER_FILE):
+                f.write(f'    value_{j} = compute("item {i}", {j})  # step {i * j}\n')
+            f.write(f'    return needle_{i % 1000}\n')
+
+
+def quiet_job():
+    job = Worker(None)
+    job.report = lambda value: None
+    return job
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else FILE_COUNT
+    data = tempfile.TemporaryDirectory()
+    os.environ['XDG_DATA_HOME'] = os.environ['APPDATA'] = data.name
+    with data, tempfile.TemporaryDirectory() as root:
+        write_tree(root, file_count)
+        get_process_pool().submit(pool_size).result()
+        print(f"Indexing {file_count:,} files with {pool_size()} pool processes")
+
+        started = time.perf_counter()
+        files, directories = list_tree(quiet_job(), root, DEFAULT_EXCLUDES)
+        print(f"{'list the tree':<30} {(time.perf_counter() - started) * 1000:8.0f} ms")
+        started = time.perf_counter()
+        index = build_trigram_index(quiet_job(), root, files)
+        stats = index.stats()
+        print(f"{'build and save':<30} {(time.perf_counter() - started) * 1000:8.0f} ms, "
+              f"{stats['trigrams']:,} trigrams in {stats['segments']} segments, "
+              f"{os.path.getsize(index.disk_path()) / 1048576:.1f} MB on disk")
+        started = time.perf_counter()
+        index = load_trigram_index(quiet_job(), root)
+        print(f"{'load':<30} {(time.perf_counter() - started) * 1000:8.0f} ms")
+
+        for query, regex in QUERIES:
+            pattern = compile_query(query, False, False, regex)
+            literals = required_literals(query, False, regex)
+            _, scan = find_in_files(quiet_job(), root, pattern)
+            _, indexed = find_with_index(quiet_job(), index, pattern, literals)
+            lookup, candidates, total, _ = index.last_query
+            print(f"{query!r:<30} scan {scan * 1000:6.0f} ms, index {indexed * 1000:6.1f} ms "
+                  f"(lookup {lookup * 1000:.1f} ms, {candidates:,} of {total:,} files)")
+
+        # One file changed and one added, found from their directory
+        directory = os.path.join(root, 'package_0')
+        with open(os.path.join(directory, 'module_0.py'), 'a', encoding='utf-8') as f:
+            f.write('    fresh_symbol = 1\n')
+        with open(os.path.join(directory, 'added.py'), 'w', encoding='utf-8') as f:
+            f.write('fresh_symbol = 2\n')
+        started = time.perf_counter()
+        files, directories, listed, removed, _, _ = rescan_tree(
+            quiet_job(), root, files, directories, [directory], DEFAULT_EXCLUDES)
+        entries, masks, removed = index_changes(quiet_job(), index, listed, removed)
+        index.remove_files(removed)
+        index.add_files(entries, masks)
+        elapsed = time.perf_counter() - started
+        found = len(index.candidates(required_literals('fresh_symbol', False, False)))
+        print(f"{'update one directory':<30} {elapsed * 1000:8.0f} ms, "
+              f"{len(entries)} files reindexed, {found} candidates for the new symbol")
+
+
+if __name__ == '__main__':
+    main()
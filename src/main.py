@@ -1,18 +1,36 @@
 import sys
-from PyQt5.QtWidgets import QApplication
-from ui.main_window import MainWindow
+from ui.startup import PROFILE_FLAG, StartupProfile
 
 def main():
+    # Time each startup phase when run with --profile-startup
+    profile = StartupProfile() if PROFILE_FLAG in sys.argv else None
+    from PyQt5.QtWidgets import QApplication
+    if profile:
+        profile.mark("import PyQt5")
     app = QApplication(sys.argv)
     
     # Set application style
     app.setStyle('Fusion')
+    if profile:
+        profile.mark("QApplication")
+    
+    # The editor is imported after Qt is up, so the profile can tell them apart
+    from ui.main_window import MainWindow
+    if profile:
+        profile.mark("import editor")
     
     # Create and show main window
-    window = MainWindow()
+    window = MainWindow(profile)
     window.show()
+    if profile:
+        # MainWindow reports once the work it deferred until now is done
+        profile.mark("show")
     
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # Find in Files runs a process pool; frozen builds need this to start it.
+    # Imported here rather than at the top, which startup would pay for.
+    import multiprocessing
+    multiprocessing.freeze_support()
+    main()
\ No newline at end of file
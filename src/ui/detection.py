@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from pygments.util import ClassNotFound
+
+from .appdata import data_path
+from .syntax import GENERIC, LANGUAGES
+
+# guess_lexer only ever sees this much of a file
+DETECT_PREFIX_BYTES = 8192
+# Detection results remembered across sessions
+CACHE_SIZE = 1000
+CACHE_FILE = "lexer_cache.json"
+
+
+class LexerCache:
+    # Persistent LRU of detected languages keyed by path, mtime and a hash of
+    # the prefix that was sampled. Shared by detection workers, so every
+    # access goes through the lock.
+    def __init__(self, path, size=CACHE_SIZE):
+        self.path = path
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for key, language in json.load(f):
+                    self.entries[key] = language
+        except (OSError, ValueError, TypeError):
+            self.entries.clear()
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(self.entries.items()), f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    def get(self, key):
+        with self.lock:
+            language = self.entries.get(key)
+            if language is not None:
+                self.entries.move_to_end(key)
+            return language
+
+    def put(self, key, language):
+        with self.lock:
+            self.entries[key] = language
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+            try:
+                self.save()
+            except OSError:
+                pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_lexer_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LexerCache(data_path(CACHE_FILE))
+        return _cache
+
+
+def language_for_lexer(lexer):
+    # One of our languages when Pygments agrees on it, otherwise the Pygments
+    # alias itself so the lexing pipeline can still use it
+    for alias in lexer.aliases:
+        if alias in LANGUAGES:
+            return alias
+    if not lexer.aliases or lexer.aliases[0] == 'text':
+        return GENERIC
+    return lexer.aliases[0]
+
+
+def detect_file_language(job, path):
+    with open(path, 'rb') as f:
+        prefix = f.read(DETECT_PREFIX_BYTES)
+    mtime = os.stat(path).st_mtime_ns
+    key = f"{os.path.normcase(os.path.abspath(path))}|{mtime}|{hashlib.sha1(prefix).hexdigest()}"
+
+    cache = get_lexer_cache()
+    language = cache.get(key)
+    if language is not None:
+        return language
+
+    job.check()
+    # Imported here, like in lexing, to keep it off the startup path
+    from pygments.lexers import guess_lexer
+    try:
+        language = language_for_lexer(guess_lexer(prefix.decode('utf-8', errors='replace')))
+    except ClassNotFound:
+        language = GENERIC
+    cache.put(key, language)
+    return language
@@ -0,0 +1,42 @@
+from PyQt5.QtCore import QSortFilterProxyModel
+
+from .excludes import compile_excludes, is_excluded_entry
+
+# Names and root-relative paths hidden in the explorer; a trailing slash
+# marks a folder, a leading one anchors the glob to the project folder
+EXPLORER_EXCLUDES = ('.git', '.hg', '.svn', '__pycache__', 'node_modules', '.venv', 'venv',
+                     '.tox', '.mypy_cache', '.pytest_cache', 'build/', 'dist/',
+                     '*.pyc', '*.pyo')
+
+
+class ExplorerFilter(QSortFilterProxyModel):
+    # Hides excluded entries of a QFileSystemModel below the project folder.
+    # Only rows the view asks for are filtered, so folders are still listed
+    # one at a time as they are expanded, and hidden folders never are.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = None
+        self.excludes = EXPLORER_EXCLUDES
+        self.names, self.paths = compile_excludes(self.excludes)
+
+    def set_root(self, root):
+        # QFileSystemModel paths use forward slashes on every platform; kept
+        # with one trailing slash, as / and D:/ already have
+        self.root = root.replace('\\', '/').rstrip('/') + '/' if root else None
+        self.invalidateFilter()
+
+    def set_excludes(self, excludes):
+        self.excludes = tuple(excludes)
+        self.names, self.paths = compile_excludes(self.excludes)
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        model = self.sourceModel()
+        index = model.index(row, 0, parent)
+        path = model.filePath(index)
+        if self.root is None or not path.startswith(self.root) or path == self.root:
+            # The folders above the project folder lead the view to it
+            return True
+        relative = path[len(self.root):]
+        name = relative.rpartition('/')[2]
+        return not is_excluded_entry(name, relative, model.isDir(index), self.names, self.paths)
@@ -0,0 +1,199 @@
+from PyQt5.QtCore import QEvent, QPoint, QRect, Qt
+from PyQt5.QtGui import QPainter, QPalette
+from PyQt5.QtWidgets import QWidget
+
+# Space either side of the line numbers, in pixels
+GUTTER_PADDING = 4
+# Columns a tab counts for when indentation is compared for folding
+FOLD_TAB_WIDTH = 4
+# Blank lines looked past for the first line inside a fold
+MAX_BLANK_LOOKAHEAD = 50
+# Fold marker of a block: none, the start of a region, or a folded region
+NOT_FOLDABLE = 0
+FOLDABLE = 1
+FOLDED = 2
+
+
+def indentation(text):
+    # Width of the leading whitespace, or None for a blank line
+    stripped = text.lstrip()
+    if not stripped:
+        return None
+    return len(text[:len(text) - len(stripped)].expandtabs(FOLD_TAB_WIDTH))
+
+
+class LineNumberGutter(QWidget):
+    # Line numbers and fold markers left of a CodeEditor. Only the blocks
+    # in the rectangle being repainted are visited, scrolling moves the
+    # pixels already drawn, and the width only changes when the line count
+    # gains or loses a digit. Folding hides the blocks of an indented region;
+    # whether a block is folded is read back from the visibility of the
+    # next block, so there is no fold state to keep in step with edits.
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+        self.digits = 0
+        self.current_block = -1
+        self.update_metrics()
+        editor.blockCountChanged.connect(self.update_width)
+        editor.updateRequest.connect(self.update_area)
+        editor.cursorPositionChanged.connect(self.cursor_moved)
+
+    def update_metrics(self):
+        # Digit advances are measured once per font; digits are drawn right
+        # aligned so the widest one sizes the column
+        metrics = self.fontMetrics()
+        self.digit_width = max(metrics.horizontalAdvance(digit) for digit in "0123456789")
+        self.line_height = metrics.height()
+        self.fold_width = self.line_height
+        self.digits = 0
+        self.update_width()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            self.update_metrics()
+
+    def gutter_width(self):
+        return 2 * GUTTER_PADDING + self.digits * self.digit_width + self.fold_width
+
+    def update_width(self, *args):
+        digits = len(str(max(1, self.editor.blockCount())))
+        if digits == self.digits:
+            return
+        self.digits = digits
+        self.editor.set_left_margin(self.gutter_width())
+        self.update_geometry()
+
+    def update_geometry(self):
+        rect = self.editor.contentsRect()
+        self.setGeometry(QRect(rect.left(), rect.top(), self.gutter_width(), rect.height()))
+
+    def update_area(self, rect, dy):
+        if dy:
+            self.scroll(0, dy)
+        else:
+            self.update(0, rect.y(), self.width(), rect.height())
+
+    def cursor_moved(self):
+        block = self.editor.textCursor().block()
+        if not block.isVisible():
+            self.reveal(block)
+        # The current line number is drawn brighter
+        number = block.blockNumber()
+        if number != self.current_block:
+            self.current_block = number
+            self.update()
+
+    def next_visible(self, block):
+        # The block after block on screen; a folded region is jumped over,
+        # since hidden blocks take no lines in the document layout
+        following = block.next()
+        if following.isValid() and not following.isVisible():
+            document = self.editor.document()
+            following = document.findBlockByLineNumber(block.firstLineNumber()
+                                                       + max(block.lineCount(), 1))
+        return following
+
+    def fold_state(self, block):
+        following = block.next()
+        if not following.isValid():
+            return NOT_FOLDABLE
+        if not following.isVisible():
+            return FOLDED
+        indent = indentation(block.text())
+        if indent is None:
+            return NOT_FOLDABLE
+        for _ in range(MAX_BLANK_LOOKAHEAD):
+            inner = indentation(following.text())
+            if inner is not None:
+                return FOLDABLE if inner > indent else NOT_FOLDABLE
+            following = following.next()
+            if not following.isValid():
+                break
+        return NOT_FOLDABLE
+
+    def paintEvent(self, event):
+        editor = self.editor
+        painter = QPainter(self)
+        palette = self.palette()
+        painter.fillRect(event.rect(), palette.base())
+        block = editor.firstVisibleBlock()
+        top = editor.blockBoundingGeometry(block).translated(editor.contentOffset()).top()
+        first, bottom = event.rect().top(), event.rect().bottom()
+        numbers_width = GUTTER_PADDING + self.digits * self.digit_width
+        fold_left = numbers_width + GUTTER_PADDING
+        dim = palette.color(QPalette.PlaceholderText)
+        bright = palette.color(QPalette.Text)
+        while block.isValid() and top <= bottom:
+            height = editor.blockBoundingRect(block).height()
+            if top + height >= first:
+                number = block.blockNumber()
+                painter.setPen(bright if number == self.current_block else dim)
+                painter.drawText(0, int(top), numbers_width, self.line_height,
+                                 Qt.AlignRight | Qt.AlignVCenter, str(number + 1))
+                state = self.fold_state(block)
+                if state != NOT_FOLDABLE:
+                    painter.setPen(dim)
+                    painter.drawText(fold_left, int(top), self.fold_width, self.line_height,
+                                     Qt.AlignCenter, "▸" if state == FOLDED else "▾")
+            top += height
+            block = self.next_visible(block)
+        painter.end()
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.LeftButton or event.x() < self.width() - self.fold_width:
+            return super().mousePressEvent(event)
+        block = self.editor.cursorForPosition(QPoint(0, event.y())).block()
+        self.toggle_fold(block)
+
+    def toggle_fold(self, block):
+        state = self.fold_state(block)
+        if state == FOLDED:
+            self.reveal(block.next())
+        elif state == FOLDABLE:
+            indent = indentation(block.text())
+            last = None
+            following = block.next()
+            while following.isValid():
+                inner = indentation(following.text())
+                if inner is not None and inner <= indent:
+                    break
+                if inner is not None:
+                    last = following
+                following = following.next()
+            # Blank lines after the region stay on screen
+            following = block.next()
+            while True:
+                following.setVisible(False)
+                if following == last:
+                    break
+                following = following.next()
+            self.layout_changed(block, last)
+            # A cursor inside the region moves to its first line
+            if block.position() < self.editor.textCursor().position() < last.position() + last.length():
+                cursor = self.editor.textCursor()
+                cursor.setPosition(block.position() + block.length() - 1)
+                self.editor.setTextCursor(cursor)
+
+    def reveal(self, block):
+        # Show the hidden run block is in, from the fold start above it
+        first = block
+        while first.previous().isValid() and not first.previous().isVisible():
+            first = first.previous()
+        last = first
+        while True:
+            last.setVisible(True)
+            following = last.next()
+            if not following.isValid() or following.isVisible():
+                break
+            last = following
+        self.layout_changed(first.previous() if first.previous().isValid() else first, last)
+
+    def layout_changed(self, first, last):
+        # Let the layout recount the lines of the blocks whose visibility
+        # changed, which also moves the scroll range
+        document = self.editor.document()
+        document.markContentsDirty(first.position(), last.position() + last.length() - first.position())
+        self.editor.viewport().update()
+        self.update()
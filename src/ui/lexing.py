@@ -0,0 +1,93 @@
+from pygments.token import Comment, Keyword, Name, Number, String
+
+from .syntax import KEYWORD, STRING, COMMENT, NUMBER, FUNCTION, CLASS, BUILTIN, get_tokenizer
+
+# Pygments lexer used for each language in syntax.LANGUAGES; any other
+# language name is taken to be a Pygments alias (see detection)
+PYGMENTS_LEXERS = {
+    'python': 'python',
+    'javascript': 'javascript',
+    'html': 'html',
+}
+
+# Pygments token types mapped to our token kinds, most specific first
+TOKEN_KINDS = [
+    (Comment, COMMENT),
+    (String, STRING),
+    (Number, NUMBER),
+    (Keyword, KEYWORD),
+    (Name.Tag, KEYWORD),
+    (Name.Function, FUNCTION),
+    (Name.Decorator, FUNCTION),
+    (Name.Class, CLASS),
+    (Name.Builtin, BUILTIN),
+]
+
+# Worker cancellation is checked once per this many tokens
+CHECK_INTERVAL = 1000
+
+_kinds = {}
+
+
+def kind_for(token_type):
+    try:
+        return _kinds[token_type]
+    except KeyError:
+        kind = None
+        for parent, parent_kind in TOKEN_KINDS:
+            if token_type in parent:
+                kind = parent_kind
+                break
+        _kinds[token_type] = kind
+        return kind
+
+
+def lex_lines(job, text, language):
+    # Lex text with Pygments and return one (hash of line text, spans) entry
+    # per line, where spans are (start, length, kind) like Tokenizer.tokenize.
+    # pygments.lexers loads its plugin registry on import, so the editor only
+    # pays for it once a document is first lexed, off the UI thread.
+    from pygments.lexers import get_lexer_by_name
+    lexer = get_lexer_by_name(PYGMENTS_LEXERS.get(language, language),
+                              stripnl=False, ensurenl=False)
+    lines = text.split('\n')
+    spans = [[] for _ in lines]
+    line = 0
+    column = 0
+    for index, (token_type, value) in enumerate(lexer.get_tokens(text)):
+        if job is not None and not index % CHECK_INTERVAL:
+            job.check()
+        kind = kind_for(token_type)
+        for part_index, part in enumerate(value.split('\n')):
+            if part_index:
+                line += 1
+                column = 0
+            if kind is not None and part and line < len(spans):
+                line_spans = spans[line]
+                # Merge with the previous span when it is the same kind
+                if line_spans and line_spans[-1][2] == kind and sum(line_spans[-1][:2]) == column:
+                    start, length, _ = line_spans[-1]
+                    line_spans[-1] = (start, length + len(part), kind)
+                else:
+                    line_spans.append((column, len(part), kind))
+            column += len(part)
+    return [(hash(lines[n]), spans[n]) for n in range(len(lines))]
+
+
+def lex_document(job, text, language, previous):
+    # Lex text and work out which lines need new formats: those whose spans
+    # differ from the previous run, or on the first run from what the regex
+    # tokenizer already painted
+    lines = lex_lines(job, text, language)
+    if previous is None:
+        tokenizer = get_tokenizer(language)
+        previous = []
+        state = 0
+        for line in text.split('\n'):
+            spans, state = tokenizer.tokenize(line, state)
+            previous.append((hash(line), spans))
+        if job is not None:
+            job.check()
+    changed = [n for n, entry in enumerate(lines)
+               if n >= len(previous) or previous[n] != entry]
+    return lines, changed
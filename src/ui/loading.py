@@ -0,0 +1,90 @@
+import os
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+
+# Files at least this big are streamed into the editor instead of read whole
+STREAM_LOAD_BYTES = 4 * 1024 * 1024
+# Characters read from the file and appended to the document at a time
+LOAD_CHUNK_CHARS = 64 * 1024
+# Time budget for each loading slice, in seconds
+LOAD_SLICE = 0.03
+
+
+class StreamingLoader(QObject):
+    # Appends a file to an editor's document a chunk at a time from a timer,
+    # so only one chunk of text is ever held outside the document and the
+    # event loop runs between slices. The editor is read-only until done.
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, editor, path, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.path = path
+        self.file = None
+        self.done = 0
+        self.total = 0
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.load_slice)
+
+    @property
+    def running(self):
+        return self.file is not None
+
+    def start(self):
+        self.total = os.path.getsize(self.path)
+        self.file = open(self.path, 'r', encoding='utf-8')
+        # Undo history for the load itself would double the memory used
+        self.editor.document().setUndoRedoEnabled(False)
+        self.editor.setReadOnly(True)
+        self.timer.start()
+
+    def cancel(self):
+        self.stop()
+
+    def stop(self):
+        self.timer.stop()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        document = self.editor.document()
+        document.setUndoRedoEnabled(True)
+        document.setModified(False)
+        self.editor.setReadOnly(False)
+
+    def load_slice(self):
+        document = self.editor.document()
+        deadline = time.perf_counter() + LOAD_SLICE
+        first_block = document.blockCount() - 1
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.End)
+        done = False
+
+        # The editor is told about the new blocks once per slice rather than
+        # reacting to every insert
+        blocked = document.blockSignals(True)
+        try:
+            while time.perf_counter() < deadline:
+                chunk = self.file.read(LOAD_CHUNK_CHARS)
+                if not chunk:
+                    done = True
+                    break
+                cursor.insertText(chunk)
+            position = self.file.buffer.tell()
+        except (OSError, UnicodeDecodeError) as e:
+            self.stop()
+            self.failed.emit(str(e))
+            return
+        finally:
+            document.blockSignals(blocked)
+        self.editor.text_appended(first_block)
+
+        self.done = self.total if done else min(position, self.total)
+        self.progress.emit(self.done, self.total)
+        if done:
+            self.stop()
+            self.finished.emit()
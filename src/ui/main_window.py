@@ -1,88 +1,574 @@
-from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                           QPushButton, QLabel, QMessageBox, QMenu, QAction,
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QHBoxLayout,
+                           QPushButton, QMessageBox, QAction,
                            QFileDialog, QTabWidget, QSplitter, QToolBar,
-                           QStatusBar, QTreeView, QFileSystemModel, QDialog,
-                           QLineEdit, QCheckBox, QComboBox, QTextEdit, QScrollBar)
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QIcon, QFont, QKeySequence, QSyntaxHighlighter, QTextCharFormat, QColor
+                           QStatusBar, QTreeView, QFileSystemModel,
+                           QPlainTextEdit, QProgressBar, QInputDialog,
+                           QDockWidget, QApplication, QFrame)
+from PyQt5.QtCore import (Qt, QSize, QTimer, QPoint, QSettings, QThreadPool,
+                          pyqtSignal)
+from PyQt5.QtGui import QFont, QKeySequence, QSyntaxHighlighter, QTextCursor
 import os
-import re
-from pygments import highlight
-from pygments.lexers import get_lexer_by_name, guess_lexer
-from pygments.formatters import get_formatter_by_name
+import time
+import zlib
+from .syntax import GENERIC, get_tokenizer, language_for_path
+from .appdata import APP_DIR_NAME
+from .explorer import EXPLORER_EXCLUDES, ExplorerFilter
+from .gutter import LineNumberGutter
+from .minimap import MINIMAP_WIDTH, Minimap
+from .project_files import ProjectFiles
+from .large_file_viewer import LargeFileViewer
+from .project_tree import ProjectTree
+from .tab_memory import HibernatedTab, TabLimitsDialog
+from .loading import STREAM_LOAD_BYTES, StreamingLoader
+from .saving import write_atomic
+from .session import load_session, save_session
+from .themes import DEFAULT_THEME, THEMES, theme_formats, theme_palette, theme_stylesheet
+from .workers import Worker, start_worker
+
+# Documents with more blocks than this are highlighted lazily
+LAZY_HIGHLIGHT_BLOCKS = 20000
+# Blocks highlighted above and below the viewport in lazy mode
+HIGHLIGHT_MARGIN = 50
+# Blocks highlighted before the editor knows its viewport size
+INITIAL_HIGHLIGHT_BLOCKS = 200
+# Time budget for each idle highlighting slice, in seconds
+HIGHLIGHT_SLICE = 0.01
+# Most blocks the idle pass hands to Qt in one go
+IDLE_BATCH_BLOCKS = 256
+# Idle time left to the event loop, relative to an overrunning slice
+IDLE_BACKOFF = 4
+# Block state for blocks that lazy mode skipped after highlighting them
+# before; blocks it has never reached keep Qt's default of -1
+UNHIGHLIGHTED = -2
+# Quiet time after an edit before Pygments re-lexes the document, in ms
+LEX_DELAY = 300
+# Edits spanning more lines than this, like a big Replace All and its undo,
+# are not highlighted on the spot but redone in idle slices, window first
+QUIET_EDIT_LINES = 2000
+# Files at least this big open read-only in a LargeFileViewer
+VIEWER_BYTES = 256 * 1024 * 1024
+# Quiet time after typing in the find dialog before searching, in ms
+SEARCH_DELAY = 150
+# Editor tabs kept loaded, and the memory they may take together, before the
+# least recently used ones are hibernated; both can be changed in settings
+MAX_LOADED_TABS = 10
+TAB_MEMORY_MB = 512
+# Rough memory of one editor line with its layout and highlighting, on top
+# of the text itself; measured on Python source
+EDITOR_BLOCK_BYTES = 1024
+# Quiet time after tabs change before the session file is written, in ms
+SESSION_SAVE_DELAY = 2000
+# Startup phases run from the event loop once the window is shown; the
+# startup profile is reported when both have finished
+DEFERRED_STARTUP_PHASES = ("project folder", "current tab")
+
+def document_key(path):
+    # Paths that name the same file, through symlinks or differences in case
+    # on case-insensitive systems, give the same key
+    return os.path.normcase(os.path.realpath(path))
+
 
 class CodeHighlighter(QSyntaxHighlighter):
-    def __init__(self, parent=None):
+    # Theme new highlighters start in; MainWindow.set_theme moves it along
+    # with the open editors
+    theme = DEFAULT_THEME
+    # Runs of blocks, [first, last], given new formats since the last pass
+    # of the event loop
+    blocks_formatted = pyqtSignal(list)
+
+    def __init__(self, parent=None, language=GENERIC):
         super().__init__(parent)
-        self.highlighting_rules = []
+        self.language = language
         self.setup_rules()
 
+        # Lazy mode: only blocks inside the window, or already reached by the
+        # idle pass, are highlighted; the rest are left with a negative state
+        self.lazy = False
+        self.window = (0, -1)
+        self.window_next = 0
+        self.highlighted_upto = -1
+        # Set when every block needs redoing, not just the skipped ones
+        self.stale = False
+        self.idle_batch = 1
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setInterval(0)
+        self.idle_timer.timeout.connect(self.highlight_idle_slice)
+
+        # Pygments pipeline: a worker lexes a snapshot of the document and
+        # token_lines caches its (line hash, spans) per block. Blocks whose
+        # spans changed are queued in dirty_blocks and reformatted by the
+        # idle slices.
+        self.token_lines = None
+        self.dirty_blocks = []
+        self.lex_job = None
+        self.lex_timer = QTimer(self)
+        self.lex_timer.setSingleShot(True)
+        self.lex_timer.setInterval(LEX_DELAY)
+        self.lex_timer.timeout.connect(self.start_lexing)
+        # Edits to the document so far. QTextDocument.revision() also moves
+        # whenever a block is reformatted, so it cannot tell edits apart.
+        self.edits = 0
+        # Blocks formatted so far this pass of the event loop, reported in one
+        # blocks_formatted signal rather than one per block
+        self.formatted = []
+        self.formatted_timer = QTimer(self)
+        self.formatted_timer.setSingleShot(True)
+        self.formatted_timer.setInterval(0)
+        self.formatted_timer.timeout.connect(self.report_formatted)
+        if self.document() is not None:
+            self.document().contentsChange.connect(self.document_changed)
+
     def setup_rules(self):
-        # Common keywords for multiple languages
-        keywords = {
-            'python': [
-                "and", "as", "assert", "break", "class", "continue", "def",
-                "del", "elif", "else", "except", "False", "finally", "for",
-                "from", "global", "if", "import", "in", "is", "lambda", "None",
-                "nonlocal", "not", "or", "pass", "raise", "return", "True",
-                "try", "while", "with", "yield"
-            ],
-            'javascript': [
-                "break", "case", "catch", "class", "const", "continue", "debugger",
-                "default", "delete", "do", "else", "export", "extends", "finally",
-                "for", "function", "if", "import", "in", "instanceof", "new", "return",
-                "super", "switch", "this", "throw", "try", "typeof", "var", "void",
-                "while", "with", "yield"
-            ],
-            'html': [
-                "html", "head", "body", "div", "span", "p", "a", "img", "script",
-                "style", "link", "meta", "title", "h1", "h2", "h3", "h4", "h5", "h6"
-            ]
-        }
-
-        # Set up colors with brighter colors for better visibility on black
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor("#569CD6"))  # Bright blue for keywords
-
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor("#CE9178"))  # Bright orange for strings
-
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor("#6A9955"))  # Bright green for comments
-
-        number_format = QTextCharFormat()
-        number_format.setForeground(QColor("#B5CEA8"))  # Bright light green for numbers
-
-        # Add rules for each language
-        for lang, lang_keywords in keywords.items():
-            for word in lang_keywords:
-                pattern = f"\\b{word}\\b"
-                self.highlighting_rules.append((pattern, keyword_format))
-
-        # Common patterns for all languages
-        self.highlighting_rules.extend([
-            ('".*"', string_format),  # Double quoted strings
-            ("'.*'", string_format),  # Single quoted strings
-            ("#.*", comment_format),  # Python comments
-            ("//.*", comment_format),  # Single line comments
-            ("/\\*.*\\*/", comment_format),  # Multi-line comments
-            ("\\b\\d+\\b", number_format),  # Numbers
-        ])
+        # Formats are built once per theme and rules compiled once per
+        # language, and both are shared by every highlighter
+        self.formats = theme_formats(self.theme)
+        self.tokenizer = get_tokenizer(self.language)
+
+    def set_language(self, language):
+        if language == self.language:
+            return
+        self.language = language
+        self.tokenizer = get_tokenizer(language)
+        self.token_lines = None
+        self.dirty_blocks = []
+        if self.lazy:
+            self.mark_stale()
+        else:
+            self.rehighlight()
+        self.schedule_lexing()
+
+    def set_theme(self, theme):
+        formats = theme_formats(theme)
+        if formats is self.formats:
+            return
+        self.formats = formats
+        # Block states stay the same, so blocks can be redone in any order:
+        # the window first, the rest in idle slices
+        if self.lazy:
+            self.mark_stale()
+        elif self.document() is not None:
+            self.queue_rehighlight(range(self.document().blockCount()))
+
+    def mark_stale(self):
+        # A full rehighlight would visit every block; let the idle pass
+        # redo the window first and then the rest
+        self.highlighted_upto = -1
+        self.window_next = self.window[0]
+        self.stale = True
+        self.idle_timer.setInterval(0)
+        self.idle_timer.start()
+
+    def set_lazy(self, lazy):
+        self.lazy = lazy
+        self.highlighted_upto = -1
+        self.stale = False
+        self.idle_batch = 1
+        self.window = (0, INITIAL_HIGHLIGHT_BLOCKS)
+        self.window_next = 0
+        if lazy:
+            self.idle_timer.start()
+        else:
+            self.idle_timer.stop()
+
+    def set_window(self, first, last):
+        # Skipped blocks that scroll into the window are picked up first by
+        # the next idle slice
+        self.window = (max(first, 0), last)
+        self.window_next = self.window[0]
+        if self.dirty_blocks:
+            self.queue_rehighlight([])
+        if self.lazy and self.document() is not None:
+            self.idle_timer.setInterval(0)
+            self.idle_timer.start()
+
+    def highlight_idle_slice(self):
+        document = self.document()
+        if document is None:
+            self.idle_timer.stop()
+            return
+        started = time.perf_counter()
+        deadline = started + HIGHLIGHT_SLICE
+
+        # Blocks whose Pygments spans changed, visible ones first
+        block_count = document.blockCount()
+        while self.dirty_blocks and time.perf_counter() < deadline:
+            number = self.dirty_blocks.pop()
+            if number < block_count:
+                self.rehighlightBlock(document.findBlockByNumber(number))
+        if not self.lazy:
+            if not self.dirty_blocks:
+                self.idle_timer.stop()
+            return
+
+        # Blocks in the window first, one at a time: highlightBlock only
+        # accepts window blocks up to window_next, so Qt cannot chain through
+        # the whole window in a single call
+        last = self.window[1]
+        block = document.findBlockByNumber(self.window_next)
+        while block.isValid() and self.window_next <= last and time.perf_counter() < deadline:
+            if self.stale or block.userState() < 0:
+                self.rehighlightBlock(block)
+            block = block.next()
+            self.window_next += 1
+        window_done = not block.isValid() or self.window_next > last
+
+        # Then the rest of the document top-down, so the entry state of every
+        # block eventually becomes exact. Rehighlighting the first skipped
+        # block of a batch lets Qt carry on through the rest of it in one
+        # reformat; the batch size adapts to what a block costs here.
+        number = self.highlighted_upto + 1
+        block = document.findBlockByNumber(number)
+        while block.isValid() and time.perf_counter() < deadline:
+            batch_started = time.perf_counter()
+            self.highlighted_upto = number + self.idle_batch - 1
+            while block.isValid() and number <= self.highlighted_upto:
+                if self.stale or block.userState() < 0:
+                    self.rehighlightBlock(block)
+                block = block.next()
+                number += 1
+            per_block = (time.perf_counter() - batch_started) / self.idle_batch
+            self.idle_batch = max(1, min(IDLE_BATCH_BLOCKS,
+                                         int(HIGHLIGHT_SLICE / 4 / max(per_block, 1e-7))))
+
+        if window_done and not block.isValid() and not self.dirty_blocks:
+            self.stale = False
+            self.idle_timer.stop()
+            return
+        # When a single block costs more than a slice, back off so the event
+        # loop still gets most of the time
+        elapsed = time.perf_counter() - started
+        if elapsed > 2 * HIGHLIGHT_SLICE:
+            self.idle_timer.setInterval(int(elapsed * 1000 * IDLE_BACKOFF))
+        else:
+            self.idle_timer.setInterval(0)
+
+    def text_appended(self, first_block):
+        # Text was appended with the document's signals blocked: the block it
+        # went into and everything after it still need highlighting
+        block = self.document().findBlockByNumber(first_block)
+        if block.isValid():
+            block.setUserState(-1)
+        self.highlighted_upto = min(self.highlighted_upto, first_block - 1)
+        if self.lazy:
+            self.idle_timer.setInterval(0)
+            self.idle_timer.start()
+        else:
+            self.rehighlight()
+
+    def text_replaced(self, first_block):
+        # Text from first_block on was replaced with the document's signals
+        # blocked, so none of it was highlighted
+        if self.lazy:
+            self.mark_stale()
+        else:
+            self.queue_rehighlight(range(first_block, self.document().blockCount()))
+
+    def queue_rehighlight(self, numbers):
+        # dirty_blocks is popped from the end, so sort the window there
+        first, last = self.window
+        self.dirty_blocks = sorted(set(self.dirty_blocks).union(numbers),
+                                   key=lambda n: (first <= n <= last, -n))
+        if self.dirty_blocks:
+            self.idle_timer.setInterval(0)
+            self.idle_timer.start()
+
+    def document_changed(self, position, removed, added):
+        self.edits += 1
+        # Keep token_lines aligned with the blocks: the edited blocks lose
+        # their cached spans until the next lexing run
+        if self.token_lines is not None:
+            document = self.document()
+            first = document.findBlock(position).blockNumber()
+            last = document.findBlock(position + added).blockNumber()
+            if last < 0:
+                last = document.blockCount() - 1
+            old_count = last - first + 1 - (document.blockCount() - len(self.token_lines))
+            self.token_lines[first:first + old_count] = [None] * (last - first + 1)
+        self.schedule_lexing()
+
+    def schedule_lexing(self):
+        if self.lex_job is not None:
+            self.lex_job.cancel()
+            self.lex_job = None
+        if self.language != GENERIC and not self.lazy:
+            self.lex_timer.start()
+
+    def start_lexing(self):
+        document = self.document()
+        if document is None or self.lazy or self.language == GENERIC:
+            return
+        # Imported on first use, like the dialogs and panels below, so that
+        # startup does not load what only some sessions need
+        from .lexing import lex_document
+        previous = list(self.token_lines) if self.token_lines is not None else None
+        job = Worker(lex_document, document.toPlainText(), self.language, previous)
+        job.edits = self.edits
+        job.signals.finished.connect(lambda result, job=job: self.apply_tokens(job, result))
+        self.lex_job = start_worker(job)
+
+    def apply_tokens(self, job, result):
+        # Results for an older version of the document are dropped; the
+        # edit that made them stale has already scheduled a new run
+        if job is not self.lex_job:
+            return
+        self.lex_job = None
+        document = self.document()
+        if document is None or job.edits != self.edits:
+            return
+        self.token_lines, changed = result
+        self.queue_rehighlight(changed)
+
+    def report_formatted(self):
+        if self.formatted:
+            runs = self.formatted
+            self.formatted = []
+            self.blocks_formatted.emit(runs)
 
     def highlightBlock(self, text):
-        for pattern, format in self.highlighting_rules:
-            for match in re.finditer(pattern, text):
-                start = match.start()
-                length = match.end() - start
-                self.setFormat(start, length, format)
+        number = self.currentBlock().blockNumber()
+        if self.lazy:
+            first, last = self.window
+            if number > self.highlighted_upto and not first <= number <= min(last, self.window_next):
+                # Leaving a never-highlighted block alone keeps its state
+                # unchanged, which stops Qt from walking on to the next one.
+                # While stale the idle pass redoes every block regardless.
+                if self.currentBlockState() >= 0 and not self.stale:
+                    self.setCurrentBlockState(UNHIGHLIGHTED)
+                return
+
+        # Each block starts in the state the previous one ended in. Qt only
+        # moves on to the next block when the state we store here changes,
+        # so an edit re-highlights just the blocks whose entry state changed.
+        # A skipped predecessor is treated as plain code until the idle pass
+        # reaches it.
+        state = self.previousBlockState()
+        if state < 0:
+            state = 0
+        spans, state = self.tokenizer.tokenize(text, state)
+        token_lines = self.token_lines
+        if token_lines is not None:
+            if number < len(token_lines):
+                entry = token_lines[number]
+                if entry is not None and entry[0] == hash(text):
+                    spans = entry[1]
+        formats = self.formats
+        for start, length, kind in spans:
+            self.setFormat(start, length, formats[kind])
+        self.setCurrentBlockState(state)
+        runs = self.formatted
+        if runs and runs[-1][0] <= number <= runs[-1][1] + 1:
+            runs[-1][1] = max(runs[-1][1], number)
+        else:
+            if not runs:
+                self.formatted_timer.start()
+            runs.append([number, number])
+
+class CodeEditor(QPlainTextEdit):
+    # Milliseconds from open_started to the first paint of the text
+    first_painted = pyqtSignal(float)
 
-class CodeEditor(QTextEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setup_editor()
         self.current_file = None
+        self.open_started = None
+        self.first_paint_ms = None
+        self.detect_job = None
+        self.loader = None
+        # Save in progress, and the path of a save requested while it runs
+        self.save_job = None
+        self.save_pending = None
+        # Set when the tab is closed while a save runs; the editor is deleted
+        # once the save is done
+        self.closed = False
+        # Find results, created by MainWindow on first search
+        self.search = None
+        # Edits made by replace_text with the document's signals blocked, by
+        # the undo steps available after them: (steps before, position,
+        # chars removed, chars added)
+        self.quiet_edits = {}
         self.highlighter = CodeHighlighter(self.document())
-        self.setup_scroll_buttons()
+        self.minimap = Minimap(self)
+        self.gutter = LineNumberGutter(self)
+        self.verticalScrollBar().valueChanged.connect(self.update_highlight_window)
+        self.document().undoCommandAdded.connect(self.undo_command_added)
+
+    def set_language(self, language):
+        self.highlighter.set_language(language)
+
+    def set_theme(self, theme):
+        self.highlighter.set_theme(theme)
+
+    def memory_estimate(self):
+        document = self.document()
+        return document.characterCount() * 2 + document.blockCount() * EDITOR_BLOCK_BYTES
+
+    def restore_view(self, anchor, position, scroll):
+        last = self.document().characterCount() - 1
+        cursor = self.textCursor()
+        cursor.setPosition(min(anchor, last))
+        cursor.setPosition(min(position, last), QTextCursor.KeepAnchor)
+        self.setTextCursor(cursor)
+        self.verticalScrollBar().setValue(scroll)
+
+    def release(self):
+        # Stops the background work still running for this editor before it
+        # is dropped
+        highlighter = self.highlighter
+        highlighter.idle_timer.stop()
+        highlighter.lex_timer.stop()
+        if highlighter.lex_job is not None:
+            highlighter.lex_job.cancel()
+            highlighter.lex_job = None
+        if self.detect_job is not None:
+            self.detect_job.cancel()
+            self.detect_job = None
+        if self.search is not None:
+            self.search.cancel()
+        self.minimap.release()
+
+    def set_lazy_highlighting(self, enabled):
+        self.highlighter.set_lazy(enabled)
+
+    def go_to_line(self, line):
+        block = self.document().findBlockByNumber(line - 1)
+        if block.isValid():
+            self.setTextCursor(QTextCursor(block))
+            self.centerCursor()
+
+    def setText(self, text):
+        # Always plain text, content that looks like HTML is not interpreted
+        self.quiet_edits = {}
+        if not self.highlighter.lazy:
+            self.setPlainText(text)
+            return
+        # Keep the highlighter from visiting every block while the text goes
+        # in; the idle slices pick up the visible window straight after
+        document = self.document()
+        blocked = document.blockSignals(True)
+        try:
+            self.setPlainText(text)
+        finally:
+            document.blockSignals(blocked)
+        self.highlighter.set_lazy(True)
+        self.gutter.update_width()
+        self.minimap.reset()
+
+    def text_appended(self, first_block):
+        # The streaming loader appended text with the document's signals
+        # blocked, so blockCountChanged never reached the gutter
+        self.highlighter.text_appended(first_block)
+        self.gutter.update_width()
+        self.minimap.lines_changed(first_block, self.document().blockCount() - 1)
+
+    def replace_text(self, start, end, text):
+        # One undoable edit replacing start to end with text. One spanning
+        # many lines goes in with the document's signals blocked, as setText
+        # does, and so do its undo and redo.
+        document = self.document()
+        cursor = QTextCursor(document)
+
+        def insert():
+            cursor.beginEditBlock()
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+            cursor.endEditBlock()
+        lines = max(text.count('\n'),
+                    document.findBlock(end).blockNumber() - document.findBlock(start).blockNumber())
+        if lines < QUIET_EDIT_LINES:
+            insert()
+            return
+        steps = document.availableUndoSteps()
+        # Positions count UTF-16 code units
+        added = len(text.encode('utf-16-le')) // 2
+        self.change_quietly(insert, start, end - start, added)
+        self.quiet_edits[document.availableUndoSteps()] = (steps, start, end - start, added)
+
+    def change_quietly(self, change, position, removed, added):
+        # Runs change() with the document's signals blocked, then tells the
+        # editor's own listeners what contentsChange would have
+        document = self.document()
+        blocked = document.blockSignals(True)
+        try:
+            change()
+        finally:
+            document.blockSignals(blocked)
+        self.highlighter.document_changed(position, removed, added)
+        self.highlighter.text_replaced(document.findBlock(position).blockNumber())
+        self.gutter.update_width()
+        self.minimap.document_changed(position, removed, added)
+        if self.search is not None:
+            self.search.document_changed(position, removed, added)
+
+    def undo_command_added(self):
+        # A new edit drops the steps that could have been redone
+        steps = self.document().availableUndoSteps()
+        self.quiet_edits = {after: edit for after, edit in self.quiet_edits.items() if after < steps}
+
+    def undo(self):
+        document = self.document()
+        edit = self.quiet_edits.get(document.availableUndoSteps())
+        if edit is None:
+            super().undo()
+            return
+        steps, position, removed, added = edit
+        cursor = self.textCursor()
+        self.change_quietly(lambda: document.undo(cursor), position, added, removed)
+        self.setTextCursor(cursor)
+
+    def redo(self):
+        document = self.document()
+        steps = document.availableUndoSteps()
+        for edit in self.quiet_edits.values():
+            if edit[0] == steps and document.isRedoAvailable():
+                position, removed, added = edit[1:]
+                cursor = self.textCursor()
+                self.change_quietly(lambda: document.redo(cursor), position, removed, added)
+                self.setTextCursor(cursor)
+                return
+        super().redo()
+
+    def keyPressEvent(self, event):
+        # Undo and redo go through undo() and redo(), which know the edits
+        # made with signals blocked
+        if not self.isReadOnly() and event.matches(QKeySequence.Undo):
+            self.undo()
+        elif not self.isReadOnly() and event.matches(QKeySequence.Redo):
+            self.redo()
+        else:
+            super().keyPressEvent(event)
+
+    def contextMenuEvent(self, event):
+        menu = self.createStandardContextMenu(event.pos())
+        for action in menu.actions():
+            if action.objectName() in ('edit-undo', 'edit-redo'):
+                action.triggered.disconnect()
+                action.triggered.connect(
+                    self.undo if action.objectName() == 'edit-undo' else self.redo)
+        menu.exec_(event.globalPos())
+        menu.deleteLater()
+
+    def set_left_margin(self, width):
+        # Room for the gutter left of the viewport and the minimap right of it
+        self.setViewportMargins(width, 0, MINIMAP_WIDTH, 0)
+        self.minimap.update_geometry()
+
+    def visible_block_range(self):
+        first = self.firstVisibleBlock().blockNumber()
+        last = self.cursorForPosition(QPoint(0, self.viewport().height() - 1)).blockNumber()
+        return first, last
+
+    def update_highlight_window(self):
+        first, last = self.visible_block_range()
+        self.highlighter.set_window(first - HIGHLIGHT_MARGIN, last + HIGHLIGHT_MARGIN)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.open_started is not None:
+            self.first_paint_ms = (time.perf_counter() - self.open_started) * 1000
+            self.open_started = None
+            self.first_painted.emit(self.first_paint_ms)
 
     def setup_editor(self):
         # Set the default font
@@ -93,122 +579,35 @@ class CodeEditor(QTextEdit):
         self.setTabStopWidth(40)
         
         # Enable line wrap
-        self.setLineWrapMode(QTextEdit.NoWrap)
-        
-        # Set dark gray theme colors
-        self.setStyleSheet("""
-            QTextEdit {
-                background-color: #1E1E1E;
-                color: #D4D4D4;
-                border: none;
-                selection-background-color: #264F78;
-                selection-color: #FFFFFF;
-            }
-            QScrollBar:vertical {
-                background-color: #1E1E1E;
-                width: 14px;
-                margin: 0px;
-            }
-            QScrollBar::handle:vertical {
-                background-color: #424242;
-                min-height: 20px;
-                border-radius: 7px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background-color: #4F4F4F;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background: none;
-            }
-        """)
-
-    def setup_scroll_buttons(self):
-        # Create scroll buttons
-        self.scroll_up_btn = QPushButton("▲", self)
-        self.scroll_down_btn = QPushButton("▼", self)
-        
-        # Style the buttons
-        button_style = """
-            QPushButton {
-                background-color: #252526;
-                color: #D4D4D4;
-                border: 1px solid #333333;
-                border-radius: 3px;
-                padding: 2px;
-                min-width: 20px;
-                max-width: 20px;
-                min-height: 20px;
-                max-height: 20px;
-            }
-            QPushButton:hover {
-                background-color: #2D2D2D;
-            }
-        """
-        self.scroll_up_btn.setStyleSheet(button_style)
-        self.scroll_down_btn.setStyleSheet(button_style)
-        
-        # Connect buttons to scroll functions
-        self.scroll_up_btn.clicked.connect(self.scroll_up)
-        self.scroll_down_btn.clicked.connect(self.scroll_down)
-        
-        # Position the buttons
-        self.scroll_up_btn.move(self.width() - 25, 5)
-        self.scroll_down_btn.move(self.width() - 25, self.height() - 25)
-        
-        # Show the buttons
-        self.scroll_up_btn.show()
-        self.scroll_down_btn.show()
-
-    def scroll_up(self):
-        self.verticalScrollBar().setValue(
-            self.verticalScrollBar().value() - self.verticalScrollBar().singleStep()
-        )
-
-    def scroll_down(self):
-        self.verticalScrollBar().setValue(
-            self.verticalScrollBar().value() + self.verticalScrollBar().singleStep()
-        )
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        
+        # Colors come from the palette MainWindow.set_theme gives the class
+        self.setFrameShape(QFrame.NoFrame)
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        # Update button positions when window is resized
-        self.scroll_up_btn.move(self.width() - 25, 5)
-        self.scroll_down_btn.move(self.width() - 25, self.height() - 25)
-
-class FindDialog(QDialog):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Find")
-        self.setModal(True)
-        layout = QVBoxLayout(self)
-        
-        # Find text
-        self.find_text = QLineEdit()
-        layout.addWidget(self.find_text)
-        
-        # Options
-        self.case_sensitive = QCheckBox("Case sensitive")
-        self.whole_word = QCheckBox("Whole word")
-        layout.addWidget(self.case_sensitive)
-        layout.addWidget(self.whole_word)
-        
-        # Buttons
-        button_layout = QHBoxLayout()
-        self.find_button = QPushButton("Find")
-        self.find_button.clicked.connect(self.accept)
-        self.cancel_button = QPushButton("Cancel")
-        self.cancel_button.clicked.connect(self.reject)
-        button_layout.addWidget(self.find_button)
-        button_layout.addWidget(self.cancel_button)
-        layout.addLayout(button_layout)
+        self.gutter.update_geometry()
+        self.minimap.update_geometry()
+        self.update_highlight_window()
+        if self.search is not None:
+            self.search.refresh_selections()
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, profile=None):
         super().__init__()
+        # StartupProfile that init_ui reports its phases to, if any
+        self.profile = profile
+        self.startup_pending = set(DEFERRED_STARTUP_PHASES)
         self.init_ui()
+
+    def mark_startup(self, phase):
+        if self.profile is None:
+            return
+        self.profile.mark(phase)
+        # The report waits for the work deferred until the window is up
+        self.startup_pending.discard(phase)
+        if phase in DEFERRED_STARTUP_PHASES and not self.startup_pending:
+            self.profile.report()
         
     def init_ui(self):
         self.setWindowTitle("Code Editor")
@@ -219,19 +618,37 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(central_widget)
         layout = QHBoxLayout(central_widget)
         
-        # Create file explorer
+        self.settings = QSettings(APP_DIR_NAME, APP_DIR_NAME)
+
+        # Create file explorer. It shows the project folder once one is
+        # open; the model is created then, and only lists and watches
+        # folders that are expanded.
         self.file_explorer = QTreeView()
-        self.file_model = QFileSystemModel()
-        self.file_model.setRootPath("")
-        self.file_explorer.setModel(self.file_model)
-        self.file_explorer.setRootIndex(self.file_model.index(""))
+        self.file_model = None
+        self.explorer_filter = ExplorerFilter(self)
+        self.explorer_filter.set_excludes(self.settings.value("explorer/excludes",
+                                                              list(EXPLORER_EXCLUDES), type=list))
+        self.project_root = None
         self.file_explorer.setMinimumWidth(200)
+        # Tab of each open file, by document_key, so a file is only ever
+        # loaded once
+        self.open_documents = {}
         self.file_explorer.clicked.connect(self.open_file)
         
         # Create editor area
         self.editor_tabs = QTabWidget()
         self.editor_tabs.setTabsClosable(True)
         self.editor_tabs.tabCloseRequested.connect(self.close_tab)
+        # Editor tabs, least recently shown first. Connected before anything
+        # else so a hibernated tab is back before other slots look at it.
+        self.tab_history = []
+        self.editor_tabs.currentChanged.connect(self.tab_activated)
+        self.max_loaded_tabs = self.settings.value("tabs/max_loaded", MAX_LOADED_TABS, type=int)
+        self.tab_memory_mb = self.settings.value("tabs/memory_mb", TAB_MEMORY_MB, type=int)
+        # Applied while the window is still mostly empty; every widget
+        # created after this is styled from the application stylesheet
+        self.set_theme(self.settings.value("view/theme", DEFAULT_THEME))
+        self.mark_startup("explorer and tabs")
         
         # Create splitter
         splitter = QSplitter(Qt.Horizontal)
@@ -242,17 +659,66 @@ class MainWindow(QMainWindow):
         
         # Create toolbar
         self.create_toolbar()
+        self.mark_startup("toolbar")
         
         # Create status bar
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
         self.statusBar.showMessage("Ready")
+        # Progress of streamed file loads, shown for the current tab
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.setRange(0, 100)
+        self.load_cancel = QPushButton("Cancel")
+        self.load_cancel.clicked.connect(self.cancel_loading)
+        self.statusBar.addPermanentWidget(self.load_progress)
+        self.statusBar.addPermanentWidget(self.load_cancel)
+        self.load_progress.hide()
+        self.load_cancel.hide()
+        self.editor_tabs.currentChanged.connect(self.update_load_status)
+
+        # The find dialog is created on first use and searches as you type
+        self.find_dialog = None
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.update_search)
+        self.editor_tabs.currentChanged.connect(self.update_search)
+        # Find in Files lives in a bottom dock, also created on first use
+        self.find_in_files_dock = None
+        # Every file and folder of the project folder, listed and watched once
+        # for both Go to File and the Find in Files index
+        self.project_tree = ProjectTree(self)
+        self.project_files = ProjectFiles(self.project_tree, self)
+        self.quick_open_dialog = None
+        self.mark_startup("status bar")
         
         # Create menu bar
         self.create_menubar()
         
         # Setup keyboard shortcuts
         self.setup_shortcuts()
+        self.mark_startup("menus and shortcuts")
+
+        # Reopen the tabs of the last session, as placeholders, and the last
+        # project folder once the window is up, since listing it and building
+        # the explorer model can take a while
+        self.session_timer = QTimer(self)
+        self.session_timer.setSingleShot(True)
+        self.session_timer.setInterval(SESSION_SAVE_DELAY)
+        self.session_timer.timeout.connect(self.save_session)
+        self.restore_session()
+        self.reopen_timer = QTimer(self)
+        self.reopen_timer.setSingleShot(True)
+        self.reopen_timer.timeout.connect(self.reopen_folder)
+        self.reopen_timer.start(0)
+        self.mark_startup("session")
+
+    def reopen_folder(self):
+        root = self.settings.value("project/root", "")
+        if root and os.path.isdir(root) and self.project_root is None:
+            self.open_folder(root)
+        self.mark_startup("project folder")
         
     def create_toolbar(self):
         toolbar = QToolBar()
@@ -301,7 +767,7 @@ class MainWindow(QMainWindow):
         
         # Find action
         find_action = QAction("Find", self)
-        find_action.triggered.connect(self.show_find_dialog)
+        find_action.triggered.connect(lambda: self.show_find_dialog())
         find_action.setShortcut(QKeySequence.Find)
         toolbar.addAction(find_action)
         
@@ -326,6 +792,16 @@ class MainWindow(QMainWindow):
         open_action.triggered.connect(self.open_file_dialog)
         open_action.setShortcut(QKeySequence.Open)
         file_menu.addAction(open_action)
+
+        open_folder_action = QAction("Open Folder...", self)
+        open_folder_action.triggered.connect(self.open_folder_dialog)
+        open_folder_action.setShortcut(QKeySequence("Ctrl+K, Ctrl+O"))
+        file_menu.addAction(open_folder_action)
+
+        go_to_file_action = QAction("Go to File...", self)
+        go_to_file_action.triggered.connect(self.show_quick_open)
+        go_to_file_action.setShortcut(QKeySequence("Ctrl+P"))
+        file_menu.addAction(go_to_file_action)
         
         save_action = QAction("Save", self)
         save_action.triggered.connect(self.save_file)
@@ -360,7 +836,7 @@ class MainWindow(QMainWindow):
         edit_menu.addSeparator()
         
         find_action = QAction("Find", self)
-        find_action.triggered.connect(self.show_find_dialog)
+        find_action.triggered.connect(lambda: self.show_find_dialog())
         find_action.setShortcut(QKeySequence.Find)
         edit_menu.addAction(find_action)
         
@@ -368,136 +844,240 @@ class MainWindow(QMainWindow):
         replace_action.triggered.connect(self.show_replace_dialog)
         replace_action.setShortcut(QKeySequence.Replace)
         edit_menu.addAction(replace_action)
+
+        find_in_files_action = QAction("Find in Files", self)
+        find_in_files_action.triggered.connect(self.show_find_in_files)
+        find_in_files_action.setShortcut(QKeySequence("Ctrl+Shift+F"))
+        edit_menu.addAction(find_in_files_action)
+
+        go_to_line_action = QAction("Go to Line", self)
+        go_to_line_action.triggered.connect(self.show_go_to_line)
+        go_to_line_action.setShortcut(QKeySequence("Ctrl+G"))
+        edit_menu.addAction(go_to_line_action)
         
         # View menu
         view_menu = menubar.addMenu("View")
         
         # Theme selection
         theme_menu = view_menu.addMenu("Theme")
-        themes = ["Light", "Dark"]
-        for theme in themes:
+        for theme in THEMES:
             action = QAction(theme, self)
             action.triggered.connect(lambda checked, t=theme: self.set_theme(t))
             theme_menu.addAction(action)
+
+        view_menu.addSeparator()
+        tab_limits_action = QAction("Tab Memory...", self)
+        tab_limits_action.triggered.connect(self.edit_tab_limits)
+        view_menu.addAction(tab_limits_action)
+        excludes_action = QAction("Explorer Excludes...", self)
+        excludes_action.triggered.connect(self.edit_explorer_excludes)
+        view_menu.addAction(excludes_action)
             
     def setup_shortcuts(self):
         # Add any additional keyboard shortcuts here
         pass
         
-    def show_find_dialog(self):
-        dialog = FindDialog(self)
-        if dialog.exec_() == QDialog.Accepted:
-            self.find_text(dialog.find_text.text(), 
-                         dialog.case_sensitive.isChecked(),
-                         dialog.whole_word.isChecked())
+    def show_find_dialog(self, replace=False):
+        if self.find_dialog is None:
+            from .find_replace import FindDialog
+            dialog = FindDialog(self)
+            for signal in (dialog.find_text.textChanged, dialog.case_sensitive.toggled,
+                           dialog.whole_word.toggled, dialog.regex.toggled):
+                signal.connect(lambda *args: self.search_timer.start())
+            dialog.find_button.clicked.connect(lambda: self.find_next())
+            dialog.previous_button.clicked.connect(lambda: self.find_next(backward=True))
+            dialog.replace_button.clicked.connect(self.replace_next)
+            dialog.replace_all_button.clicked.connect(self.replace_all)
+            dialog.finished.connect(self.end_search)
+            self.find_dialog = dialog
+        self.find_dialog.set_replace_mode(replace)
+        self.find_dialog.show()
+        self.find_dialog.raise_()
+        self.find_dialog.activateWindow()
+        self.find_dialog.find_text.selectAll()
+        self.find_dialog.find_text.setFocus()
+        self.update_search()
+
+    def search_for(self, editor):
+        if editor.search is None:
+            from .find_replace import SearchSession
+            editor.search = SearchSession(editor)
+            editor.search.changed.connect(self.update_match_count)
+            editor.search.replaced.connect(self.show_replaced)
+            editor.search.replace_failed.connect(
+                lambda message: self.statusBar.showMessage(f"Replace failed: {message}"))
+        return editor.search
+
+    def update_search(self):
+        # Runs a short while after the last change to the find dialog
+        editor = self.editor_tabs.currentWidget()
+        if self.find_dialog is None or not self.find_dialog.isVisible():
+            return
+        if isinstance(editor, CodeEditor):
+            self.search_for(editor).set_query(*self.find_dialog.options())
+        self.update_match_count()
+
+    def update_match_count(self):
+        if self.find_dialog is None:
+            return
+        editor = self.editor_tabs.currentWidget()
+        if isinstance(editor, CodeEditor) and editor.search is not None:
+            self.find_dialog.match_count.setText(editor.search.status())
+        else:
+            self.find_dialog.match_count.setText("")
+
+    def find_next(self, backward=False):
+        editor = self.editor_tabs.currentWidget()
+        if not isinstance(editor, CodeEditor):
+            return
+        if self.search_timer.isActive():
+            self.search_timer.stop()
+            self.update_search()
+        if editor.search is not None:
+            editor.search.find_next(backward)
+
+    def replace_next(self):
+        editor = self.editor_tabs.currentWidget()
+        if not isinstance(editor, CodeEditor):
+            return
+        if self.search_timer.isActive():
+            self.search_timer.stop()
+            self.update_search()
+        if editor.search is not None:
+            editor.search.replace_current(self.find_dialog.replace_text.text())
+
+    def replace_all(self):
+        editor = self.editor_tabs.currentWidget()
+        if not isinstance(editor, CodeEditor):
+            return
+        if self.search_timer.isActive():
+            self.search_timer.stop()
+            self.update_search()
+        if editor.search is not None and editor.search.pattern is not None:
+            self.statusBar.showMessage("Replacing...")
+            editor.search.replace_all(self.find_dialog.replace_text.text())
+
+    def show_replaced(self, count, elapsed):
+        if count == 1:
+            self.statusBar.showMessage(f"Replaced 1 occurrence in {elapsed:.0f} ms")
+        else:
+            self.statusBar.showMessage(f"Replaced {count:,} occurrences in {elapsed:.0f} ms")
+
+    def end_search(self):
+        # Closing the dialog drops the highlighted matches everywhere
+        for index in range(self.editor_tabs.count()):
+            editor = self.editor_tabs.widget(index)
+            if isinstance(editor, CodeEditor) and editor.search is not None:
+                editor.search.clear()
                          
+    def show_go_to_line(self):
+        current = self.editor_tabs.currentWidget()
+        if isinstance(current, LargeFileViewer):
+            line_count = current.line_count()
+        elif isinstance(current, CodeEditor):
+            line_count = current.document().blockCount()
+        else:
+            return
+        line, ok = QInputDialog.getInt(self, "Go to Line", f"Line (1-{line_count}):",
+                                       1, 1, line_count)
+        if ok:
+            current.go_to_line(line)
+
+    def show_find_in_files(self):
+        if self.find_in_files_dock is None:
+            # Brings in the process pool and the trigram index
+            from .find_in_files_panel import FindInFilesPanel
+            panel = FindInFilesPanel(self.project_tree)
+            panel.result_activated.connect(self.open_search_result)
+            dock = QDockWidget("Find in Files", self)
+            dock.setObjectName("find_in_files")
+            dock.setWidget(panel)
+            self.addDockWidget(Qt.BottomDockWidgetArea, dock)
+            self.find_in_files_dock = dock
+        panel = self.find_in_files_dock.widget()
+        if not panel.root_text.text():
+            # Start from the project folder, or the folder of the file being edited
+            current = getattr(self.editor_tabs.currentWidget(), 'current_file', None)
+            if self.project_root is not None:
+                panel.set_root(self.project_root)
+            else:
+                panel.set_root(os.path.dirname(current) if current else os.getcwd())
+        editor = self.editor_tabs.currentWidget()
+        if isinstance(editor, CodeEditor) and editor.textCursor().hasSelection():
+            selected = editor.textCursor().selectedText()
+            if '\u2029' not in selected:
+                panel.find_text.setText(selected)
+        self.find_in_files_dock.show()
+        self.find_in_files_dock.raise_()
+        panel.find_text.selectAll()
+        panel.find_text.setFocus()
+
+    def show_quick_open(self):
+        if self.project_root is None:
+            self.statusBar.showMessage("Open a folder to go to its files")
+            return
+        if self.quick_open_dialog is None:
+            from .quick_open import QuickOpenDialog
+            self.quick_open_dialog = QuickOpenDialog(self.project_files, self)
+            self.quick_open_dialog.file_chosen.connect(self.open_file_by_path)
+        self.quick_open_dialog.show()
+        self.quick_open_dialog.raise_()
+        self.quick_open_dialog.activateWindow()
+
+    def open_search_result(self, path, line, column, length):
+        self.open_file_by_path(path)
+        widget = self.editor_tabs.currentWidget()
+        if line <= 0 or getattr(widget, 'document_key', None) != document_key(path):
+            return
+        if isinstance(widget, CodeEditor):
+            block = widget.document().findBlockByNumber(line - 1)
+            if not block.isValid():
+                return
+            cursor = QTextCursor(block)
+            cursor.setPosition(block.position() + min(column, block.length() - 1))
+            cursor.setPosition(min(cursor.position() + length, block.position() + block.length() - 1),
+                               QTextCursor.KeepAnchor)
+            widget.setTextCursor(cursor)
+            widget.centerCursor()
+        else:
+            widget.go_to_line(line)
+
     def show_replace_dialog(self):
-        # Similar to find dialog but with replace functionality
-        pass
+        self.show_find_dialog(replace=True)
         
-    def find_text(self, text, case_sensitive=False, whole_word=False):
+    def find_text(self, text, case_sensitive=False, whole_word=False, regex=False):
+        # Select the next match after the cursor, once the search is done
         current_editor = self.editor_tabs.currentWidget()
-        if current_editor:
-            cursor = current_editor.document().find(text, current_editor.textCursor())
-            if not cursor.isNull():
-                current_editor.setTextCursor(cursor)
+        if isinstance(current_editor, CodeEditor):
+            search = self.search_for(current_editor)
+            search.set_query(text, case_sensitive, whole_word, regex)
+            search.find_next()
             
     def set_theme(self, theme):
-        if theme == "Dark":
-            self.setStyleSheet("""
-                QMainWindow, QWidget {
-                    background-color: #1E1E1E;
-                    color: #D4D4D4;
-                }
-                QTabWidget::pane {
-                    border: 1px solid #333333;
-                    background-color: #1E1E1E;
-                }
-                QTabBar::tab {
-                    background-color: #252526;
-                    color: #D4D4D4;
-                    padding: 8px 12px;
-                    border: 1px solid #333333;
-                }
-                QTabBar::tab:selected {
-                    background-color: #2D2D2D;
-                }
-                QTreeView {
-                    background-color: #1E1E1E;
-                    color: #D4D4D4;
-                    border: 1px solid #333333;
-                }
-                QTreeView::item:selected {
-                    background-color: #2D2D2D;
-                }
-                QStatusBar {
-                    background-color: #1E1E1E;
-                    color: #D4D4D4;
-                }
-                QToolBar {
-                    background-color: #1E1E1E;
-                    border: none;
-                }
-                QMenuBar {
-                    background-color: #1E1E1E;
-                    color: #D4D4D4;
-                }
-                QMenuBar::item:selected {
-                    background-color: #2D2D2D;
-                }
-                QMenu {
-                    background-color: #1E1E1E;
-                    color: #D4D4D4;
-                }
-                QMenu::item:selected {
-                    background-color: #2D2D2D;
-                }
-                QPushButton {
-                    background-color: #252526;
-                    color: #D4D4D4;
-                    border: 1px solid #333333;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #2D2D2D;
-                }
-                QLineEdit {
-                    background-color: #252526;
-                    color: #D4D4D4;
-                    border: 1px solid #333333;
-                    padding: 5px;
-                }
-                QScrollBar:vertical {
-                    background-color: #1E1E1E;
-                    width: 14px;
-                    margin: 0px;
-                }
-                QScrollBar::handle:vertical {
-                    background-color: #424242;
-                    min-height: 20px;
-                    border-radius: 7px;
-                }
-                QScrollBar::handle:vertical:hover {
-                    background-color: #4F4F4F;
-                }
-                QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                    height: 0px;
-                }
-                QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                    background: none;
-                }
-                QSplitter::handle {
-                    background-color: #333333;
-                }
-                QSplitter::handle:horizontal {
-                    width: 2px;
-                }
-                QSplitter::handle:vertical {
-                    height: 2px;
-                }
-            """)
-        else:
-            self.setStyleSheet("")
+        # Editors and viewers take their colors from a palette set once on
+        # the application for their class, so new tabs cost nothing to
+        # style; only the rest of the window uses a stylesheet. Both are
+        # built once per theme.
+        if theme not in THEMES:
+            theme = DEFAULT_THEME
+        self.theme = theme
+        self.settings.setValue("view/theme", theme)
+        app = QApplication.instance()
+        palette = theme_palette(theme, app.palette())
+        for class_name in ("CodeEditor", "LargeFileViewer"):
+            app.setPalette(palette, class_name)
+        stylesheet = theme_stylesheet(theme)
+        if self.styleSheet() != stylesheet:
+            self.setStyleSheet(stylesheet)
+        # Token colors: editors created from now on start with the theme's
+        # formats and open ones redo their visible blocks first, starting
+        # with the current tab so its idle slices run ahead of the others
+        CodeHighlighter.theme = theme
+        current = self.editor_tabs.currentWidget()
+        widgets = [self.editor_tabs.widget(index) for index in range(self.editor_tabs.count())]
+        for widget in sorted(widgets, key=lambda widget: widget is not current):
+            if isinstance(widget, (CodeEditor, LargeFileViewer)):
+                widget.set_theme(theme)
             
     def new_file(self):
         editor = CodeEditor()
@@ -514,37 +1094,379 @@ class MainWindow(QMainWindow):
         if file_name:
             self.open_file_by_path(file_name)
             
+    def open_folder_dialog(self):
+        folder = QFileDialog.getExistingDirectory(self, "Open Folder", self.project_root or "")
+        if folder:
+            self.open_folder(folder)
+
+    def open_folder(self, folder):
+        folder = os.path.abspath(folder)
+        self.project_root = folder
+        self.settings.setValue("project/root", folder)
+        if self.file_model is None:
+            self.file_model = QFileSystemModel(self)
+            self.explorer_filter.setSourceModel(self.file_model)
+            self.file_explorer.setModel(self.explorer_filter)
+        self.explorer_filter.set_root(folder)
+        source = self.file_model.setRootPath(folder)
+        self.file_explorer.setRootIndex(self.explorer_filter.mapFromSource(source))
+        self.setWindowTitle(f"{os.path.basename(folder) or folder} - Code Editor")
+        self.project_tree.open(folder, self.explorer_filter.excludes)
+        # Find in Files and its index follow the project folder
+        if self.find_in_files_dock is not None:
+            self.find_in_files_dock.widget().set_root(folder)
+
+    def edit_explorer_excludes(self):
+        text, ok = QInputDialog.getMultiLineText(
+            self, "Explorer Excludes",
+            "Names or paths to hide, one glob per line (a trailing / marks a folder):",
+            "\n".join(self.explorer_filter.excludes))
+        if ok:
+            excludes = [line.strip() for line in text.splitlines() if line.strip()]
+            self.explorer_filter.set_excludes(excludes)
+            self.settings.setValue("explorer/excludes", excludes)
+            if self.project_root is not None:
+                self.project_tree.open(self.project_root, excludes)
+
     def open_file(self, index):
+        index = self.explorer_filter.mapToSource(index)
         file_path = self.file_model.filePath(index)
         if not self.file_model.isDir(index):
             self.open_file_by_path(file_path)
             
     def open_file_by_path(self, file_path):
+        key = document_key(file_path)
+        widget = self.open_documents.get(key)
+        if widget is not None:
+            self.editor_tabs.setCurrentWidget(widget)
+            self.statusBar.showMessage(f"Switched to {widget.current_file}")
+            return
         try:
+            started = time.perf_counter()
+            size = os.path.getsize(file_path)
+            if size >= VIEWER_BYTES:
+                self.open_in_viewer(file_path)
+                return
+            self.load_file(file_path, size, started)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not open file: {str(e)}")
+
+    def load_file(self, file_path, size, started, index=-1):
+        # Big files are streamed in after the tab is up rather than read
+        # into one string first
+        streamed = size >= STREAM_LOAD_BYTES
+        if not streamed:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-                
-            editor = CodeEditor()
-            editor.setText(content)
-            editor.current_file = file_path
-            
-            # Add tab with file name
-            self.editor_tabs.addTab(editor, os.path.basename(file_path))
-            self.editor_tabs.setCurrentWidget(editor)
             
+        editor = CodeEditor()
+        editor.open_started = started
+        editor.first_painted.connect(
+            lambda ms, path=file_path: self.statusBar.showMessage(
+                f"Opened {path} ({ms:.0f} ms to first paint)"))
+        # Pick the rule set before the text goes in so it is highlighted once
+        language = language_for_path(file_path)
+        editor.set_language(language)
+        # Big files only highlight what is on screen up front
+        if streamed or content.count('\n') >= LAZY_HIGHLIGHT_BLOCKS:
+            editor.set_lazy_highlighting(True)
+        if not streamed:
+            editor.setText(content)
+        editor.current_file = file_path
+        
+        # Add tab with file name
+        self.editor_tabs.insertTab(index, editor, os.path.basename(file_path))
+        self.register_document(editor, file_path)
+        self.editor_tabs.setCurrentWidget(editor)
+        
+        if streamed:
+            self.start_loading(editor, file_path)
+        else:
             self.statusBar.showMessage(f"Opened {file_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not open file: {str(e)}")
+        if language == GENERIC:
+            self.start_language_detection(editor, file_path)
+        return editor
+
+    def open_in_viewer(self, file_path, index=-1):
+        viewer = LargeFileViewer(file_path, self.theme)
+        viewer.index_progress.connect(
+            lambda fraction, viewer=viewer: self.show_index_progress(viewer, fraction))
+        self.editor_tabs.insertTab(index, viewer, os.path.basename(file_path))
+        self.register_document(viewer, file_path)
+        self.editor_tabs.setCurrentWidget(viewer)
+        viewer.start_indexing()
+        self.statusBar.showMessage(f"Opened {file_path} read-only, indexing lines")
+        if viewer.language == GENERIC:
+            self.start_language_detection(viewer, file_path)
+        return viewer
+
+    def tab_activated(self, index):
+        widget = self.editor_tabs.widget(index)
+        if widget is None:
+            return
+        if isinstance(widget, HibernatedTab):
+            self.wake_tab(widget)
+            return
+        if widget in self.tab_history:
+            self.tab_history.remove(widget)
+        self.tab_history.append(widget)
+        self.hibernate_tabs()
+        self.session_timer.start()
+
+    def hibernate_tabs(self):
+        # Unload least recently shown editors while there are too many loaded
+        # or they take more than their share of memory. Tabs busy loading,
+        # saving or replacing are left alone.
+        loaded = [widget for widget in self.tab_history if isinstance(widget, CodeEditor)]
+        count = len(loaded)
+        memory = sum(editor.memory_estimate() for editor in loaded)
+        limit = self.tab_memory_mb * 1024 * 1024
+        current = self.editor_tabs.currentWidget()
+        for editor in loaded:
+            if count <= self.max_loaded_tabs and memory <= limit:
+                break
+            if (editor is current or editor.loader is not None or editor.save_job is not None
+                    or (editor.search is not None and editor.search.replace_job is not None)):
+                continue
+            count -= 1
+            memory -= editor.memory_estimate()
+            self.hibernate_tab(editor)
+
+    def hibernate_tab(self, editor):
+        tab = HibernatedTab.from_editor(editor)
+        index = self.editor_tabs.indexOf(editor)
+        self.swap_tab(editor, tab, index)
+        editor.release()
+        editor.deleteLater()
+
+    def wake_tab(self, tab):
+        index = self.editor_tabs.indexOf(tab)
+        title = self.editor_tabs.tabText(index)
+        error = None
+        blocked = self.editor_tabs.blockSignals(True)
+        try:
+            if tab.text is None:
+                # Unmodified: read the file again, like opening it
+                self.editor_tabs.removeTab(index)
+                try:
+                    size = os.path.getsize(tab.current_file)
+                    if size >= VIEWER_BYTES:
+                        editor = self.open_in_viewer(tab.current_file, index)
+                    else:
+                        editor = self.load_file(tab.current_file, size, time.perf_counter(), index)
+                except Exception as e:
+                    error = e
+                else:
+                    self.tab_history = [editor if widget is tab else widget
+                                        for widget in self.tab_history]
+            else:
+                editor = CodeEditor()
+                editor.set_language(tab.language)
+                text = zlib.decompress(tab.text).decode('utf-8')
+                if text.count('\n') >= LAZY_HIGHLIGHT_BLOCKS:
+                    editor.set_lazy_highlighting(True)
+                editor.setText(text)
+                editor.current_file = tab.current_file
+                editor.document().setModified(tab.modified)
+                self.swap_tab(tab, editor, index)
+                self.editor_tabs.setTabText(index, title)
+            self.editor_tabs.setCurrentIndex(index)
+        finally:
+            self.editor_tabs.blockSignals(blocked)
+        if error is not None:
+            self.tab_history.remove(tab)
+            self.forget_document(tab)
+            QMessageBox.critical(self, "Error", f"Could not reopen file: {str(error)}")
+        elif isinstance(editor, LargeFileViewer):
+            pass
+        elif editor.loader is None:
+            editor.restore_view(*tab.view)
+        else:
+            editor.pending_view = tab.view
+        tab.deleteLater()
+        # Let everything watching the current tab see the editor
+        self.editor_tabs.currentChanged.emit(self.editor_tabs.currentIndex())
+
+    def swap_tab(self, old, new, index):
+        # Puts new in the place of old, in the tab bar, the LRU order and the
+        # open document registry, without signalling a tab change
+        title = self.editor_tabs.tabText(index)
+        blocked = self.editor_tabs.blockSignals(True)
+        try:
+            current = self.editor_tabs.currentIndex()
+            self.editor_tabs.removeTab(index)
+            self.editor_tabs.insertTab(index, new, title)
+            self.editor_tabs.setCurrentIndex(current)
+        finally:
+            self.editor_tabs.blockSignals(blocked)
+        self.tab_history = [new if widget is old else widget for widget in self.tab_history]
+        if new.current_file is not None:
+            self.register_document(new, new.current_file)
+        self.forget_document(old)
+
+    def edit_tab_limits(self):
+        dialog = TabLimitsDialog(self.max_loaded_tabs, self.tab_memory_mb, self)
+        if dialog.exec_():
+            self.max_loaded_tabs = dialog.max_tabs.value()
+            self.tab_memory_mb = dialog.memory_mb.value()
+            self.settings.setValue("tabs/max_loaded", self.max_loaded_tabs)
+            self.settings.setValue("tabs/memory_mb", self.tab_memory_mb)
+            self.hibernate_tabs()
+
+    def restore_session(self):
+        # Every tab comes back hibernated, and only the current one is loaded
+        # straight away; the rest load when first shown
+        tabs, saved_current = load_session()
+        restored = []
+        current = -1
+        blocked = self.editor_tabs.blockSignals(True)
+        try:
+            for saved_index, (file_path, view) in enumerate(tabs):
+                if not os.path.isfile(file_path) or document_key(file_path) in self.open_documents:
+                    continue
+                if saved_index == saved_current:
+                    current = self.editor_tabs.count()
+                tab = HibernatedTab(file_path, view)
+                self.editor_tabs.addTab(tab, os.path.basename(file_path))
+                self.register_document(tab, file_path)
+                restored.append(tab)
+        finally:
+            self.editor_tabs.blockSignals(blocked)
+        if restored:
+            self.tab_history = restored + self.tab_history
+            if not 0 <= current < self.editor_tabs.count():
+                current = self.editor_tabs.count() - 1
+            self.editor_tabs.setCurrentIndex(current)
+        # Loaded once the window is up, so its view is restored at its size
+        QTimer.singleShot(0, self.wake_current_tab)
+
+    def wake_current_tab(self):
+        if isinstance(self.editor_tabs.currentWidget(), HibernatedTab):
+            self.tab_activated(self.editor_tabs.currentIndex())
+        self.mark_startup("current tab")
+
+    def save_session(self):
+        tabs = []
+        current = -1
+        for index in range(self.editor_tabs.count()):
+            widget = self.editor_tabs.widget(index)
+            if getattr(widget, 'current_file', None) is None:
+                continue
+            if index == self.editor_tabs.currentIndex():
+                current = len(tabs)
+            if isinstance(widget, HibernatedTab):
+                view = widget.view
+            elif isinstance(widget, CodeEditor):
+                cursor = widget.textCursor()
+                view = (cursor.anchor(), cursor.position(), widget.verticalScrollBar().value())
+            else:
+                view = (0, 0, 0)
+            tabs.append((os.path.abspath(widget.current_file), view))
+        try:
+            save_session(tabs, current)
+        except OSError as e:
+            self.statusBar.showMessage(f"Could not save the session: {e}")
+
+    def register_document(self, widget, file_path):
+        self.forget_document(widget)
+        widget.document_key = document_key(file_path)
+        self.open_documents[widget.document_key] = widget
+
+    def forget_document(self, widget):
+        key = getattr(widget, 'document_key', None)
+        if key is not None and self.open_documents.get(key) is widget:
+            del self.open_documents[key]
+        widget.document_key = None
+
+    def show_index_progress(self, viewer, fraction):
+        if viewer is not self.editor_tabs.currentWidget():
+            return
+        if fraction < 1.0:
+            self.statusBar.showMessage(
+                f"Opened {viewer.current_file} read-only, indexing lines: {fraction:.0%}")
+        else:
+            self.statusBar.showMessage(
+                f"Opened {viewer.current_file} read-only, {viewer.line_count():,} lines")
+
+    def start_loading(self, editor, file_path):
+        loader = StreamingLoader(editor, file_path, editor)
+        loader.progress.connect(
+            lambda done, total, editor=editor: self.show_load_progress(editor, done, total))
+        loader.finished.connect(
+            lambda editor=editor, path=file_path: self.loading_finished(editor, path))
+        loader.failed.connect(
+            lambda message, editor=editor: self.loading_failed(editor, message))
+        editor.loader = loader
+        loader.start()
+        self.update_load_status()
+
+    def show_load_progress(self, editor, done, total):
+        if editor is not self.editor_tabs.currentWidget():
+            return
+        percent = int(done * 100 / total) if total else 100
+        self.load_progress.setValue(percent)
+        self.statusBar.showMessage(
+            f"Loading {editor.current_file}: {done / 1048576:.0f} of {total / 1048576:.0f} MB")
+
+    def update_load_status(self, index=None):
+        editor = self.editor_tabs.currentWidget()
+        loading = getattr(editor, 'loader', None) is not None
+        self.load_progress.setVisible(loading)
+        self.load_cancel.setVisible(loading)
+        if loading:
+            self.show_load_progress(editor, editor.loader.done, editor.loader.total)
+
+    def loading_finished(self, editor, file_path):
+        editor.loader = None
+        if getattr(editor, 'pending_view', None) is not None:
+            editor.restore_view(*editor.pending_view)
+            editor.pending_view = None
+        self.update_load_status()
+        if editor is self.editor_tabs.currentWidget():
+            self.statusBar.showMessage(f"Opened {file_path}")
+
+    def loading_failed(self, editor, message):
+        editor.loader = None
+        self.close_tab(self.editor_tabs.indexOf(editor))
+        self.update_load_status()
+        QMessageBox.critical(self, "Error", f"Could not open file: {message}")
+
+    def cancel_loading(self):
+        # A partly loaded file is not kept open, it could be saved truncated
+        editor = self.editor_tabs.currentWidget()
+        if getattr(editor, 'loader', None) is None:
+            return
+        self.close_tab(self.editor_tabs.indexOf(editor))
+        self.statusBar.showMessage(f"Cancelled loading {editor.current_file}")
+
+    def start_language_detection(self, editor, file_path):
+        # Unknown or missing extension: let Pygments guess from the start of
+        # the file off the GUI thread; results are cached across sessions
+        from .detection import detect_file_language
+        job = Worker(detect_file_language, file_path)
+        job.signals.finished.connect(
+            lambda language, editor=editor, path=file_path:
+                self.apply_detected_language(editor, path, language))
+        editor.detect_job = start_worker(job)
+
+    def apply_detected_language(self, editor, file_path, language):
+        editor.detect_job = None
+        if editor.current_file == file_path:
+            editor.set_language(language)
             
     def save_file(self):
         current_editor = self.editor_tabs.currentWidget()
         if not current_editor:
             return
+        if isinstance(current_editor, LargeFileViewer):
+            self.statusBar.showMessage(f"{current_editor.current_file} is open read-only")
+            return
+        if current_editor.loader is not None:
+            self.statusBar.showMessage(f"{current_editor.current_file} is still loading")
+            return
             
-        current_tab = self.editor_tabs.currentIndex()
-        file_name = self.editor_tabs.tabText(current_tab)
-        
-        if file_name == "Untitled":
+        file_name = current_editor.current_file
+        if file_name is None:
             file_name, _ = QFileDialog.getSaveFileName(
                 self,
                 "Save File",
@@ -553,31 +1475,123 @@ class MainWindow(QMainWindow):
             )
             if not file_name:
                 return
-                
-        try:
-            with open(file_name, 'w', encoding='utf-8') as f:
-                f.write(current_editor.toPlainText())
-                
-            current_editor.current_file = file_name
-            self.editor_tabs.setTabText(current_tab, os.path.basename(file_name))
-            self.statusBar.showMessage(f"Saved {file_name}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not save file: {str(e)}")
+        self.start_save(current_editor, file_name)
+
+    def start_save(self, editor, file_name):
+        # Saves of a tab never overlap: a request made while one is being
+        # written is held back, and any number of them become a single save
+        # of the latest text once it finishes
+        if editor.save_job is not None:
+            editor.save_pending = file_name
+            return
+        editor.save_pending = None
+        edits = editor.highlighter.edits
+        started = time.perf_counter()
+        job = Worker(write_atomic, file_name, editor.toPlainText())
+        job.signals.finished.connect(
+            lambda path, editor=editor: self.save_finished(editor, path, edits, started))
+        job.signals.failed.connect(
+            lambda message, editor=editor: self.save_failed(editor, message))
+        editor.save_job = start_worker(job)
+        self.statusBar.showMessage(f"Saving {file_name}...")
+
+    def save_finished(self, editor, file_name, edits, started):
+        editor.save_job = None
+        if editor.highlighter.edits == edits:
+            editor.document().setModified(False)
+        # write_atomic returns an absolute path, which may be spelled
+        # differently from the one the tab holds for the same file
+        if (editor.current_file is None
+                or document_key(editor.current_file) != document_key(file_name)):
+            # Saved under a new name
+            editor.current_file = file_name
+            if self.editor_tabs.indexOf(editor) != -1:
+                self.register_document(editor, file_name)
+            language = language_for_path(file_name)
+            if language != GENERIC:
+                editor.set_language(language)
+            elif editor.highlighter.language == GENERIC:
+                self.start_language_detection(editor, file_name)
+            index = self.editor_tabs.indexOf(editor)
+            if index != -1:
+                self.editor_tabs.setTabText(index, os.path.basename(file_name))
+        elapsed = (time.perf_counter() - started) * 1000
+        self.statusBar.showMessage(f"Saved {file_name} ({elapsed:.0f} ms)")
+        self.project_tree.file_saved(file_name)
+        if editor.save_pending is not None:
+            self.start_save(editor, editor.save_pending)
+        elif editor.closed:
+            editor.deleteLater()
+
+    def save_failed(self, editor, message):
+        editor.save_job = None
+        QMessageBox.critical(self, "Error", f"Could not save file: {message}")
+        if editor.save_pending is not None:
+            self.start_save(editor, editor.save_pending)
+        elif editor.closed:
+            editor.deleteLater()
             
     def close_tab(self, index):
+        editor = self.editor_tabs.widget(index)
+        if editor is None:
+            return
+        self.forget_document(editor)
+        if editor in self.tab_history:
+            self.tab_history.remove(editor)
+        if isinstance(editor, LargeFileViewer):
+            editor.close_file()
+        if getattr(editor, 'loader', None) is not None:
+            editor.loader.cancel()
+            editor.loader = None
         self.editor_tabs.removeTab(index)
+        self.session_timer.start()
+        # removeTab leaves the page alive and parented to the tab widget, so
+        # it has to be deleted, along with its document, highlighter and
+        # search session
+        if isinstance(editor, CodeEditor):
+            editor.release()
+            if editor.save_job is not None:
+                editor.closed = True
+                return
+        editor.deleteLater()
         
+    def closeEvent(self, event):
+        # Stop the background work and wait for what is left while Python is
+        # still whole; a worker finishing during interpreter shutdown calls
+        # into half torn-down objects. Saves are left to complete.
+        self.session_timer.stop()
+        self.reopen_timer.stop()
+        self.save_session()
+        for index in range(self.editor_tabs.count()):
+            widget = self.editor_tabs.widget(index)
+            if isinstance(widget, CodeEditor):
+                widget.release()
+                if widget.loader is not None:
+                    widget.loader.cancel()
+            elif isinstance(widget, LargeFileViewer):
+                widget.close_file()
+        self.project_tree.close()
+        pools = [self.project_tree.pool, QThreadPool.globalInstance()]
+        if self.find_in_files_dock is not None:
+            panel = self.find_in_files_dock.widget()
+            panel.cancel()
+            panel.indexer.close()
+            pools += [panel.pool, panel.indexer.pool]
+        for pool in pools:
+            pool.waitForDone()
+        super().closeEvent(event)
+
     def cut(self):
         current_editor = self.editor_tabs.currentWidget()
-        if current_editor:
+        if isinstance(current_editor, CodeEditor):
             current_editor.cut()
             
     def copy(self):
         current_editor = self.editor_tabs.currentWidget()
-        if current_editor:
+        if isinstance(current_editor, CodeEditor):
             current_editor.copy()
             
     def paste(self):
         current_editor = self.editor_tabs.currentWidget()
-        if current_editor:
+        if isinstance(current_editor, CodeEditor):
             current_editor.paste() 
\ No newline at end of file
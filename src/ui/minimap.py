@@ -0,0 +1,313 @@
+import re
+import time
+
+from PyQt5.QtCore import QEvent, QRect, QSize, Qt, QTimer
+from PyQt5.QtGui import QColor, QImage, QPainter, QPalette
+from PyQt5.QtWidgets import QWidget
+
+from .workers import Worker, start_worker
+
+# Width of the minimap, in pixels; each character of a line takes one pixel
+# column and anything past the last column is cut off
+MINIMAP_WIDTH = 100
+# Height of one line in the minimap while the whole file fits, in pixels
+MINIMAP_LINE_HEIGHT = 2
+# Most rows in the cached image. Longer files are sampled: each row shows
+# the first line of an even share of the file.
+MAX_MINIMAP_ROWS = 2048
+# Time between an edit or new highlighting and redrawing the rows it
+# touched, in ms; changes in between are drawn together
+MINIMAP_DELAY = 100
+# Time budget for reading the changed rows out of the document before they
+# are handed to a worker, in seconds
+MINIMAP_SLICE = 0.008
+# Opacity of the text drawn in the minimap, out of 255
+INK_ALPHA = 0xB0
+# Opacity of the box marking the lines on screen, out of 255
+VIEWPORT_ALPHA = 0x30
+# Worker cancellation is checked once per this many rows
+CHECK_INTERVAL = 256
+# Runs of text that are drawn; whitespace is left blank
+INK = re.compile(r'\S+')
+
+_inks = {}
+
+
+def ink(rgba):
+    # Premultiplied RGBA pixel for a 0xAARRGGBB color, faded to INK_ALPHA
+    try:
+        return _inks[rgba]
+    except KeyError:
+        pixel = bytes([(rgba >> 16 & 0xFF) * INK_ALPHA // 255,
+                       (rgba >> 8 & 0xFF) * INK_ALPHA // 255,
+                       (rgba & 0xFF) * INK_ALPHA // 255,
+                       INK_ALPHA])
+        _inks[rgba] = pixel
+        return pixel
+
+
+def render_row(text, runs, text_color, columns):
+    # One pixel row for a line: each word in the text color, then the
+    # highlighter's colored runs, (start, length, rgba), on top of it
+    row = bytearray(columns * 4)
+    pixel = ink(text_color)
+    for match in INK.finditer(text, 0, columns):
+        start, end = match.span()
+        row[start * 4:end * 4] = pixel * (end - start)
+    for start, length, rgba in runs:
+        if start >= columns:
+            continue
+        pixel = ink(rgba)
+        for match in INK.finditer(text, start, min(start + length, columns)):
+            start, end = match.span()
+            row[start * 4:end * 4] = pixel * (end - start)
+    return bytes(row)
+
+
+def render_minimap(job, pixels, dirty, text_color, columns, size):
+    # Draws the dirty rows, (index, row, text, runs), into pixels and
+    # builds the image from every row, plus a copy scaled to size for the
+    # widget. Returns ([(row, row pixels)], image, scaled image).
+    rendered = []
+    for n, (index, row, text, runs) in enumerate(dirty):
+        if not n % CHECK_INTERVAL:
+            job.check()
+        pixels[index] = render_row(text, runs, text_color, columns)
+        rendered.append((row, pixels[index]))
+    job.check()
+    blank = bytes(columns * 4)
+    data = b''.join(row or blank for row in pixels)
+    image = QImage(data, columns, len(pixels), columns * 4,
+                   QImage.Format_RGBA8888_Premultiplied).convertToFormat(
+                       QImage.Format_ARGB32_Premultiplied)
+    return rendered, image, scale_image(image, size)
+
+
+def scale_image(image, size):
+    # Lines are averaged when the file has more rows than the widget has
+    # pixels, and drawn as solid bars when it has fewer
+    mode = Qt.SmoothTransformation if size.height() < image.height() else Qt.FastTransformation
+    return image.scaled(size, Qt.IgnoreAspectRatio, mode)
+
+
+class Minimap(QWidget):
+    # Overview of a CodeEditor's text right of its viewport, in the colors
+    # the highlighter gave it. Clicking or dragging scrolls the editor there.
+    #
+    # The picture is a cached image with one pixel row per line, or per
+    # sampled line for long files. Edits and newly highlighted blocks only
+    # mark their rows dirty; the dirty rows are read out of the document a
+    # slice at a time and drawn on a worker, which also builds the scaled
+    # image, so painting is a single drawImage and a keystroke never waits
+    # on the minimap.
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+        # One [pixels or None, dirty] entry per row. Marking a row dirty
+        # replaces its entry, so a render already running for the old
+        # entry cannot mark the new one clean.
+        self.rows = []
+        self.lines_per_row = 0
+        self.line_count = 0
+        self.image = None
+        self.scaled = None
+        self.render_job = None
+        self.dragging = False
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.timeout.connect(self.start_render)
+        self.setCursor(Qt.PointingHandCursor)
+        editor.document().contentsChange.connect(self.document_changed)
+        editor.highlighter.blocks_formatted.connect(self.blocks_formatted)
+        editor.verticalScrollBar().valueChanged.connect(self.update)
+        editor.verticalScrollBar().rangeChanged.connect(self.update)
+        self.reset()
+
+    def update_geometry(self):
+        rect = self.editor.viewport().geometry()
+        self.setGeometry(QRect(rect.right() + 1, rect.top(), MINIMAP_WIDTH, rect.height()))
+
+    def display_size(self):
+        # Short files keep MINIMAP_LINE_HEIGHT per line, longer ones are
+        # squeezed into the height of the widget
+        height = min(self.line_count * MINIMAP_LINE_HEIGHT, self.height())
+        return QSize(MINIMAP_WIDTH, max(height, 1))
+
+    def line_at(self, y):
+        line = int(y * self.line_count / self.display_size().height())
+        return max(0, min(line, self.line_count - 1))
+
+    def line_y(self, line):
+        return line * self.display_size().height() / max(self.line_count, 1)
+
+    def reset(self):
+        # Every row is redrawn, e.g. after the text was replaced with the
+        # document's signals blocked
+        self.lines_per_row = 0
+        self.lines_changed(0, self.editor.document().blockCount() - 1)
+
+    def document_changed(self, position, removed, added):
+        document = self.editor.document()
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(position + added).blockNumber()
+        if last < 0:
+            last = document.blockCount() - 1
+        self.lines_changed(first, last)
+
+    def blocks_formatted(self, runs):
+        for first, last in runs:
+            self.mark_dirty(first, last)
+        self.schedule_render()
+
+    def lines_changed(self, first, last):
+        # Lines first to last are new or edited; the rows after them move up
+        # or down with the line count
+        count = self.editor.document().blockCount()
+        lines_per_row = max(1, -(-count // MAX_MINIMAP_ROWS))
+        if lines_per_row != self.lines_per_row:
+            self.lines_per_row = lines_per_row
+            self.rows = [[None, True] for _ in range(-(-count // lines_per_row))]
+        elif lines_per_row == 1:
+            # Kept in step with the blocks the same way as token_lines
+            old_count = last - first + 1 - (count - self.line_count)
+            kept = self.rows[first:first + old_count]
+            self.rows[first:first + old_count] = [
+                [kept[n][0] if n < len(kept) else None, True] for n in range(last - first + 1)]
+        else:
+            # Sampled rows are not shifted; a row a few lines off does not
+            # show at this scale and is put right when it is next redrawn
+            row_count = -(-count // lines_per_row)
+            del self.rows[row_count:]
+            self.rows.extend([None, True] for _ in range(row_count - len(self.rows)))
+            self.mark_dirty(first, last)
+            if count != self.line_count:
+                self.mark_dirty(first // lines_per_row * lines_per_row, first)
+        self.line_count = count
+        self.schedule_render()
+
+    def mark_dirty(self, first, last):
+        # Rows whose line is among first to last
+        lines_per_row = self.lines_per_row
+        rows = self.rows
+        for index in range(-(-first // lines_per_row), min(last // lines_per_row, len(rows) - 1) + 1):
+            rows[index] = [rows[index][0], True]
+
+    def schedule_render(self):
+        # Changes are drawn at most once per MINIMAP_DELAY, even while the
+        # highlighter keeps formatting blocks
+        if self.render_job is None and not self.render_timer.isActive():
+            self.render_timer.start(MINIMAP_DELAY)
+
+    def start_render(self):
+        # Reads the dirty rows' text and highlighter formats, for as long as
+        # the slice allows, and draws them on a worker
+        document = self.editor.document()
+        highlighter = self.editor.highlighter
+        deadline = time.perf_counter() + MINIMAP_SLICE
+        lines_per_row = self.lines_per_row
+        dirty = []
+        for index, row in enumerate(self.rows):
+            if not row[1]:
+                continue
+            block = document.findBlockByNumber(index * lines_per_row)
+            text = block.text()
+            runs = []
+            if block.userState() < 0:
+                # Not reached by lazy highlighting yet, which takes a while
+                # through a long file: the line is colored on its own, as if
+                # it started outside any string or comment, until the
+                # highlighter gets to it and marks the row dirty again
+                formats = highlighter.formats
+                for start, length, kind in highlighter.tokenizer.tokenize(text, 0)[0]:
+                    brush = formats[kind].foreground()
+                    if brush.style() != Qt.NoBrush:
+                        runs.append((start, length, brush.color().rgba()))
+            else:
+                for format_range in block.layout().formats():
+                    brush = format_range.format.foreground()
+                    if brush.style() != Qt.NoBrush:
+                        runs.append((format_range.start, format_range.length,
+                                     brush.color().rgba()))
+            dirty.append((index, row, text, runs))
+            row[1] = False
+            if time.perf_counter() > deadline:
+                break
+        if not dirty and self.image is not None:
+            return
+        pixels = [row[0] for row in self.rows]
+        text_color = self.palette().color(QPalette.Text).rgba()
+        job = Worker(render_minimap, pixels, dirty, text_color, MINIMAP_WIDTH, self.display_size())
+        # Bound methods, so the connections go with the minimap; release()
+        # drops them before the editor is
+        job.signals.finished.connect(self.render_finished)
+        job.signals.failed.connect(self.render_failed)
+        self.render_job = start_worker(job)
+
+    def render_finished(self, result):
+        if self.render_job is None:
+            return
+        self.render_job = None
+        rendered, self.image, self.scaled = result
+        for row, pixels in rendered:
+            row[0] = pixels
+        self.update()
+        # Rows left over from the slice, or changed while drawing
+        if any(row[1] for row in self.rows):
+            self.render_timer.start(0)
+
+    def render_failed(self, message):
+        self.render_job = None
+
+    def release(self):
+        self.render_timer.stop()
+        if self.render_job is not None:
+            self.render_job.cancel()
+            self.render_job.signals.finished.disconnect(self.render_finished)
+            self.render_job.signals.failed.disconnect(self.render_failed)
+            self.render_job = None
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.PaletteChange:
+            # Plain text takes the palette's text color
+            for index, row in enumerate(self.rows):
+                self.rows[index] = [row[0], True]
+            self.schedule_render()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        palette = self.palette()
+        painter.fillRect(event.rect(), palette.base())
+        if self.image is not None:
+            size = self.display_size()
+            if self.scaled.size() != size:
+                # Resized since the last render
+                self.scaled = scale_image(self.image, size)
+            painter.drawImage(0, 0, self.scaled)
+        first, last = self.editor.visible_block_range()
+        top = int(self.line_y(first))
+        bottom = max(int(self.line_y(last + 1)), top + MINIMAP_LINE_HEIGHT)
+        color = QColor(palette.color(QPalette.Text))
+        color.setAlpha(VIEWPORT_ALPHA)
+        painter.fillRect(0, top, self.width(), bottom - top, color)
+        painter.end()
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.LeftButton:
+            return super().mousePressEvent(event)
+        self.dragging = True
+        self.scroll_to(event.y())
+
+    def mouseMoveEvent(self, event):
+        if self.dragging:
+            self.scroll_to(event.y())
+
+    def mouseReleaseEvent(self, event):
+        self.dragging = False
+
+    def scroll_to(self, y):
+        # Centers the editor on the line under y
+        editor = self.editor
+        first, last = editor.visible_block_range()
+        block = editor.document().findBlockByNumber(self.line_at(y))
+        editor.verticalScrollBar().setValue(block.firstLineNumber() - (last - first) // 2)
@@ -0,0 +1,63 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from .path_index import PathIndex, build_path_index
+from .workers import Worker, start_worker
+
+
+class ProjectFiles(QObject):
+    # The paths of every file in the project folder for quick open, as a
+    # PathIndex built in the background from the project tree's listing
+    changed = pyqtSignal()
+
+    def __init__(self, tree, parent=None):
+        super().__init__(parent)
+        self.tree = tree
+        self.root = None
+        self.listing = False
+        # The tree's files the index holds
+        self.indexed = {}
+        self.index = PathIndex([])
+        self.job = None
+        tree.listed.connect(self.update_index)
+        tree.changed.connect(self.tree_changed)
+
+    def tree_changed(self, listed, removed):
+        # Edited files come back listed too; only new and gone paths matter
+        if removed or any(path not in self.indexed for path in listed):
+            self.update_index()
+
+    def update_index(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+        tree = self.tree
+        if tree.listing or tree.root != self.root or not tree.files:
+            # The old paths are of no use while a new listing comes in
+            self.root = tree.root
+            self.indexed = {}
+            self.index = PathIndex([])
+        if not tree.listing and tree.files:
+            # Built on the tree's thread, taking turns with its updates
+            job = Worker(build_path_index, tree.files)
+            job.files = tree.files
+            job.signals.finished.connect(lambda index, job=job: self.index_built(job, index))
+            job.signals.failed.connect(lambda message, job=job: self.index_failed(job))
+            self.job = start_worker(job, tree.pool)
+        # Until the first index of the folder is in
+        self.listing = tree.listing or (self.job is not None and not self.indexed)
+        self.changed.emit()
+
+    def index_built(self, job, index):
+        if job is not self.job:
+            return
+        self.job = None
+        self.indexed = job.files
+        self.index = index
+        self.listing = False
+        self.changed.emit()
+
+    def index_failed(self, job):
+        if job is self.job:
+            self.job = None
+            self.listing = False
+            self.changed.emit()
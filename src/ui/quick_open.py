@@ -0,0 +1,104 @@
+import os
+
+from PyQt5.QtCore import QEvent, Qt, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QDialog, QLabel, QLineEdit, QListWidget, QListWidgetItem, QVBoxLayout
+
+from .path_index import PathSearch
+
+# Time budget of each quick-open search slice, in seconds; a keystroke
+# never waits longer than one slice
+QUICK_OPEN_SLICE = 0.008
+
+
+class QuickOpenDialog(QDialog):
+    # Go to File: ranks the project's paths as you type. A search that does
+    # not finish in one slice carries on in later ones, and the list is
+    # refilled as its ranking improves, keeping the selected path.
+    file_chosen = pyqtSignal(str)
+
+    def __init__(self, files, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Go to File")
+        self.resize(600, 400)
+        self.files = files
+        self.search = None
+        self.shown = []
+        layout = QVBoxLayout(self)
+        self.query = QLineEdit()
+        self.query.setPlaceholderText("File name or path")
+        self.query.textChanged.connect(self.start_search)
+        self.query.returnPressed.connect(self.open_selected)
+        # Arrow keys in the query move through the results
+        self.query.installEventFilter(self)
+        layout.addWidget(self.query)
+        self.results = QListWidget()
+        self.results.setUniformItemSizes(True)
+        self.results.itemActivated.connect(self.open_selected)
+        layout.addWidget(self.results)
+        self.summary = QLabel()
+        layout.addWidget(self.summary)
+        self.search_timer = QTimer(self)
+        self.search_timer.setInterval(0)
+        self.search_timer.timeout.connect(self.continue_search)
+        files.changed.connect(self.files_changed)
+
+    def start_search(self):
+        # The last search lets one for a longer query skip chunks
+        self.search = PathSearch(self.files.index, self.query.text(), previous=self.search)
+        self.continue_search()
+
+    def continue_search(self):
+        search = self.search
+        done = search.run(QUICK_OPEN_SLICE)
+        # The previous list stays up until the new search has something
+        if search.results or done:
+            self.show_results()
+        if done:
+            self.search_timer.stop()
+        else:
+            self.search_timer.start()
+
+    def show_results(self):
+        search = self.search
+        if search.results != self.shown:
+            current = self.results.currentItem()
+            selected = current.data(Qt.UserRole) if current is not None else None
+            self.shown = list(search.results)
+            self.results.clear()
+            for path in self.shown:
+                directory, _, name = path.rpartition('/')
+                item = QListWidgetItem(f"{name}    {directory}" if directory else name, self.results)
+                item.setData(Qt.UserRole, path)
+                if path == selected:
+                    self.results.setCurrentItem(item)
+        if self.results.currentRow() < 0 and self.results.count():
+            self.results.setCurrentRow(0)
+        if self.files.listing:
+            self.summary.setText("Listing files...")
+        else:
+            self.summary.setText(f"{len(search.results):,} of {len(self.files.index):,} files"
+                                 f"{'' if search.done else '...'}")
+
+    def files_changed(self):
+        if self.isVisible():
+            self.start_search()
+
+    def eventFilter(self, watched, event):
+        if (watched is self.query and event.type() == QEvent.KeyPress
+                and event.key() in (Qt.Key_Up, Qt.Key_Down, Qt.Key_PageUp, Qt.Key_PageDown)):
+            self.results.keyPressEvent(event)
+            return True
+        return super().eventFilter(watched, event)
+
+    def open_selected(self):
+        item = self.results.currentItem()
+        if item is None or self.files.root is None:
+            return
+        self.accept()
+        self.file_chosen.emit(os.path.join(self.files.root, *item.data(Qt.UserRole).split('/')))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.query.selectAll()
+        self.query.setFocus()
+        self.start_search()
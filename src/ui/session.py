@@ -0,0 +1,33 @@
+import json
+import os
+
+from .appdata import data_path
+
+# Open tabs of the last run, in the data dir
+SESSION_FILE = "session.json"
+SESSION_VERSION = 1
+
+
+def load_session(path=None):
+    # ([(file path, (anchor, position, scroll))], index of the current tab)
+    # as save_session left them, or nothing when there is no usable session
+    try:
+        with open(path or data_path(SESSION_FILE), 'r', encoding='utf-8') as f:
+            session = json.load(f)
+        if session.get('v') != SESSION_VERSION:
+            return [], -1
+        tabs = [(file_path, (int(anchor), int(position), int(scroll)))
+                for file_path, anchor, position, scroll in session['tabs']]
+        return tabs, int(session['current'])
+    except (OSError, ValueError, TypeError, KeyError, AttributeError):
+        return [], -1
+
+
+def save_session(tabs, current, path=None):
+    path = path or data_path(SESSION_FILE)
+    session = {'v': SESSION_VERSION, 'current': current,
+               'tabs': [[file_path, *view] for file_path, view in tabs]}
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(session, f, separators=(',', ':'))
+    os.replace(temp_path, path)
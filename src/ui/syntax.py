@@ -0,0 +1,200 @@
+import os
+import re
+
+# Token kinds produced by the tokenizer, mapped to formats by CodeHighlighter
+KEYWORD = "keyword"
+STRING = "string"
+COMMENT = "comment"
+NUMBER = "number"
+# Only produced by the Pygments pipeline
+FUNCTION = "function"
+CLASS = "class"
+BUILTIN = "builtin"
+
+# Common keywords for multiple languages
+KEYWORDS = {
+    'python': [
+        "and", "as", "assert", "break", "class", "continue", "def",
+        "del", "elif", "else", "except", "False", "finally", "for",
+        "from", "global", "if", "import", "in", "is", "lambda", "None",
+        "nonlocal", "not", "or", "pass", "raise", "return", "True",
+        "try", "while", "with", "yield"
+    ],
+    'javascript': [
+        "break", "case", "catch", "class", "const", "continue", "debugger",
+        "default", "delete", "do", "else", "export", "extends", "finally",
+        "for", "function", "if", "import", "in", "instanceof", "new", "return",
+        "super", "switch", "this", "throw", "try", "typeof", "var", "void",
+        "while", "with", "yield"
+    ],
+    'html': [
+        "html", "head", "body", "div", "span", "p", "a", "img", "script",
+        "style", "link", "meta", "title", "h1", "h2", "h3", "h4", "h5", "h6"
+    ]
+}
+
+def _find_closer(text, closer, pos, escapes):
+    # Index of the next closing delimiter at or after pos, skipping ones that
+    # are escaped by an odd number of backslashes
+    start = pos
+    while True:
+        end = text.find(closer, pos)
+        if end == -1 or not escapes:
+            return end
+        backslashes = 0
+        i = end - 1
+        while i >= start and text[i] == '\\':
+            backslashes += 1
+            i -= 1
+        if not backslashes % 2:
+            return end
+        pos = end + 1
+
+
+class Tokenizer:
+    # A rule set compiled once into a single alternation and applied to a
+    # block in one left-to-right scan.
+    #
+    # The scan finds either a \w+ run (checked against the keyword set, or
+    # taken as a number) or the opening delimiter of a string or comment, and
+    # then jumps straight to the matching closer. Block comments and
+    # multi-line strings still open at the end of a block are reported as a
+    # non-zero state that the next block starts from; 0 means the block
+    # ended in plain code.
+    #
+    # tokenize() returns ((start, length, kind) spans, end_state). The spans
+    # are in order and do not overlap.
+    def __init__(self, keywords, strings=('"', "'"), line_comments=('#', '//'),
+                 block_comments=(('/*', '*/'),), multiline_strings=()):
+        self.keywords = frozenset(keywords)
+        self.regions = []
+        self.actions = {}
+        for prefix in line_comments:
+            self.actions[prefix] = (COMMENT, None, False, 0)
+        for quote in strings:
+            self.actions[quote] = (STRING, quote, True, 0)
+        for opener, closer in block_comments:
+            self.regions.append((closer, COMMENT, False))
+            self.actions[opener] = (COMMENT, closer, False, len(self.regions))
+        for quote in multiline_strings:
+            self.regions.append((quote, STRING, True))
+            self.actions[quote] = (STRING, quote, True, len(self.regions))
+
+        # Longest delimiters first so that a triple quote wins over a single one
+        openers = sorted(self.actions, key=len, reverse=True)
+        self.pattern = re.compile("|".join([r"\w+"] + [re.escape(o) for o in openers]))
+
+    def tokenize(self, text, state=0):
+        spans = []
+        pos = 0
+        length = len(text)
+
+        if state:
+            closer, kind, escapes = self.regions[state - 1]
+            end = _find_closer(text, closer, 0, escapes)
+            if end == -1:
+                if length:
+                    spans.append((0, length, kind))
+                return spans, state
+            pos = end + len(closer)
+            spans.append((0, pos, kind))
+            state = 0
+
+        search = self.pattern.search
+        keywords = self.keywords
+        actions = self.actions
+        while True:
+            match = search(text, pos)
+            if match is None:
+                break
+            start, pos = match.span()
+            token = match.group()
+            action = actions.get(token)
+            if action is None:
+                if token in keywords:
+                    spans.append((start, pos - start, KEYWORD))
+                elif token.isdecimal():
+                    spans.append((start, pos - start, NUMBER))
+                continue
+
+            kind, closer, escapes, region = action
+            if closer is None:
+                spans.append((start, length - start, kind))
+                break
+            end = _find_closer(text, closer, pos, escapes)
+            if end == -1:
+                # Unterminated: single-line strings stop at the end of the
+                # block, block comments and multi-line strings carry on
+                spans.append((start, length - start, kind))
+                state = region
+                break
+            pos = end + len(closer)
+            spans.append((start, pos - start, kind))
+
+        return spans, state
+
+
+# Per-language rule definitions. Each file only pays for its own language's
+# rules; the "generic" set merges everything and is used for files we do not
+# recognise, matching what every file used to get.
+LANGUAGES = {
+    'python': {
+        'extensions': ('.py', '.pyw', '.pyi'),
+        'keywords': KEYWORDS['python'],
+        'strings': ('"', "'"),
+        'line_comments': ('#',),
+        'block_comments': (),
+        'multiline_strings': ('"""', "'''"),
+    },
+    'javascript': {
+        'extensions': ('.js', '.mjs', '.cjs', '.jsx', '.ts', '.tsx'),
+        'keywords': KEYWORDS['javascript'],
+        'strings': ('"', "'"),
+        'line_comments': ('//',),
+        'block_comments': (('/*', '*/'),),
+        'multiline_strings': ('`',),
+    },
+    'html': {
+        'extensions': ('.html', '.htm', '.xhtml'),
+        'keywords': KEYWORDS['html'],
+        'strings': ('"', "'"),
+        'line_comments': (),
+        'block_comments': (('<!--', '-->'), ('/*', '*/')),
+        'multiline_strings': (),
+    },
+}
+
+GENERIC = 'generic'
+
+_extensions = {}
+for _language, _spec in LANGUAGES.items():
+    for _extension in _spec['extensions']:
+        _extensions[_extension] = _language
+
+_tokenizers = {}
+
+
+def language_for_path(path):
+    if not path:
+        return GENERIC
+    return _extensions.get(os.path.splitext(path)[1].lower(), GENERIC)
+
+
+def get_tokenizer(language=GENERIC):
+    # Rule sets are built on first use and shared by every editor of that language
+    if language not in LANGUAGES:
+        language = GENERIC
+    tokenizer = _tokenizers.get(language)
+    if tokenizer is None:
+        spec = LANGUAGES.get(language)
+        if spec is None:
+            merged = []
+            for lang_keywords in KEYWORDS.values():
+                merged.extend(lang_keywords)
+            tokenizer = Tokenizer(merged)
+        else:
+            tokenizer = Tokenizer(spec['keywords'], spec['strings'],
+                                  spec['line_comments'], spec['block_comments'],
+                                  spec['multiline_strings'])
+        _tokenizers[language] = tokenizer
+    return tokenizer
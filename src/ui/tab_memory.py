@@ -0,0 +1,49 @@
+import zlib
+
+from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QFormLayout, QSpinBox, QWidget
+
+from .syntax import GENERIC
+
+
+class HibernatedTab(QWidget):
+    # Stands in for an editor tab that is not loaded: one unloaded to save
+    # memory, or restored from the last session. Only what it takes to bring
+    # the tab back is kept: the path, the view, and unsaved text compressed;
+    # unmodified files are read again from disk.
+    def __init__(self, current_file, view, language=GENERIC, modified=False, text=None):
+        super().__init__()
+        self.current_file = current_file
+        self.view = view
+        self.language = language
+        self.modified = modified
+        self.text = text
+
+    @classmethod
+    def from_editor(cls, editor):
+        cursor = editor.textCursor()
+        view = (cursor.anchor(), cursor.position(), editor.verticalScrollBar().value())
+        modified = editor.document().isModified()
+        text = None
+        if modified or editor.current_file is None:
+            text = zlib.compress(editor.toPlainText().encode('utf-8'), 1)
+        return cls(editor.current_file, view, editor.highlighter.language, modified, text)
+
+
+class TabLimitsDialog(QDialog):
+    def __init__(self, max_tabs, memory_mb, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Tab Memory")
+        layout = QFormLayout(self)
+        self.max_tabs = QSpinBox()
+        self.max_tabs.setRange(1, 1000)
+        self.max_tabs.setValue(max_tabs)
+        self.memory_mb = QSpinBox()
+        self.memory_mb.setRange(16, 1024 * 1024)
+        self.memory_mb.setSuffix(" MB")
+        self.memory_mb.setValue(memory_mb)
+        layout.addRow("Tabs kept loaded:", self.max_tabs)
+        layout.addRow("Memory for loaded tabs:", self.memory_mb)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
@@ -0,0 +1,462 @@
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+from array import array
+from itertools import accumulate, chain
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+from .appdata import data_path
+from .excludes import DEFAULT_EXCLUDES, compile_excludes, is_excluded, read_ignore_file
+from .find_in_files import BINARY_SNIFF_BYTES, find_in_files, map_batches, search_files
+
+# Index files live in this directory of the data dir, one per project root
+INDEX_DIR = "indexes"
+INDEX_MAGIC = b"CETRIGRAM\n"
+INDEX_VERSION = 2
+# Files per segment when building; updates add smaller segments that are
+# merged back together as they pile up
+SEGMENT_FILES = 2000
+# More dead files than this share of the index calls for a rebuild
+COMPACT_DEAD_RATIO = 0.25
+# Posting lists with fewer ids than this are stored uncompressed
+RAW_POSTINGS = 8
+# Posting lists holding at least one in this many of a segment's files are
+# stored as a bitmap, which is then no bigger than the list
+DENSE_POSTINGS = 32
+# Queries with no more candidates than this are checked on the calling
+# thread rather than in the process pool
+INLINE_CANDIDATES = 64
+
+
+def file_trigrams(path):
+    # The distinct lowercased trigrams of a file's lines, or an empty set for
+    # a binary or unreadable file
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return set()
+    if b'\0' in data[:BINARY_SNIFF_BYTES]:
+        return set()
+    grams = set()
+    for line in set(data.decode('utf-8', errors='replace').lower().split('\n')):
+        grams.update([line[i:i + 3] for i in range(len(line) - 2)])
+    return grams
+
+
+def index_files(paths):
+    # Runs in a pool process: ([(path, mtime_ns, size)], {trigram: mask}),
+    # bit i of a mask standing for the i-th file
+    entries = []
+    masks = {}
+    get = masks.get
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        bit = 1 << len(entries)
+        entries.append((path, stat.st_mtime_ns, stat.st_size))
+        for gram in file_trigrams(path):
+            masks[gram] = get(gram, 0) | bit
+    return entries, masks
+
+
+def set_bits(mask):
+    # Positions of the set bits of mask, lowest first
+    positions = []
+    while mask:
+        low = mask & -mask
+        positions.append(low.bit_length() - 1)
+        mask ^= low
+    return positions
+
+
+def encode_postings(mask, file_count):
+    # Sparse lists as deltas of the file positions, compressed when long;
+    # dense ones as the bitmap itself
+    count = bin(mask).count('1')
+    if count * DENSE_POSTINGS >= file_count:
+        return b'\2' + mask.to_bytes((file_count + 7) // 8, 'little')
+    positions = set_bits(mask)
+    deltas = array('I', [b - a for a, b in zip(chain((0,), positions), positions)]).tobytes()
+    if count < RAW_POSTINGS:
+        return b'\0' + deltas
+    return b'\1' + zlib.compress(deltas, 1)
+
+
+def decode_postings(data):
+    # The mask encode_postings was given
+    if data[0] == 2:
+        return int.from_bytes(data[1:], 'little')
+    deltas = array('I')
+    deltas.frombytes(data[1:] if data[0] == 0 else zlib.decompress(data[1:]))
+    mask = 0
+    for position in accumulate(deltas):
+        mask |= 1 << position
+    return mask
+
+
+class Segment:
+    # Posting lists for the files with ids base to base + file_count - 1:
+    # the trigrams sorted into one string, with offsets of their encoded
+    # masks in one blob
+    def __init__(self, base, file_count, keys, offsets, blob):
+        self.base = base
+        self.file_count = file_count
+        self.keys = keys
+        self.offsets = offsets
+        self.blob = blob
+        self.lookup = {keys[i:i + 3]: n for n, i in enumerate(range(0, len(keys), 3))}
+
+    @classmethod
+    def from_masks(cls, base, file_count, masks):
+        grams = sorted(masks)
+        offsets = array('I', [0])
+        parts = []
+        size = 0
+        for gram in grams:
+            encoded = encode_postings(masks[gram], file_count)
+            parts.append(encoded)
+            size += len(encoded)
+            offsets.append(size)
+        return cls(base, file_count, ''.join(grams), offsets, b''.join(parts))
+
+    def mask(self, gram):
+        n = self.lookup.get(gram)
+        if n is None:
+            return 0
+        return decode_postings(self.blob[self.offsets[n]:self.offsets[n + 1]])
+
+    def encoded_size(self, gram):
+        n = self.lookup.get(gram)
+        return -1 if n is None else self.offsets[n + 1] - self.offsets[n]
+
+    def merged(self, other):
+        # Segments cover consecutive ids, so the other one's masks just move up
+        shift = other.base - self.base
+        masks = {gram: self.mask(gram) for gram in self.lookup}
+        for gram in other.lookup:
+            masks[gram] = masks.get(gram, 0) | (other.mask(gram) << shift)
+        return Segment.from_masks(self.base, shift + other.file_count, masks)
+
+
+class SegmentBuilder:
+    # Collects the masks of consecutive batches of files into one segment
+    def __init__(self, base):
+        self.base = base
+        self.file_count = 0
+        self.masks = {}
+
+    def add(self, file_count, masks):
+        shift = self.file_count
+        get = self.masks.get
+        for gram, mask in masks.items():
+            self.masks[gram] = get(gram, 0) | (mask << shift)
+        self.file_count += file_count
+
+    def build(self):
+        return Segment.from_masks(self.base, self.file_count, self.masks)
+
+
+class TrigramIndex:
+    # Which files under root contain which trigrams. Files get a new id
+    # every time they are indexed; the ids of removed or changed files are
+    # tombstoned in dead and filtered out of query results. Queries only
+    # narrow the files down, the candidates are then searched for real.
+    def __init__(self, root):
+        self.root = root
+        self.files = []
+        self.ids = {}
+        self.dead = set()
+        self.segments = []
+        self.build_seconds = 0.0
+        self.updated_at = 0.0
+        self.last_query = None
+
+    def relative(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def register(self, entries):
+        # Gives the (path, mtime_ns, size) entries the next ids
+        for path, mtime, size in entries:
+            relative = self.relative(path)
+            old = self.ids.get(relative)
+            if old is not None:
+                self.dead.add(old)
+            self.ids[relative] = len(self.files)
+            self.files.append((relative, mtime, size))
+        self.updated_at = time.time()
+
+    def add_files(self, entries, masks):
+        # One batch from index_files, as a segment of its own
+        base = len(self.files)
+        self.register(entries)
+        if entries:
+            self.add_segment(Segment.from_masks(base, len(entries), masks))
+
+    def add_segment(self, segment):
+        self.segments.append(segment)
+        # Merge update segments back together while the last two are about
+        # the same size, so that their number stays logarithmic
+        while (len(self.segments) > 1 and self.segments[-2].file_count < SEGMENT_FILES
+               and self.segments[-1].file_count * 2 >= self.segments[-2].file_count):
+            last = self.segments.pop()
+            self.segments[-1] = self.segments[-1].merged(last)
+
+    def remove_files(self, relatives):
+        for relative in relatives:
+            file_id = self.ids.pop(relative, None)
+            if file_id is not None:
+                self.dead.add(file_id)
+        self.updated_at = time.time()
+
+    def needs_compaction(self):
+        return len(self.dead) > COMPACT_DEAD_RATIO * max(len(self.files), SEGMENT_FILES)
+
+    def candidates(self, literals):
+        # (path, size) of the live files holding every trigram of every
+        # literal; all live files when the literals give no trigram
+        grams = {literal[i:i + 3] for literal in literals for i in range(len(literal) - 2)}
+        if not grams:
+            ids = set(self.ids.values())
+        else:
+            ids = set()
+            for segment in list(self.segments):
+                found = -1
+                for gram in sorted(grams, key=segment.encoded_size):
+                    found &= segment.mask(gram)
+                    if not found:
+                        break
+                if found > 0:
+                    ids.update(segment.base + position for position in set_bits(found))
+            ids -= frozenset(self.dead)
+        files = self.files
+        return [(os.path.join(self.root, files[i][0]), files[i][2]) for i in sorted(ids)]
+
+    def disk_path(self):
+        return index_path(self.root)
+
+    def stats(self):
+        return {
+            'root': self.root,
+            'files': len(self.ids),
+            'dead': len(self.dead),
+            'segments': len(self.segments),
+            'trigrams': sum(len(segment.lookup) for segment in list(self.segments)),
+            'postings_bytes': sum(len(segment.blob) for segment in list(self.segments)),
+            'build_seconds': self.build_seconds,
+            'updated_at': self.updated_at,
+            'last_query': self.last_query,
+        }
+
+    def save(self, path=None):
+        # Header JSON, then each segment as its key string, offsets and blob.
+        # Written to a temporary file and swapped in.
+        path = path or self.disk_path()
+        segments = list(self.segments)
+        header = json.dumps({
+            'version': INDEX_VERSION,
+            'root': self.root,
+            'files': list(self.files),
+            'dead': sorted(self.dead),
+            'build_seconds': self.build_seconds,
+            'updated_at': self.updated_at,
+        }, separators=(',', ':')).encode('utf-8')
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            f.write(struct.pack('<II', len(header), len(segments)))
+            f.write(header)
+            for segment in segments:
+                keys = segment.keys.encode('utf-8')
+                offsets = segment.offsets.tobytes()
+                f.write(struct.pack('<IIIII', segment.base, segment.file_count, len(keys),
+                                    len(offsets), len(segment.blob)))
+                f.write(keys)
+                f.write(offsets)
+                f.write(segment.blob)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        # None when the file is missing, unreadable or from another version
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if not data.startswith(INDEX_MAGIC):
+            return None
+        try:
+            pos = len(INDEX_MAGIC)
+            header_size, segment_count = struct.unpack_from('<II', data, pos)
+            pos += 8
+            header = json.loads(data[pos:pos + header_size].decode('utf-8'))
+            pos += header_size
+            if header.get('version') != INDEX_VERSION:
+                return None
+            index = cls(header['root'])
+            index.files = [tuple(entry) for entry in header['files']]
+            index.dead = set(header['dead'])
+            index.ids = {relative: i for i, (relative, _, _) in enumerate(index.files)
+                         if i not in index.dead}
+            index.build_seconds = header['build_seconds']
+            index.updated_at = header['updated_at']
+            for _ in range(segment_count):
+                base, file_count, keys_size, offsets_size, blob_size = struct.unpack_from(
+                    '<IIIII', data, pos)
+                pos += 20
+                keys = data[pos:pos + keys_size].decode('utf-8')
+                pos += keys_size
+                offsets = array('I')
+                offsets.frombytes(data[pos:pos + offsets_size])
+                pos += offsets_size
+                blob = data[pos:pos + blob_size]
+                pos += blob_size
+                index.segments.append(Segment(base, file_count, keys, offsets, blob))
+        except (struct.error, ValueError, KeyError, TypeError):
+            return None
+        return index
+
+
+def index_path(root):
+    directory = data_path(INDEX_DIR)
+    os.makedirs(directory, exist_ok=True)
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(root)).encode('utf-8')).hexdigest()
+    return os.path.join(directory, key + ".idx")
+
+
+def project_excludes(root, excludes=DEFAULT_EXCLUDES):
+    return compile_excludes(list(excludes) + read_ignore_file(root))
+
+
+def build_trigram_index(job, root, files, excludes=DEFAULT_EXCLUDES):
+    # Indexes the searchable ones of files, {relative path: size} as the
+    # project tree lists them under root, in the process pool and saves the
+    # index. Reports the number of files indexed so far.
+    started = time.perf_counter()
+    names, paths = project_excludes(root, excludes)
+    index = TrigramIndex(root)
+    builder = SegmentBuilder(0)
+    searchable = ((os.path.join(root, relative), size) for relative, size in files.items()
+                  if not is_excluded(relative, names, paths))
+    for entries, masks in map_batches(job, searchable, index_files):
+        index.register(entries)
+        builder.add(len(entries), masks)
+        if builder.file_count >= SEGMENT_FILES:
+            index.add_segment(builder.build())
+            builder = SegmentBuilder(len(index.files))
+        job.report(len(index.files))
+    if builder.file_count:
+        index.add_segment(builder.build())
+    index.build_seconds = time.perf_counter() - started
+    index.save()
+    return index
+
+
+def load_trigram_index(job, root):
+    index = TrigramIndex.load(index_path(root))
+    if index is None or os.path.normcase(index.root) != os.path.normcase(root):
+        return None
+    return index
+
+
+def index_changes(job, index, listed, removed, excludes=DEFAULT_EXCLUDES):
+    # What to change in the index for the relative paths of files listed
+    # again and of files removed: (the entries and masks of index_files for
+    # the new and changed files, relative paths of the files to drop)
+    names, paths = project_excludes(index.root, excludes)
+    ids = dict(index.ids)
+    files = index.files
+    dropped = [path for path in removed if path in ids]
+    changed = []
+    for count, relative in enumerate(listed):
+        if not count % 1000:
+            job.check()
+        if is_excluded(relative, names, paths):
+            if relative in ids:
+                dropped.append(relative)
+            continue
+        path = os.path.join(index.root, relative)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        file_id = ids.get(relative)
+        if file_id is None or tuple(files[file_id][1:]) != (stat.st_mtime_ns, stat.st_size):
+            changed.append(path)
+    entries, masks = index_files(changed)
+    return entries, masks, dropped
+
+
+def catch_up_changes(job, index, files, excludes=DEFAULT_EXCLUDES):
+    # index_changes for a whole new listing of the tree, {relative path:
+    # size}: whatever changed while the editor was not running
+    removed = [path for path in index.ids if path not in files]
+    return index_changes(job, index, files, removed, excludes)
+
+
+def required_literals(text, case_sensitive, regex):
+    # Substrings every match must contain, lowercased for the index. Empty
+    # when nothing can be relied on and every file is a candidate.
+    if regex:
+        try:
+            parsed = sre_parse.parse(text)
+        except Exception:
+            return []
+        runs = []
+        runs.append(''.join(_literal_runs(parsed, runs, [])))
+        # Inline flags may turn case-insensitive matching on
+        case_sensitive = case_sensitive and '(?' not in text
+    else:
+        runs = [text]
+    literals = []
+    for run in runs:
+        # Case-insensitive matching of non-ASCII text does not always agree
+        # with str.lower(), so only ASCII literals narrow those searches
+        if len(run) >= 3 and (case_sensitive or run.isascii()):
+            literals.append(run.lower())
+    return literals
+
+
+def _literal_runs(parsed, runs, current):
+    # Literal characters that follow one another in a top-level sequence,
+    # looking into plain groups; anything else ends the current run
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+        elif op is sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            current = _literal_runs(av[-1], runs, current)
+        else:
+            runs.append(''.join(current))
+            current = []
+    return current
+
+
+def save_trigram_index(job, index):
+    index.save()
+    return index
+
+
+def find_with_index(job, index, pattern, literals):
+    # find_in_files over the index candidates only. Records how long the
+    # lookup took in index.last_query.
+    started = time.perf_counter()
+    files = index.candidates(literals)
+    lookup = time.perf_counter() - started
+    if len(files) <= INLINE_CANDIDATES:
+        searched, found = search_files([path for path, _ in files], pattern)
+        job.report((searched, found))
+    else:
+        searched, _ = find_in_files(job, index.root, pattern, files=files)
+    elapsed = time.perf_counter() - started
+    index.last_query = (lookup, len(files), len(index.ids), elapsed)
+    return searched, elapsed
@@ -0,0 +1,32 @@
+from src.ui.path_index import NAME_FUZZY, NAME_PREFIX, NAME_SUBSTRING, PathIndex, PathSearch
+
+PATHS = ['src/main_window.py', 'src/widgets/window_main.py', 'docs/main.md', 'main.py',
+         'tests/test_domain_window.py', 'src/maintenance/winter.py', 'lib/m/a/i/n/w.py']
+
+
+def search(index, query, previous=None):
+    search = PathSearch(index, query, previous=previous)
+    while not search.run(1):
+        pass
+    return search
+
+
+def test_tiers_ranked_by_score():
+    found = search(PathIndex(PATHS), 'main')
+    assert found.results[:3] == ['main.py', 'docs/main.md', 'src/main_window.py']
+    assert found.tiers[:3] == [NAME_PREFIX] * 3
+    # In the name, earlier is better
+    assert found.results[3:5] == ['src/widgets/window_main.py', 'tests/test_domain_window.py']
+    assert found.tiers[3:5] == [NAME_SUBSTRING] * 2
+
+
+def test_narrowed_search_matches_full_search():
+    index = PathIndex(PATHS * 300)
+    previous = None
+    for end in range(1, len('mainwin') + 1):
+        query = 'mainwin'[:end]
+        narrowed = search(index, query, previous)
+        full = search(index, query)
+        assert narrowed.results == full.results and narrowed.tiers == full.tiers
+        previous = narrowed
+    assert NAME_FUZZY in full.tiers
@@ -0,0 +1,55 @@
+import os
+
+from src.ui.project_tree import list_tree, relative_path, rescan_tree, root_prefix
+
+
+class Job:
+    def check(self):
+        pass
+
+    def report(self, value):
+        pass
+
+
+def test_relative_path_under_a_root_ending_in_a_separator():
+    root = os.path.abspath(os.sep)
+    path = os.path.join(root, 'etc', 'hosts')
+    assert relative_path(root_prefix(root), path) == 'etc/hosts'
+    assert relative_path(root_prefix(os.path.join(root, 'etc')), path) == 'hosts'
+
+
+def test_rescan_finds_new_and_gone_files(tmp_path):
+    root = str(tmp_path)
+    os.makedirs(os.path.join(root, 'pkg', 'sub'))
+    for name in ('a.py', os.path.join('pkg', 'b.py'), os.path.join('pkg', 'sub', 'c.py')):
+        with open(os.path.join(root, name), 'w') as f:
+            f.write('x\n')
+    files, directories = list_tree(Job(), root, ())
+    assert set(files) == {'a.py', 'pkg/b.py', 'pkg/sub/c.py'}
+    assert directories == {'', 'pkg', 'pkg/sub'}
+
+    os.remove(os.path.join(root, 'pkg', 'sub', 'c.py'))
+    os.rmdir(os.path.join(root, 'pkg', 'sub'))
+    with open(os.path.join(root, 'pkg', 'd.py'), 'w') as f:
+        f.write('y\n')
+    changed = [os.path.join(root, 'pkg'), os.path.join(root, 'pkg', 'sub')]
+    files, directories, listed, removed, new, gone = rescan_tree(
+        Job(), root, files, directories, changed, ())
+    assert set(files) == {'a.py', 'pkg/b.py', 'pkg/d.py'}
+    assert directories == {'', 'pkg'}
+    assert set(listed) == {'pkg/b.py', 'pkg/d.py'}
+    assert removed == ['pkg/sub/c.py']
+    assert gone == ['pkg/sub']
+
+
+def test_trailing_slash_excludes_only_folders(tmp_path):
+    root = str(tmp_path)
+    os.makedirs(os.path.join(root, 'build'))
+    os.makedirs(os.path.join(root, 'src', 'dist'))
+    for name in (os.path.join('build', 'a.o'), os.path.join('src', 'build'),
+                 os.path.join('src', 'dist', 'b.js'), 'dist'):
+        with open(os.path.join(root, name), 'w') as f:
+            f.write('x\n')
+    files, directories = list_tree(Job(), root, ('build/', '/dist/'))
+    assert set(files) == {'src/build', 'src/dist/b.js', 'dist'}
+    assert directories == {'', 'src', 'src/dist'}
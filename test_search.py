@@ -0,0 +1,50 @@
+from src.ui.search import compile_query, find_matches, narrow_matches, overlaps_itself, str_index
+
+
+def search(text, query, case_sensitive=False):
+    return list(find_matches(None, text, compile_query(query, case_sensitive)).starts)
+
+
+def narrow(text, query, previous, case_sensitive=False):
+    candidates = find_matches(None, text, compile_query(previous, case_sensitive)).starts
+    pattern = compile_query(query, case_sensitive)
+    return list(narrow_matches(None, text, pattern, candidates).starts)
+
+
+def test_overlaps_itself():
+    assert overlaps_itself("aa")
+    assert overlaps_itself("abca")
+    assert overlaps_itself("Aba")
+    assert not overlaps_itself("Aba", case_sensitive=True)
+    assert not overlaps_itself("aab")
+    assert not overlaps_itself("abc")
+    assert not overlaps_itself("a")
+
+
+def test_narrowing_matches_full_search_without_overlap():
+    text = "foo food fool\nfoot foo"
+    assert narrow(text, "foo", "fo") == search(text, "foo")
+    assert narrow(text, "food", "foo") == search(text, "food")
+
+
+def test_overlapping_previous_query_is_not_narrowed():
+    # "aa" skips the match at 1 that "aab" finds, so narrowing would miss it
+    text = "aaab"
+    assert search(text, "aab") == [1]
+    assert narrow(text, "aab", "aa") == []
+    assert overlaps_itself("aa")
+
+
+def test_overlapping_new_query_is_not_narrowed():
+    # "aba" matches at 0 and, overlapping it, at 2; a search only reports 0
+    text = "ababa"
+    assert search(text, "aba") == [0]
+    assert narrow(text, "aba", "ab") == [0, 2]
+    assert overlaps_itself("aba")
+
+
+def test_str_index():
+    text = "a\U0001F600b\U0001F600c"
+    # Document positions: a=0, emoji=1-2, b=3, emoji=4-5, c=6
+    assert [str_index(text, p) for p in (0, 1, 3, 4, 6)] == [0, 1, 2, 3, 4]
+    assert str_index("abc", 2) == 2
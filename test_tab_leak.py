@@ -0,0 +1,68 @@
+import gc
+import os
+import sys
+import tempfile
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QCoreApplication, QEvent, QObject, QThreadPool
+from src.ui.main_window import MainWindow, CodeEditor
+
+TAB_COUNT = 1000
+# Growth allowed for allocator noise once everything is released
+MAX_RSS_GROWTH = 16 * 1024 * 1024
+
+
+def rss():
+    # Resident set size in bytes, where /proc is available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def settle(app):
+    # Let finished workers report, then run the deleteLater calls
+    QThreadPool.globalInstance().waitForDone()
+    app.processEvents()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    gc.collect()
+
+
+def open_and_close(app, window, path, count):
+    for i in range(count):
+        window.open_file_by_path(path)
+        window.close_tab(window.editor_tabs.currentIndex())
+        if i % 50 == 49:
+            settle(app)
+    settle(app)
+
+
+def test_tab_leak():
+    # Keep the user's session and settings out of it
+    data = tempfile.mkdtemp()
+    os.environ['APPDATA'] = os.environ['XDG_DATA_HOME'] = os.environ['XDG_CONFIG_HOME'] = data
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    path = os.path.join(os.path.dirname(__file__), 'test_files', 'test.py')
+
+    # Warm up caches that are filled once, like fonts and the lexers
+    open_and_close(app, window, path, 20)
+    children = len(window.findChildren(QObject))
+    editors = len([o for o in gc.get_objects() if isinstance(o, CodeEditor)])
+    baseline = rss()
+
+    open_and_close(app, window, path, TAB_COUNT)
+
+    assert window.editor_tabs.count() == 0
+    assert not window.open_documents and not window.tab_history
+    assert len(window.findChildren(QObject)) == children
+    assert len([o for o in gc.get_objects() if isinstance(o, CodeEditor)]) == editors
+    if baseline is not None:
+        assert rss() - baseline < MAX_RSS_GROWTH
+    window.close()
+
+
+if __name__ == '__main__':
+    test_tab_leak()
+    print("No leaks")
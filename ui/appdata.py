@@ -0,0 +1,16 @@
+import os
+
+APP_DIR_NAME = "CodeEditor"
+
+
+def data_dir():
+    # Per-user directory for caches and other state the editor keeps
+    base = (os.environ.get('APPDATA') or os.environ.get('XDG_DATA_HOME')
+            or os.path.join(os.path.expanduser('~'), '.local', 'share'))
+    path = os.path.join(base, APP_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_path(name):
+    return os.path.join(data_dir(), name)
@@ -0,0 +1,93 @@
+import fnmatch
+import os
+import re
+
+# Directory and file names never searched; patterns containing a slash are
+# matched against the path relative to the search root
+DEFAULT_EXCLUDES = ('.git', '.hg', '.svn', '__pycache__', 'node_modules', '.venv', 'venv',
+                    '.tox', '.mypy_cache', '.pytest_cache', '.idea', '*.pyc', '*.pyo',
+                    '*.so', '*.dll', '*.exe', '*.min.js', '*.map')
+# Ignore file read from the search root, one glob per line
+IGNORE_FILE = '.gitignore'
+# Files bigger than this are skipped
+MAX_SEARCH_FILE_BYTES = 32 * 1024 * 1024
+
+
+def compile_excludes(patterns):
+    # One regex for name globs and one for relative path globs, matched
+    # against folders with a trailing slash. A glob ending in a slash only
+    # matches folders and a leading one anchors it to the root.
+    names = []
+    paths = []
+    for pattern in patterns:
+        glob = pattern.rstrip('/')
+        if not glob:
+            continue
+        regex = fnmatch.translate(glob.lstrip('/'))
+        # translate ends the regex with \Z; folders may bring a slash
+        regex = regex[:-2] + ('/' if pattern.endswith('/') else '/?') + regex[-2:]
+        (paths if '/' in glob else names).append(regex)
+    return (re.compile('|'.join(names)) if names else None,
+            re.compile('|'.join(paths)) if paths else None)
+
+
+def is_excluded_entry(name, relative, is_dir, names, paths):
+    # Whether the globs of compile_excludes hide a file or folder, given its
+    # name and relative path
+    if is_dir:
+        name += '/'
+        relative += '/'
+    return ((names is not None and names.match(name) is not None)
+            or (paths is not None and paths.match(relative) is not None))
+
+
+def read_ignore_file(root):
+    # The plain globs of the root ignore file; negations are not supported
+    patterns = []
+    try:
+        with open(os.path.join(root, IGNORE_FILE), 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith(('#', '!')):
+                    patterns.append(line)
+    except OSError:
+        pass
+    return patterns
+
+
+def is_excluded(relative, names, paths):
+    # Whether walk_files skips the file at the relative path: it or one of
+    # the folders above it is excluded
+    parts = relative.split('/')
+    return any(is_excluded_entry(name, '/'.join(parts[:n]), n < len(parts), names, paths)
+               for n, name in enumerate(parts, 1))
+
+
+def walk_files(root, names, paths, directories=None, start=''):
+    # (path, size) of every searchable file under root, or under its start
+    # subdirectory, without following symlinked directories. The relative
+    # path of every directory visited is appended to directories when given.
+    stack = [start]
+    while stack:
+        relative = stack.pop()
+        if directories is not None:
+            directories.append(relative)
+        try:
+            entries = os.scandir(os.path.join(root, relative))
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                entry_path = relative + '/' + entry.name if relative else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if is_excluded_entry(entry.name, entry_path, is_dir, names, paths):
+                        continue
+                    if is_dir:
+                        stack.append(entry_path)
+                    elif entry.is_file():
+                        size = entry.stat().st_size
+                        if size <= MAX_SEARCH_FILE_BYTES:
+                            yield entry.path, size
+                except OSError:
+                    continue
@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from .excludes import DEFAULT_EXCLUDES, compile_excludes, read_ignore_file, walk_files
+from .search import has_astral
+
+# A NUL byte in this much of the start of a file marks it as binary
+BINARY_SNIFF_BYTES = 8192
+# Files are handed to the pool in batches of at most this many files or bytes
+FILE_BATCH_SIZE = 64
+FILE_BATCH_BYTES = 4 * 1024 * 1024
+# Batches queued per pool process before the walk waits for results
+BATCHES_PER_PROCESS = 4
+# Seconds between cancellation checks while waiting for the pool
+WAIT_INTERVAL = 0.05
+# Matches reported per file, and characters of each matching line
+MAX_MATCHES_PER_FILE = 1000
+MAX_RESULT_LINE_CHARS = 300
+
+_pool = None
+
+
+def get_process_pool():
+    # Searching is regex work that holds the GIL, so it runs in processes.
+    # The pool is started on first use and kept for later searches; spawn
+    # rather than fork because the GUI process has threads running.
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=pool_size(),
+                                    mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def pool_size():
+    return os.cpu_count() or 1
+
+
+def search_file(path, pattern):
+    # [(line number, column, length, line)] for the matches in one file, or
+    # None when it is binary or unreadable. Columns and lengths count UTF-16
+    # code units, like positions in the editor.
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if b'\0' in data[:BINARY_SNIFF_BYTES]:
+        return None
+    text = data.decode('utf-8', errors='replace')
+    results = []
+    line_number = 1
+    counted = 0
+    for match in pattern.finditer(text):
+        start, end = match.span()
+        if start == end or text.find('\n', start, end) != -1:
+            continue
+        line_number += text.count('\n', counted, start)
+        counted = start
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        if line_end == -1:
+            line_end = len(text)
+        line = text[line_start:line_end].rstrip('\r')
+        column = start - line_start
+        length = end - start
+        if has_astral(line):
+            length += len([c for c in line[column:column + length] if c > '\uffff'])
+            column += len([c for c in line[:column] if c > '\uffff'])
+        results.append((line_number, column, length, line[:MAX_RESULT_LINE_CHARS]))
+        if len(results) >= MAX_MATCHES_PER_FILE:
+            break
+    return results
+
+
+def search_files(paths, pattern):
+    # Runs in a pool process: (files searched, [(path, matches)])
+    found = []
+    for path in paths:
+        results = search_file(path, pattern)
+        if results:
+            found.append((path, results))
+    return len(paths), found
+
+
+def map_batches(job, files, fn, *args):
+    # Runs fn(paths, *args) in the process pool over batches of the (path,
+    # size) pairs in files, yielding each result as soon as it is in. The
+    # walk that produces files waits while enough batches are queued.
+    global _pool
+    pool = get_process_pool()
+    pending = set()
+
+    def completed(timeout):
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        pending.difference_update(done)
+        return [future.result() for future in done]
+
+    try:
+        batch = []
+        batch_bytes = 0
+        for path, size in files:
+            job.check()
+            batch.append(path)
+            batch_bytes += size
+            if len(batch) >= FILE_BATCH_SIZE or batch_bytes >= FILE_BATCH_BYTES:
+                pending.add(pool.submit(fn, batch, *args))
+                batch = []
+                batch_bytes = 0
+                while len(pending) >= pool_size() * BATCHES_PER_PROCESS:
+                    job.check()
+                    yield from completed(WAIT_INTERVAL)
+        if batch:
+            pending.add(pool.submit(fn, batch, *args))
+        while pending:
+            job.check()
+            yield from completed(WAIT_INTERVAL)
+    except BrokenProcessPool:
+        # A pool process died; the next search starts a fresh pool
+        _pool = None
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def find_in_files(job, root, pattern, excludes=DEFAULT_EXCLUDES, files=None):
+    # Walks root on the calling thread, or takes the (path, size) pairs in
+    # files, and searches batches of them in the process pool. Each finished
+    # batch is reported as (files searched, [(path, matches)]) as soon as it
+    # is in. Returns (files searched, seconds).
+    started = time.perf_counter()
+    if files is None:
+        names, paths = compile_excludes(list(excludes) + read_ignore_file(root))
+        files = walk_files(root, names, paths)
+    searched = 0
+    for count, found in map_batches(job, files, search_files, pattern):
+        searched += count
+        job.report((count, found))
+    return searched, time.perf_counter() - started
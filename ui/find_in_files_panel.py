@@ -0,0 +1,219 @@
+import os
+import re
+
+from PyQt5.QtCore import Qt, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import (QCheckBox, QDialog, QFileDialog, QHBoxLayout, QLabel, QLineEdit,
+                             QPushButton, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget)
+
+from .find_in_files import find_in_files
+from .project_index import ProjectIndexer
+from .search import compile_query
+from .trigram_index import find_with_index, required_literals
+from .workers import Worker, start_worker
+
+# Most Find in Files match lines listed; the rest are only counted
+MAX_SHOWN_RESULTS = 20000
+
+
+class FindInFilesPanel(QWidget):
+    # Searches every file under a folder in the process pool; results are
+    # added as each batch of files comes back
+    result_activated = pyqtSignal(str, int, int, int)
+
+    def __init__(self, tree, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        # Optional trigram index of the project folder, kept up to date in the
+        # background; searches of other folders scan them
+        self.indexer = ProjectIndexer(tree, self)
+        self.stats_dialog = None
+
+        query_layout = QHBoxLayout()
+        self.find_text = QLineEdit()
+        self.find_text.setPlaceholderText("Find in files")
+        self.find_text.returnPressed.connect(self.start_search)
+        self.case_sensitive = QCheckBox("Case sensitive")
+        self.whole_word = QCheckBox("Whole word")
+        self.regex = QCheckBox("Regular expression")
+        self.find_button = QPushButton("Find")
+        self.find_button.clicked.connect(self.start_search)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.clicked.connect(self.cancel)
+        self.stop_button.setEnabled(False)
+        for widget in (self.find_text, self.case_sensitive, self.whole_word, self.regex,
+                       self.find_button, self.stop_button):
+            query_layout.addWidget(widget)
+        layout.addLayout(query_layout)
+
+        root_layout = QHBoxLayout()
+        self.root_text = QLineEdit()
+        self.root_text.setPlaceholderText("Folder")
+        self.root_text.returnPressed.connect(self.start_search)
+        browse_button = QPushButton("Browse...")
+        browse_button.clicked.connect(self.choose_root)
+        self.use_index = QCheckBox("Use index")
+        self.use_index.toggled.connect(self.toggle_index)
+        stats_button = QPushButton("Index Stats...")
+        stats_button.clicked.connect(self.show_index_stats)
+        root_layout.addWidget(self.root_text)
+        root_layout.addWidget(browse_button)
+        root_layout.addWidget(self.use_index)
+        root_layout.addWidget(stats_button)
+        layout.addLayout(root_layout)
+
+        self.results = QTreeWidget()
+        self.results.setHeaderHidden(True)
+        self.results.setUniformRowHeights(True)
+        self.results.itemActivated.connect(self.open_result)
+        layout.addWidget(self.results)
+
+        self.summary = QLabel()
+        layout.addWidget(self.summary)
+
+        # The walk runs on its own thread so that it never holds up the
+        # editor's workers in the global pool
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.job = None
+        self.root = ""
+        self.file_count = 0
+        self.match_count = 0
+        self.shown = 0
+
+    def choose_root(self):
+        folder = QFileDialog.getExistingDirectory(self, "Find in Folder", self.root_text.text())
+        if folder:
+            self.set_root(folder)
+
+    def set_root(self, folder):
+        self.root_text.setText(folder)
+
+    def start_search(self):
+        self.cancel()
+        self.results.clear()
+        self.file_count = self.match_count = self.shown = 0
+        text = self.find_text.text()
+        root = self.root_text.text()
+        if not text:
+            self.summary.clear()
+            return
+        if not os.path.isdir(root):
+            self.summary.setText(f"Not a folder: {root}")
+            return
+        try:
+            pattern = compile_query(text, self.case_sensitive.isChecked(),
+                                    self.whole_word.isChecked(), self.regex.isChecked())
+        except re.error as e:
+            self.summary.setText(f"Invalid pattern: {e}")
+            return
+
+        self.root = root
+        if self.indexer.covers(root):
+            literals = required_literals(text, self.case_sensitive.isChecked(),
+                                         self.regex.isChecked())
+            job = Worker(find_with_index, self.indexer.index, pattern, literals)
+        else:
+            job = Worker(find_in_files, root, pattern)
+        job.indexed = self.indexer.covers(root)
+        job.signals.progress.connect(lambda batch, job=job: self.add_results(job, batch))
+        job.signals.finished.connect(lambda result, job=job: self.search_finished(job, result))
+        job.signals.failed.connect(lambda message, job=job: self.search_failed(job, message))
+        self.job = start_worker(job, self.pool)
+        self.stop_button.setEnabled(True)
+        self.summary.setText("Searching...")
+
+    def add_results(self, job, batch):
+        if job is not self.job:
+            return
+        count, found = batch
+        self.file_count += count
+        self.results.setUpdatesEnabled(False)
+        try:
+            for path, matches in found:
+                self.match_count += len(matches)
+                if self.shown >= MAX_SHOWN_RESULTS:
+                    continue
+                item = QTreeWidgetItem(self.results, [f"{os.path.relpath(path, self.root)} ({len(matches)})"])
+                item.setData(0, Qt.UserRole, (path, 0, 0, 0))
+                for line, column, length, text in matches[:MAX_SHOWN_RESULTS - self.shown]:
+                    child = QTreeWidgetItem(item, [f"{line}: {text.strip()}"])
+                    child.setData(0, Qt.UserRole, (path, line, column, length))
+                self.shown += min(len(matches), MAX_SHOWN_RESULTS - self.shown)
+                item.setExpanded(True)
+        finally:
+            self.results.setUpdatesEnabled(True)
+        self.summary.setText(f"{self.match_count:,} matches, {self.file_count:,} files searched...")
+
+    def search_finished(self, job, result):
+        if job is not self.job:
+            return
+        self.job = None
+        self.stop_button.setEnabled(False)
+        searched, elapsed = result
+        text = (f"{self.match_count:,} matches in {self.results.topLevelItemCount():,} files, "
+                f"{searched:,} files searched in {elapsed * 1000:.0f} ms")
+        if job.indexed and self.indexer.index is not None:
+            text += f" using the index of {len(self.indexer.index.ids):,} files"
+            # The stats view shows the last query
+            self.indexer.changed.emit()
+        if self.shown < self.match_count:
+            text += f" (first {self.shown:,} shown)"
+        self.summary.setText(text)
+
+    def search_failed(self, job, message):
+        if job is self.job:
+            self.job = None
+            self.stop_button.setEnabled(False)
+            self.summary.setText(f"Search failed: {message}")
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+            self.stop_button.setEnabled(False)
+            self.summary.setText(f"Stopped: {self.match_count:,} matches, "
+                                 f"{self.file_count:,} files searched")
+
+    def open_result(self, item):
+        path, line, column, length = item.data(0, Qt.UserRole)
+        self.result_activated.emit(path, line, column, length)
+
+    def toggle_index(self, enabled):
+        self.indexer.set_enabled(enabled)
+
+    def show_index_stats(self):
+        if self.stats_dialog is None:
+            self.stats_dialog = IndexStatsDialog(self.indexer, self)
+        self.stats_dialog.show()
+        self.stats_dialog.raise_()
+
+
+class IndexStatsDialog(QDialog):
+    # Live view of the project index: size, build time, last query
+    def __init__(self, indexer, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Index Statistics")
+        self.setModal(False)
+        self.indexer = indexer
+        layout = QVBoxLayout(self)
+        self.text = QLabel()
+        self.text.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.text)
+        button_layout = QHBoxLayout()
+        rebuild_button = QPushButton("Rebuild")
+        rebuild_button.clicked.connect(indexer.rebuild)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(rebuild_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        indexer.changed.connect(self.refresh)
+        self.refresh()
+
+    def refresh(self):
+        if self.isVisible() or not self.text.text():
+            self.text.setText(self.indexer.stats_text())
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
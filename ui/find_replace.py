@@ -0,0 +1,374 @@
+import re
+import time
+
+from PyQt5.QtCore import QObject, QPoint, pyqtSignal
+from PyQt5.QtGui import QColor, QTextCharFormat, QTextCursor
+from PyQt5.QtWidgets import (QCheckBox, QDialog, QHBoxLayout, QLabel, QLineEdit, QPushButton,
+                             QTextEdit, QVBoxLayout)
+
+from .search import (MatchList, compile_query, find_matches, has_astral, narrow_matches,
+                     overlaps_itself, replace_matches, str_index)
+from .workers import Worker, start_worker
+
+# Edits touching more text than this are re-searched on a worker
+INCREMENTAL_SEARCH_CHARS = 100000
+# Documents at least this long have Replace All computed on a worker
+REPLACE_IN_WORKER_CHARS = 1000000
+
+
+class SearchSession(QObject):
+    # All matches of the find query in one editor, as sorted document
+    # positions. Full searches run on a worker over a snapshot of the text;
+    # a query that extends the previous literal one only re-checks the old
+    # matches, and edits re-search just the blocks they touched. Only the
+    # matches inside the viewport are drawn as extra selections.
+    changed = pyqtSignal()
+    # Replace All outcome: occurrences and milliseconds, or an error message
+    replaced = pyqtSignal(int, float)
+    replace_failed = pyqtSignal(str)
+
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+        self.query = None
+        self.pattern = None
+        self.error = None
+        self.matches = MatchList()
+        self.current = -1
+        self.job = None
+        self.jump_pending = False
+        self.replace_job = None
+        # Text the last full search ran on, kept while the document is unchanged
+        self.snapshot = None
+        self.snapshot_key = None
+        self.snapshot_astral = False
+        self.match_format = QTextCharFormat()
+        self.match_format.setBackground(QColor("#613214"))
+        self.current_format = QTextCharFormat()
+        self.current_format.setBackground(QColor("#515C6A"))
+        editor.document().contentsChange.connect(self.document_changed)
+        editor.verticalScrollBar().valueChanged.connect(self.refresh_selections)
+
+    @property
+    def searching(self):
+        return self.job is not None
+
+    def set_query(self, text, case_sensitive=False, whole_word=False, regex=False):
+        query = (text, case_sensitive, whole_word, regex)
+        if query == self.query and self.error is None:
+            return
+        previous = self.query
+        self.cancel()
+        self.query = query
+        self.error = None
+        if not text:
+            self.set_matches(MatchList())
+            return
+        try:
+            self.pattern = compile_query(text, case_sensitive, whole_word, regex)
+        except re.error as e:
+            self.pattern = None
+            self.error = str(e)
+            self.set_matches(MatchList())
+            return
+
+        document = self.editor.document()
+        narrowing = (previous is not None and previous[0] and not regex and not whole_word
+                     and not previous[3] and not previous[2]
+                     and previous[1] == case_sensitive and text.startswith(previous[0])
+                     and not overlaps_itself(previous[0], case_sensitive)
+                     and not overlaps_itself(text, case_sensitive)
+                     and self.snapshot_key == self.document_key()
+                     and not self.snapshot_astral)
+        if narrowing:
+            job = Worker(narrow_matches, self.snapshot, self.pattern, self.matches.copy())
+        else:
+            self.take_snapshot()
+            job = Worker(find_matches, self.snapshot, self.pattern)
+        job.key = self.snapshot_key
+        job.signals.finished.connect(lambda result, job=job: self.search_finished(job, result))
+        job.signals.failed.connect(lambda message, job=job: self.search_failed(job, message))
+        self.job = start_worker(job)
+        self.changed.emit()
+
+    def document_key(self):
+        # Changes with every edit, including text streamed in with signals off
+        return self.editor.highlighter.edits, self.editor.document().characterCount()
+
+    def take_snapshot(self):
+        if self.snapshot is None or self.snapshot_key != self.document_key():
+            self.snapshot = self.editor.document().toPlainText()
+            self.snapshot_key = self.document_key()
+            self.snapshot_astral = has_astral(self.snapshot)
+
+    def search_finished(self, job, result):
+        if job is not self.job:
+            return
+        self.job = None
+        if job.key != self.document_key():
+            # Edited while the worker ran: its positions are stale
+            query, self.query = self.query, None
+            self.set_query(*query)
+            return
+        self.set_matches(result)
+        if self.jump_pending:
+            self.jump_pending = False
+            self.find_next()
+
+    def search_failed(self, job, message):
+        if job is self.job:
+            self.job = None
+            self.error = message
+            self.set_matches(MatchList())
+
+    def set_matches(self, matches):
+        self.matches = matches
+        self.current = -1
+        self.refresh_selections()
+        self.changed.emit()
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+
+    def clear(self):
+        self.cancel()
+        self.query = None
+        self.pattern = None
+        self.error = None
+        self.snapshot = None
+        self.snapshot_key = None
+        self.set_matches(MatchList())
+
+    def document_changed(self, position, removed, added):
+        document = self.editor.document()
+        self.snapshot = None
+        self.snapshot_key = None
+        if self.pattern is None:
+            return
+        if self.job is not None:
+            # The running search notices the edit and starts over
+            return
+
+        first = document.findBlock(position)
+        last = document.findBlock(position + added)
+        if not last.isValid():
+            last = document.lastBlock()
+        start = first.position()
+        end = last.position() + last.length() - 1
+        if end - start > INCREMENTAL_SEARCH_CHARS:
+            query, self.query = self.query, None
+            self.set_query(*query)
+            return
+
+        # Matches never cross a line, so the touched blocks are re-searched
+        # on their own and later matches just move by the size change
+        cursor = QTextCursor(document)
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        text = cursor.selectedText().replace('\u2029', '\n')
+        found = find_matches(None, text, self.pattern, start)
+        delta = added - removed
+        i, j = self.matches.replace(start, end - delta, found.starts, found.lengths, delta)
+        if self.current >= j:
+            self.current += len(found) - (j - i)
+        elif self.current >= i:
+            self.current = min(i, len(self.matches) - 1)
+        self.refresh_selections()
+        self.changed.emit()
+
+    def find_next(self, backward=False):
+        if self.job is not None:
+            self.jump_pending = True
+            return
+        matches = self.matches
+        if not matches:
+            return
+        cursor = self.editor.textCursor()
+        if backward:
+            index = matches.bisect(cursor.selectionStart()) - 1
+        else:
+            index = matches.bisect(cursor.selectionEnd())
+        self.current = index % len(matches)
+        start = matches.start(self.current)
+        cursor.setPosition(start)
+        cursor.setPosition(start + matches.length(self.current), QTextCursor.KeepAnchor)
+        self.editor.setTextCursor(cursor)
+        self.editor.centerCursor()
+        self.refresh_selections()
+        self.changed.emit()
+
+    def refresh_selections(self):
+        editor = self.editor
+        selections = []
+        matches = self.matches
+        if matches:
+            viewport = editor.viewport()
+            first = editor.firstVisibleBlock().position()
+            bottom = editor.cursorForPosition(QPoint(viewport.width(), viewport.height()))
+            last = bottom.block().position() + bottom.block().length()
+            document = editor.document()
+            for index in range(matches.bisect(first), matches.bisect(last)):
+                start = matches.start(index)
+                selection = QTextEdit.ExtraSelection()
+                selection.cursor = QTextCursor(document)
+                selection.cursor.setPosition(start)
+                selection.cursor.setPosition(start + matches.length(index),
+                                             QTextCursor.KeepAnchor)
+                selection.format = (self.current_format if index == self.current
+                                    else self.match_format)
+                selections.append(selection)
+        editor.setExtraSelections(selections)
+
+    def replace_current(self, replacement):
+        # Replace the selected match, if the selection is one, then move on
+        matches = self.matches
+        cursor = self.editor.textCursor()
+        if (self.pattern is not None and 0 <= self.current < len(matches)
+                and cursor.selectionStart() == matches.start(self.current)
+                and cursor.selectionEnd() == matches.start(self.current) + matches.length(self.current)):
+            if self.query[3]:
+                match = self.match_at(matches.start(self.current), matches.length(self.current))
+                if match is None:
+                    self.find_next()
+                    return
+                try:
+                    replacement = match.expand(replacement)
+                except (re.error, IndexError) as e:
+                    self.replace_failed.emit(str(e))
+                    return
+            cursor.insertText(replacement)
+        self.find_next()
+
+    def match_at(self, start, length):
+        # The pattern's match at a document position, found in the whole
+        # text so lookbehinds and lookaheads see what surrounds it; None when
+        # the text there no longer matches in full
+        self.take_snapshot()
+        text = self.snapshot
+        end = start + length
+        if self.snapshot_astral:
+            start, end = str_index(text, start), str_index(text, end)
+        match = self.pattern.match(text, start)
+        if match is None or match.end() != end:
+            return None
+        return match
+
+    def replace_all(self, replacement):
+        # The new text is computed in one pass over a snapshot, off the GUI
+        # thread for big documents, and goes in as a single edit that spans
+        # only the first to the last match
+        if self.pattern is None or self.replace_job is not None:
+            return
+        started = time.perf_counter()
+        self.take_snapshot()
+        regex = self.query[3]
+        if len(self.snapshot) < REPLACE_IN_WORKER_CHARS:
+            try:
+                result = replace_matches(None, self.snapshot, self.pattern, replacement, regex)
+            except (re.error, IndexError) as e:
+                self.replace_failed.emit(str(e))
+                return
+            self.apply_replacement(result, started)
+            return
+        job = Worker(replace_matches, self.snapshot, self.pattern, replacement, regex)
+        job.key = self.snapshot_key
+        job.signals.finished.connect(
+            lambda result, job=job: self.replacement_computed(job, replacement, result, started))
+        job.signals.failed.connect(lambda message: self.replacement_failed(message))
+        self.replace_job = start_worker(job)
+
+    def replacement_computed(self, job, replacement, result, started):
+        self.replace_job = None
+        if job.key != self.document_key():
+            # Edited meanwhile, the positions no longer apply
+            self.replace_all(replacement)
+            return
+        self.apply_replacement(result, started)
+
+    def replacement_failed(self, message):
+        self.replace_job = None
+        self.replace_failed.emit(message)
+
+    def apply_replacement(self, result, started):
+        count, start, end, middle = result
+        if count:
+            self.editor.replace_text(start, end, middle)
+        self.replaced.emit(count, (time.perf_counter() - started) * 1000)
+
+    def status(self):
+        if self.error is not None:
+            return f"Invalid pattern: {self.error}"
+        if self.job is not None:
+            return "Searching..."
+        if self.query is None or not self.query[0]:
+            return ""
+        if not self.matches:
+            return "No results"
+        if self.current >= 0:
+            return f"{self.current + 1:,} of {len(self.matches):,}"
+        if len(self.matches) == 1:
+            return "1 match"
+        return f"{len(self.matches):,} matches"
+
+
+class FindDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Find")
+        # Stays open while the editor is used, results follow the typing
+        self.setModal(False)
+        layout = QVBoxLayout(self)
+        
+        # Find text
+        self.find_text = QLineEdit()
+        self.find_text.setPlaceholderText("Find")
+        layout.addWidget(self.find_text)
+
+        # Replacement, only shown in replace mode
+        self.replace_text = QLineEdit()
+        self.replace_text.setPlaceholderText("Replace with")
+        layout.addWidget(self.replace_text)
+        
+        # Options
+        self.case_sensitive = QCheckBox("Case sensitive")
+        self.whole_word = QCheckBox("Whole word")
+        self.regex = QCheckBox("Regular expression")
+        layout.addWidget(self.case_sensitive)
+        layout.addWidget(self.whole_word)
+        layout.addWidget(self.regex)
+
+        # Match count, or why there is none
+        self.match_count = QLabel()
+        layout.addWidget(self.match_count)
+        
+        # Buttons
+        button_layout = QHBoxLayout()
+        self.previous_button = QPushButton("Find Previous")
+        self.find_button = QPushButton("Find Next")
+        self.find_button.setDefault(True)
+        self.cancel_button = QPushButton("Close")
+        self.cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.previous_button)
+        button_layout.addWidget(self.find_button)
+        button_layout.addWidget(self.cancel_button)
+        layout.addLayout(button_layout)
+
+        replace_layout = QHBoxLayout()
+        self.replace_button = QPushButton("Replace")
+        self.replace_all_button = QPushButton("Replace All")
+        replace_layout.addWidget(self.replace_button)
+        replace_layout.addWidget(self.replace_all_button)
+        layout.addLayout(replace_layout)
+        self.set_replace_mode(False)
+
+    def set_replace_mode(self, enabled):
+        self.setWindowTitle("Replace" if enabled else "Find")
+        self.replace_text.setVisible(enabled)
+        self.replace_button.setVisible(enabled)
+        self.replace_all_button.setVisible(enabled)
+
+    def options(self):
+        return (self.find_text.text(), self.case_sensitive.isChecked(),
+                self.whole_word.isChecked(), self.regex.isChecked())
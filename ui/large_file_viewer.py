@@ -0,0 +1,178 @@
+import mmap
+import os
+
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QFont, QFontMetrics, QPainter
+from PyQt5.QtWidgets import QAbstractScrollArea, QFrame
+
+from .line_index import LineIndex, build_line_index
+from .syntax import get_tokenizer, language_for_path
+from .themes import theme_formats
+from .workers import Worker, start_worker
+
+# Longest part of a line the viewer decodes and draws
+MAX_VIEWER_LINE_BYTES = 16 * 1024
+# Left margin of the viewer's text, in pixels
+VIEWER_MARGIN = 4
+
+
+class LargeFileViewer(QAbstractScrollArea):
+    # Read-only tab for files too big for CodeEditor. The file is memory
+    # mapped and only the lines on screen are decoded, tokenized and drawn.
+    # The vertical scroll bar counts lines, so scrolling and go-to-line cost
+    # the same anywhere in the file; a worker builds the line index while the
+    # view is already in use and the scroll range grows as it goes.
+    index_progress = pyqtSignal(float)
+
+    def __init__(self, file_path, theme, parent=None):
+        super().__init__(parent)
+        self.current_file = file_path
+        self.detect_job = None
+        self.index_job = None
+        self.current_line = None
+        self.max_width = 0
+        self.set_theme(theme)
+        self.set_language(language_for_path(file_path))
+
+        self.file = open(file_path, 'rb')
+        if os.fstat(self.file.fileno()).st_size:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = b''
+        self.index = LineIndex()
+
+        font = QFont("Consolas", 10)
+        self.setFont(font)
+        self.viewport().setFont(font)
+        metrics = QFontMetrics(font)
+        self.line_height = metrics.height()
+        self.ascent = metrics.ascent()
+        self.setFrameShape(QFrame.NoFrame)
+        self.verticalScrollBar().setSingleStep(1)
+        self.horizontalScrollBar().setSingleStep(metrics.averageCharWidth())
+        self.update_scrollbars()
+
+    def set_language(self, language):
+        # Only the regex rules are used here, Pygments aliases fall back to
+        # the generic set
+        self.language = language
+        self.tokenizer = get_tokenizer(language)
+        self.viewport().update()
+
+    def set_theme(self, theme):
+        # Pens for the shared formats of the theme
+        self.formats = {kind: fmt.foreground().color()
+                        for kind, fmt in theme_formats(theme).items()}
+        self.viewport().update()
+
+    def start_indexing(self):
+        job = Worker(build_line_index, self.current_file, self.index)
+        job.signals.progress.connect(self.indexing_progressed)
+        job.signals.finished.connect(lambda index: self.indexing_progressed(1.0))
+        self.index_job = start_worker(job)
+
+    def indexing_progressed(self, fraction):
+        if fraction >= 1.0:
+            self.index_job = None
+        self.update_scrollbars()
+        self.viewport().update()
+        self.index_progress.emit(fraction)
+
+    def line_count(self):
+        return self.index.line_count
+
+    def visible_line_count(self):
+        return max(1, self.viewport().height() // self.line_height)
+
+    def update_scrollbars(self):
+        visible = self.visible_line_count()
+        vbar = self.verticalScrollBar()
+        vbar.setRange(0, max(0, self.index.line_count - visible))
+        vbar.setPageStep(visible)
+        hbar = self.horizontalScrollBar()
+        hbar.setRange(0, max(0, self.max_width - self.viewport().width()))
+        hbar.setPageStep(self.viewport().width())
+
+    def lines(self, first, last):
+        # Text of lines first to last - 1, walking on from the first one
+        data = self.data
+        start = self.index.line_start(data, first)
+        for _ in range(first, last):
+            end = data.find(b'\n', start)
+            if end == -1:
+                end = len(data)
+            text = data[start:min(end, start + MAX_VIEWER_LINE_BYTES)]
+            yield text.decode('utf-8', errors='replace').rstrip('\r').expandtabs(4)
+            start = end + 1
+
+    def go_to_line(self, line):
+        self.current_line = min(max(line, 1), self.index.line_count) - 1
+        self.verticalScrollBar().setValue(self.current_line - self.visible_line_count() // 2)
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        palette = self.palette()
+        text_color = palette.text().color()
+        painter.fillRect(event.rect(), palette.base())
+        metrics = painter.fontMetrics()
+        width = self.viewport().width()
+        left = VIEWER_MARGIN - self.horizontalScrollBar().value()
+        first = self.verticalScrollBar().value()
+        last = min(first + self.visible_line_count() + 1, self.index.line_count)
+
+        # Tokenizer state is carried down the visible slice only; constructs
+        # opened above the top line are not known here
+        state = 0
+        widest = self.max_width
+        for row, text in enumerate(self.lines(first, last)):
+            top = row * self.line_height
+            if first + row == self.current_line:
+                painter.fillRect(0, top, width, self.line_height, palette.alternateBase())
+            spans, state = self.tokenizer.tokenize(text, state)
+            x = left
+            y = top + self.ascent
+            pos = 0
+            for start, length, kind in spans + [(len(text), 0, None)]:
+                if start > pos:
+                    painter.setPen(text_color)
+                    painter.drawText(x, y, text[pos:start])
+                    x += metrics.horizontalAdvance(text[pos:start])
+                if length:
+                    painter.setPen(self.formats[kind])
+                    painter.drawText(x, y, text[start:start + length])
+                    x += metrics.horizontalAdvance(text[start:start + length])
+                pos = start + length
+            widest = max(widest, x - left + 2 * VIEWER_MARGIN)
+        painter.end()
+
+        if widest > self.max_width:
+            self.max_width = widest
+            self.update_scrollbars()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbars()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Home and event.modifiers() & Qt.ControlModifier:
+            self.verticalScrollBar().setValue(0)
+        elif event.key() == Qt.Key_End and event.modifiers() & Qt.ControlModifier:
+            self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        else:
+            super().keyPressEvent(event)
+
+    def close_file(self):
+        if self.index_job is not None:
+            self.index_job.cancel()
+            self.index_job = None
+        if self.detect_job is not None:
+            self.detect_job.cancel()
+            self.detect_job = None
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b''
+        self.file.close()
@@ -0,0 +1,52 @@
+import os
+from array import array
+from itertools import accumulate
+
+# Only every LINE_INDEX_STRIDE-th line start is stored; the lines in between
+# are found by scanning forward from the nearest stored one
+LINE_INDEX_STRIDE = 64
+# Bytes of the file scanned per step while building the index
+INDEX_CHUNK_BYTES = 4 * 1024 * 1024
+
+
+class LineIndex:
+    # Sparse index of line start offsets. build_line_index fills it on a
+    # worker thread while the GUI already reads from it: offsets only grow,
+    # and line_count is raised after the offsets covering it are stored.
+    def __init__(self):
+        self.offsets = array('q', [0])
+        self.line_count = 1
+        self.complete = False
+
+    def line_start(self, data, number):
+        start = self.offsets[number // LINE_INDEX_STRIDE]
+        for _ in range(number % LINE_INDEX_STRIDE):
+            start = data.find(b'\n', start) + 1
+        return start
+
+
+def build_line_index(job, path, index):
+    # Plain reads rather than a mapping, so the scan goes through the page
+    # cache without making the whole file resident in this process
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        newlines = 0
+        pos = 0
+        while True:
+            job.check()
+            chunk = f.read(INDEX_CHUNK_BYTES)
+            if not chunk:
+                break
+            pieces = chunk.split(b'\n')
+            # Start offsets of the lines following each newline in the chunk,
+            # of which only the stride multiples are kept
+            starts = list(accumulate((len(piece) + 1 for piece in pieces[:-1]),
+                                     initial=pos))[1:]
+            first = -(newlines + 1) % LINE_INDEX_STRIDE
+            index.offsets.extend(starts[first::LINE_INDEX_STRIDE])
+            newlines += len(starts)
+            index.line_count = newlines + 1
+            pos += len(chunk)
+            job.report(min(pos / size, 0.99))
+    index.complete = True
+    return index
@@ -0,0 +1,168 @@
+import re
+import time
+from bisect import bisect_right
+from itertools import accumulate
+
+# Paths per chunk; chunks missing a character of the query are skipped
+CHUNK_PATHS = 1024
+# Most paths a quick-open search returns
+MAX_PATH_RESULTS = 100
+# Ranking tiers, best first: the query starts the file name, is in the file
+# name, is spread over the file name, is in the path, is spread over it
+NAME_PREFIX, NAME_SUBSTRING, NAME_FUZZY, PATH_SUBSTRING, PATH_FUZZY = range(5)
+
+
+class PathChunk:
+    # One run of consecutive paths as two lowercased strings, of the whole
+    # paths and of the file names, that a regex can scan in one call. Every
+    # line starts with a newline, so a file name prefix is a plain substring.
+    __slots__ = ('first', 'paths', 'names', 'path_starts', 'name_starts', 'chars')
+
+    def __init__(self, first, paths):
+        self.first = first
+        lowered = [path.lower() for path in paths]
+        names = [path.rpartition('/')[2] for path in lowered]
+        self.paths = '\n' + '\n'.join(lowered)
+        self.names = '\n' + '\n'.join(names)
+        self.path_starts = list(accumulate((len(path) + 1 for path in lowered), initial=1))
+        self.name_starts = list(accumulate((len(name) + 1 for name in names), initial=1))
+        self.chars = frozenset(self.paths)
+
+    def matching_lines(self, pattern, names, spread=False):
+        # (line number, score) for the lines pattern matches, at most once per
+        # line. A lower score is a better match: how far into the line it
+        # starts, or for a query spread over the line, how much of it it
+        # spans. A match never spans lines, so its last character tells the
+        # line.
+        text, starts = (self.names, self.name_starts) if names else (self.paths, self.path_starts)
+        search = pattern.search
+        match = search(text)
+        while match is not None:
+            start, end = match.span()
+            line = bisect_right(starts, end - 1) - 1
+            yield line, end - start if spread else start - starts[line]
+            # From the newline that opens the next line, which a file name
+            # prefix match starts with
+            match = search(text, starts[line + 1] - 1)
+
+
+class PathIndex:
+    # Every file path of a project, relative and with forward slashes, kept
+    # shortest file name first so that the first matches a scan comes across
+    # in each tier are the best ones
+    def __init__(self, paths):
+        self.paths = sorted(paths)
+        self.paths.sort(key=lambda path: ((len(path) - path.rfind('/')) << 16) | len(path))
+        self.chunks = [PathChunk(first, self.paths[first:first + CHUNK_PATHS])
+                       for first in range(0, len(self.paths), CHUNK_PATHS)]
+
+    def __len__(self):
+        return len(self.paths)
+
+
+def fuzzy_pattern(query):
+    # Matches the characters of query in order with anything in between on
+    # the same line; the negated classes never need to backtrack
+    parts = [re.escape(query[0])]
+    for char in query[1:]:
+        parts.append(f'[^\\n{re.escape(char)}]*{re.escape(char)}')
+    return re.compile(''.join(parts))
+
+
+class PathSearch:
+    # Ranks the paths of an index against a query a slice at a time. run()
+    # scans until its time budget is spent; results then holds the best paths
+    # found so far, which later slices may still reorder or displace.
+    #
+    # Each chunk is scanned for every tier at once, so the first slice
+    # already shows what the chunks it got through hold. A tier collects the
+    # first paths it matches, shortest file name first, up to the room the
+    # tiers above it leave, and ranks them by score. Chunks a tier found
+    # nothing in are remembered: a search for a longer query, given this one
+    # as previous, skips them in that tier.
+    def __init__(self, index, query, limit=MAX_PATH_RESULTS, previous=None):
+        self.index = index
+        self.query = ''.join(query.lower().replace('\\', '/').split())
+        self.limit = limit
+        self.results = []
+        self.tiers = []
+        self.done = False
+        # Chunks with no match, by tier
+        self.empty = {}
+        # (score, path number) pairs collected, by tier
+        self.found = {}
+        skip = {}
+        if (previous is not None and previous.index is index and previous.query
+                and self.query.startswith(previous.query)):
+            skip = previous.empty
+        self.steps = self.scan(skip)
+
+    def scan(self, skip):
+        query = self.query
+        if not query:
+            self.results = self.index.paths[:self.limit]
+            self.tiers = [NAME_PREFIX] * len(self.results)
+            return
+        substring = re.compile(re.escape(query))
+        fuzzy = fuzzy_pattern(query) if len(query) > 1 else None
+        tiers = [(PATH_SUBSTRING, substring, False, False), (PATH_FUZZY, fuzzy, False, True)]
+        if '/' not in query:
+            tiers[:0] = [(NAME_PREFIX, re.compile(re.escape('\n' + query)), True, False),
+                         (NAME_SUBSTRING, substring, True, False), (NAME_FUZZY, fuzzy, True, True)]
+        tiers = [tier for tier in tiers if tier[1] is not None]
+        for tier, _, _, _ in tiers:
+            self.empty[tier] = set(skip.get(tier, ()))
+            self.found[tier] = []
+        needed = frozenset(query)
+        best = self.found[tiers[0][0]]
+        for chunk in self.index.chunks:
+            if not needed <= chunk.chars:
+                continue
+            room = self.limit
+            taken = set()
+            for tier, pattern, names, spread in tiers:
+                found = self.found[tier]
+                empty = self.empty[tier]
+                if len(found) < room and chunk not in empty:
+                    matched = False
+                    for line, score in chunk.matching_lines(pattern, names, spread):
+                        matched = True
+                        if line not in taken:
+                            taken.add(line)
+                            found.append((score, chunk.first + line))
+                            if len(found) >= room:
+                                break
+                    if not matched:
+                        empty.add(chunk)
+                room -= len(found)
+                if room <= 0:
+                    break
+            yield
+            if len(best) >= self.limit:
+                # Nothing can rank above a full first tier
+                return
+
+    def rank(self):
+        paths = self.index.paths
+        self.results = []
+        self.tiers = []
+        for tier, found in self.found.items():
+            for score, number in sorted(found)[:self.limit - len(self.results)]:
+                self.results.append(paths[number])
+                self.tiers.append(tier)
+
+    def run(self, budget):
+        # True once the search is complete
+        deadline = time.perf_counter() + budget
+        for _ in self.steps:
+            if time.perf_counter() >= deadline:
+                self.rank()
+                return False
+        if self.found:
+            self.rank()
+        self.done = True
+        return True
+
+
+def build_path_index(job, paths):
+    return PathIndex(paths)
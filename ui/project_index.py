@@ -0,0 +1,218 @@
+import os
+import time
+
+from PyQt5.QtCore import QObject, QThreadPool, QTimer, pyqtSignal
+
+from .trigram_index import (build_trigram_index, catch_up_changes, index_changes,
+                            load_trigram_index, save_trigram_index)
+from .workers import Worker, start_worker
+
+# Quiet time after an update before the index is written back, in ms
+INDEX_SAVE_DELAY = 5000
+
+
+class ProjectIndexer(QObject):
+    # Keeps the trigram index of the project tree's folder while enabled:
+    # loads it from disk or builds it from the tree's listing in the
+    # background, then brings it up to date with the files the tree reports
+    # changed. Loading, building, updating and saving take turns on one
+    # thread, so the index only ever changes on the GUI thread.
+    changed = pyqtSignal()
+
+    def __init__(self, tree, parent=None):
+        super().__init__(parent)
+        self.tree = tree
+        self.enabled = False
+        self.root = None
+        self.index = None
+        self.state = "Off"
+        self.indexed = 0
+        self.job = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        # Relative paths the tree listed again, or lost, since the last update
+        self.listed = set()
+        self.removed = set()
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(INDEX_SAVE_DELAY)
+        self.save_timer.timeout.connect(self.start_save)
+        tree.listed.connect(self.tree_listed)
+        tree.changed.connect(self.tree_changed)
+
+    def covers(self, root):
+        return (self.index is not None and root is not None
+                and os.path.normcase(os.path.abspath(root)) == os.path.normcase(self.root))
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.tree_listed()
+
+    def tree_listed(self):
+        root = self.tree.root if self.enabled else None
+        if (root is not None and self.root is not None
+                and os.path.normcase(root) == os.path.normcase(self.root)):
+            self.catch_up()
+            return
+        self.close()
+        if root is None:
+            return
+        self.root = root
+        self.set_state("Loading")
+        self.run(Worker(load_trigram_index, root), self.loaded)
+
+    def close(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+        if self.index is not None and self.save_timer.isActive():
+            # Write back what the last updates changed before letting go
+            start_worker(Worker(save_trigram_index, self.index), self.pool)
+        self.save_timer.stop()
+        self.listed.clear()
+        self.removed.clear()
+        self.root = None
+        self.index = None
+        self.set_state("Off")
+
+    def rebuild(self):
+        if self.root is None or self.tree.listing:
+            return
+        if self.job is not None:
+            self.job.cancel()
+        # The build covers whatever the tree reported so far
+        self.listed.clear()
+        self.removed.clear()
+        self.indexed = 0
+        self.set_state("Building")
+        job = Worker(build_trigram_index, self.root, self.tree.files)
+        job.signals.progress.connect(lambda indexed, job=job: self.build_progressed(job, indexed))
+        self.run(job, self.built)
+
+    def run(self, job, finished):
+        job.signals.finished.connect(lambda result, job=job: self.job_finished(job, finished, result))
+        job.signals.failed.connect(lambda message, job=job: self.job_failed(job, message))
+        self.job = start_worker(job, self.pool)
+
+    def job_finished(self, job, finished, result):
+        if job is not self.job:
+            return
+        self.job = None
+        finished(result)
+        if self.job is None:
+            self.start_update()
+
+    def job_failed(self, job, message):
+        if job is self.job:
+            self.job = None
+            self.set_state(f"Failed: {message}")
+
+    def loaded(self, index):
+        self.index = index
+        if index is not None:
+            self.set_state("Ready")
+        elif self.tree.listing:
+            self.set_state("Waiting for the folder listing")
+        self.catch_up()
+
+    def catch_up(self):
+        # Once the tree is listed, builds the index if there was none on
+        # disk, or else checks every file against it, for whatever changed
+        # while the editor was not running
+        if self.root is None or self.job is not None or self.tree.listing:
+            return
+        if self.index is None:
+            self.rebuild()
+            return
+        self.listed.clear()
+        self.removed.clear()
+        self.set_state("Updating")
+        job = Worker(catch_up_changes, self.index, self.tree.files)
+        job.index = self.index
+        self.run(job, lambda result, job=job: self.updated(job, result))
+
+    def build_progressed(self, job, indexed):
+        if job is self.job:
+            self.indexed = indexed
+            self.changed.emit()
+
+    def built(self, index):
+        self.index = index
+        self.set_state("Ready")
+
+    def tree_changed(self, listed, removed):
+        if self.root is None:
+            return
+        self.listed.difference_update(removed)
+        self.removed.difference_update(listed)
+        self.listed.update(listed)
+        self.removed.update(removed)
+        self.start_update()
+
+    def start_update(self):
+        if self.index is None or self.job is not None or not (self.listed or self.removed):
+            return
+        listed = sorted(self.listed)
+        removed = sorted(self.removed)
+        self.listed.clear()
+        self.removed.clear()
+        self.set_state("Updating")
+        job = Worker(index_changes, self.index, listed, removed)
+        job.index = self.index
+        self.run(job, lambda result, job=job: self.updated(job, result))
+
+    def updated(self, job, result):
+        index = self.index
+        if job.index is not index:
+            return
+        entries, masks, removed = result
+        index.remove_files(removed)
+        index.add_files(entries, masks)
+        if index.needs_compaction():
+            self.rebuild()
+            return
+        if entries or removed:
+            self.save_timer.start()
+        self.set_state("Ready")
+
+    def start_save(self):
+        if self.index is None:
+            return
+        if self.job is not None:
+            self.save_timer.start()
+            return
+        self.run(Worker(save_trigram_index, self.index), lambda index: None)
+
+    def set_state(self, state):
+        self.state = state
+        self.changed.emit()
+
+    def stats_text(self):
+        if self.root is None:
+            return "No folder is indexed."
+        lines = [f"Folder: {self.root}", f"State: {self.state}"]
+        if self.state == "Building":
+            lines.append(f"Files indexed so far: {self.indexed:,}")
+        if self.index is None:
+            return "\n".join(lines)
+        stats = self.index.stats()
+        try:
+            disk = os.path.getsize(self.index.disk_path()) / 1048576
+            lines.append(f"Size on disk: {disk:.1f} MB")
+        except OSError:
+            lines.append("Size on disk: not saved yet")
+        lines += [
+            f"Files: {stats['files']:,} ({stats['dead']:,} superseded entries)",
+            f"Trigrams: {stats['trigrams']:,} in {stats['segments']} "
+            f"segment{'' if stats['segments'] == 1 else 's'}, "
+            f"{stats['postings_bytes'] / 1048576:.1f} MB of postings",
+            f"Watched folders: {len(self.tree.watcher.directories()):,}",
+            f"Build time: {stats['build_seconds']:.1f} s",
+            f"Last update: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stats['updated_at']))}",
+        ]
+        if stats['last_query'] is not None:
+            lookup, candidates, total, elapsed = stats['last_query']
+            lines.append(f"Last query: {lookup * 1000:.1f} ms index lookup, "
+                         f"{candidates:,} of {total:,} files searched, "
+                         f"{elapsed * 1000:.0f} ms in all")
+        return "\n".join(lines)
@@ -0,0 +1,230 @@
+import os
+from itertools import chain
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QThreadPool, QTimer, pyqtSignal
+
+from .excludes import (MAX_SEARCH_FILE_BYTES, compile_excludes, is_excluded_entry,
+                       read_ignore_file, walk_files)
+from .workers import Worker, start_worker
+
+# Quiet time after a change notification before the directories are
+# listed again, in ms
+TREE_UPDATE_DELAY = 500
+# Most directories watched for changes; the platform limits watches
+MAX_WATCHED_DIRECTORIES = 8192
+
+
+def tree_excludes(root, excludes):
+    return compile_excludes(list(excludes) + read_ignore_file(root))
+
+
+def root_prefix(root):
+    # What the paths under root start with; root may end in a separator
+    # already, as / and D:\ do
+    return os.path.join(root, '')
+
+
+def relative_path(prefix, path):
+    return path[len(prefix):].replace(os.sep, '/')
+
+
+def list_tree(job, root, excludes):
+    # ({relative path: size} of every file under root, relative paths of
+    # its directories). Reports the number of files listed so far.
+    names, paths = tree_excludes(root, excludes)
+    prefix = root_prefix(root)
+    directories = []
+    files = {}
+    for count, (path, size) in enumerate(walk_files(root, names, paths, directories), 1):
+        files[relative_path(prefix, path)] = size
+        if not count % 1000:
+            job.check()
+            job.report(count)
+    return files, set(directories)
+
+
+def rescan_tree(job, root, files, directories, changed, excludes):
+    # What list_tree returns, after the direct entries of each changed
+    # directory are listed again; new subdirectories are walked in full and
+    # vanished ones dropped with everything below them. Also returns what
+    # changed, as relative paths: the files listed again, which may have been
+    # edited, the files gone, and the new and the vanished directories.
+    names, paths = tree_excludes(root, excludes)
+    root_path = root_prefix(root)
+    files = dict(files)
+    directories = set(directories)
+    changed = {relative_path(root_path, path): path for path in changed}
+    # Known files and subdirectories of the changed directories
+    children = {relative: set() for relative in changed if relative in directories}
+    for path in chain(files, directories):
+        siblings = children.get(path.rpartition('/')[0]) if path else None
+        if siblings is not None:
+            siblings.add(path)
+
+    listed = []
+    removed = set()
+    new_directories = []
+    gone = set()
+    for relative, known in children.items():
+        job.check()
+        prefix = relative + '/' if relative else ''
+        present = set()
+        try:
+            entries = list(os.scandir(changed[relative]))
+        except OSError:
+            entries = []
+        for entry in entries:
+            entry_path = prefix + entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if is_excluded_entry(entry.name, entry_path, is_dir, names, paths):
+                    continue
+                if is_dir:
+                    present.add(entry_path)
+                    if entry_path not in directories:
+                        for path, size in walk_files(root, names, paths, new_directories,
+                                                     entry_path):
+                            path = relative_path(root_path, path)
+                            files[path] = size
+                            listed.append(path)
+                elif entry.is_file():
+                    size = entry.stat().st_size
+                    if size <= MAX_SEARCH_FILE_BYTES:
+                        present.add(entry_path)
+                        files[entry_path] = size
+                        listed.append(entry_path)
+            except OSError:
+                continue
+        for path in known - present:
+            if path in directories:
+                gone.add(path)
+            else:
+                removed.add(path)
+
+    directories.update(new_directories)
+    gone_directories = []
+    if gone:
+        gone_prefixes = tuple(path + '/' for path in gone)
+        gone_directories = [path for path in directories
+                            if path in gone or path.startswith(gone_prefixes)]
+        directories.difference_update(gone_directories)
+        removed.update(path for path in files if path.startswith(gone_prefixes))
+    for path in removed:
+        del files[path]
+    return files, directories, listed, sorted(removed), new_directories, gone_directories
+
+
+class ProjectTree(QObject):
+    # Every file and directory under the project folder, listed in the
+    # background and kept current from directory change notifications. Quick
+    # open and the trigram index both follow it, so the folder is only walked
+    # and watched once.
+
+    # The whole listing was replaced: opened, listed or closed
+    listed = pyqtSignal()
+    # An update: relative paths of the files listed again and of those gone
+    changed = pyqtSignal(list, list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = None
+        self.excludes = ()
+        # Replaced, never changed in place, so a worker can go on reading the
+        # ones it was handed while the next update runs
+        self.files = {}
+        self.directories = set()
+        self.listing = False
+        self.job = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.directory_changed)
+        self.dirty = set()
+        self.update_timer = QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(TREE_UPDATE_DELAY)
+        self.update_timer.timeout.connect(self.start_update)
+
+    def open(self, root, excludes):
+        self.close()
+        self.root = os.path.abspath(root)
+        self.excludes = tuple(excludes)
+        self.listing = True
+        self.run(Worker(list_tree, self.root, self.excludes), self.tree_listed)
+        self.listed.emit()
+
+    def close(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+        self.update_timer.stop()
+        watched = self.watcher.directories()
+        if watched:
+            self.watcher.removePaths(watched)
+        self.dirty.clear()
+        self.root = None
+        self.files = {}
+        self.directories = set()
+        self.listing = False
+        self.listed.emit()
+
+    def run(self, job, finished):
+        job.signals.finished.connect(lambda result, job=job: self.job_finished(job, finished, result))
+        job.signals.failed.connect(lambda message, job=job: self.job_failed(job))
+        self.job = start_worker(job, self.pool)
+
+    def job_finished(self, job, finished, result):
+        if job is not self.job:
+            return
+        self.job = None
+        finished(result)
+        if self.dirty:
+            self.update_timer.start()
+
+    def job_failed(self, job):
+        if job is self.job:
+            self.job = None
+            if self.listing:
+                self.listing = False
+                self.listed.emit()
+
+    def tree_listed(self, result):
+        self.files, self.directories = result
+        self.listing = False
+        self.watch(sorted(self.directories))
+        self.listed.emit()
+
+    def watch(self, directories):
+        room = MAX_WATCHED_DIRECTORIES - len(self.watcher.directories())
+        paths = [os.path.join(self.root, path) for path in directories[:max(room, 0)]]
+        if paths:
+            self.watcher.addPaths(paths)
+
+    def directory_changed(self, path):
+        self.dirty.add(path)
+        if self.job is None:
+            self.update_timer.start()
+
+    def file_saved(self, path):
+        # Saves from the editor are picked up without waiting on the watcher,
+        # which may have run out of watches
+        path = os.path.abspath(path)
+        if self.root is not None and path.startswith(root_prefix(self.root)):
+            self.directory_changed(os.path.dirname(path))
+
+    def start_update(self):
+        if self.root is None or self.job is not None or not self.dirty:
+            return
+        directories = sorted(self.dirty)
+        self.dirty.clear()
+        job = Worker(rescan_tree, self.root, self.files, self.directories, directories,
+                     self.excludes)
+        self.run(job, self.updated)
+
+    def updated(self, result):
+        self.files, self.directories, listed, removed, new_directories, gone_directories = result
+        if gone_directories:
+            self.watcher.removePaths([os.path.join(self.root, path) for path in gone_directories])
+        self.watch(new_directories)
+        if listed or removed:
+            self.changed.emit(listed, removed)
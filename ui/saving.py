@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+
+def _read_umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Permissions a new file gets from open(); read once at import, since the
+# umask can only be read by setting it, which would race with other threads
+NEW_FILE_MODE = 0o666 & ~_read_umask()
+
+
+def write_atomic(job, path, text):
+    # Write text next to path under a temporary name, flush it to disk and
+    # rename it over path, so a crash leaves either the old file or the new
+    # one and never a truncated mix. A symlink is saved through: the file it
+    # points to is replaced and the link stays. Returns path made absolute.
+    path = os.path.abspath(path)
+    target = os.path.realpath(path)
+    directory, name = os.path.split(target)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # Keep the permissions of the file being replaced; a new file gets
+        # the usual ones rather than mkstemp's 0600
+        try:
+            mode = os.stat(target).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = NEW_FILE_MODE
+        os.chmod(temp_path, mode)
+        job.check()
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    # Make the rename itself durable where directories can be synced
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return path
@@ -0,0 +1,200 @@
+import re
+from array import array
+from bisect import bisect_left
+
+# Worker cancellation is checked once per this many matches
+CHECK_INTERVAL = 10000
+# The text is searched this many characters at a time, rounded up to a line
+# end; the regex engine holds the GIL for the whole of each finditer step
+FIND_CHUNK_CHARS = 1 << 18
+
+# Characters outside the BMP take two positions in a QTextDocument but one
+# in a Python str
+_ASTRAL = re.compile('[\U00010000-\U0010FFFF]')
+
+
+def compile_query(text, case_sensitive=False, whole_word=False, regex=False):
+    # Raises re.error for an invalid regular expression
+    source = text if regex else re.escape(text)
+    if whole_word:
+        source = rf"(?<!\w)(?:{source})(?!\w)"
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    return re.compile(source, flags)
+
+
+def has_astral(text):
+    return not text.isascii() and _ASTRAL.search(text) is not None
+
+
+def str_index(text, position):
+    # Index in text of a document position, which counts each character
+    # outside the BMP twice
+    index = position
+    for match in _ASTRAL.finditer(text):
+        if match.start() >= index:
+            break
+        index -= 1
+    return index
+
+
+def overlaps_itself(literal, case_sensitive=False):
+    # Whether two matches of literal can overlap, i.e. some proper prefix of
+    # it is also a suffix; finditer then skips the later of the two
+    chars = list(literal) if case_sensitive else [c.casefold() for c in literal]
+    return any(chars[:k] == chars[-k:] for k in range(1, len(chars)))
+
+
+class MatchList:
+    # Sorted match positions and lengths. An edit moves every later match,
+    # so instead of rewriting them all the move is kept pending: entries from
+    # index shift_from on are stored shift too low. The next edit only
+    # settles the entries between the two edit points.
+    def __init__(self, starts=None, lengths=None):
+        self.starts = starts if starts is not None else array('q')
+        self.lengths = lengths if lengths is not None else array('q')
+        self.shift_from = len(self.starts)
+        self.shift = 0
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        shift_from = self.shift_from
+        for index, start in enumerate(self.starts):
+            yield start + self.shift if index >= shift_from else start
+
+    def copy(self):
+        matches = MatchList(array('q', self.starts), array('q', self.lengths))
+        matches.shift_from = self.shift_from
+        matches.shift = self.shift
+        return matches
+
+    def start(self, index):
+        start = self.starts[index]
+        return start + self.shift if index >= self.shift_from else start
+
+    def length(self, index):
+        return self.lengths[index]
+
+    def bisect(self, position):
+        # Index of the first match starting at or after position
+        index = bisect_left(self.starts, position, 0, self.shift_from)
+        if index < self.shift_from:
+            return index
+        return bisect_left(self.starts, position - self.shift, self.shift_from)
+
+    def replace(self, start, old_end, starts, lengths, delta):
+        # Swap the matches that started in [start, old_end) before an edit
+        # for those found in the edited text, and move the later ones by delta
+        i = self.bisect(start)
+        j = self.bisect(old_end)
+        # Settle entries so that exactly those from j on carry the shift
+        stored = self.starts
+        if not self.shift:
+            pass
+        elif self.shift_from < j:
+            for index in range(self.shift_from, j):
+                stored[index] += self.shift
+        else:
+            for index in range(j, self.shift_from):
+                stored[index] -= self.shift
+        stored[i:j] = starts
+        self.lengths[i:j] = lengths
+        self.shift_from = i + len(starts)
+        self.shift += delta
+        return i, j
+
+
+def find_matches(job, text, pattern, base=0):
+    # All matches of pattern in text as a MatchList of document positions,
+    # offset by base. Matches are kept within a line and empty matches are
+    # dropped, so the results can be updated line by line.
+    starts = array('q')
+    lengths = array('q')
+    astral = has_astral(text)
+    # Astral characters before the end of the previous match
+    extra = 0
+    last = 0
+    count = 0
+    pos = 0
+    size = len(text)
+    while pos < size:
+        if job is not None:
+            job.check()
+        chunk_end = text.find('\n', pos + FIND_CHUNK_CHARS)
+        chunk_end = size if chunk_end == -1 else chunk_end + 1
+        for match in pattern.finditer(text, pos, chunk_end):
+            count += 1
+            if job is not None and not count % CHECK_INTERVAL:
+                job.check()
+            start, end = match.span()
+            if start == end or text.find('\n', start, end) != -1:
+                continue
+            length = end - start
+            if astral:
+                extra += len(_ASTRAL.findall(text, last, start))
+                inner = len(_ASTRAL.findall(text, start, end))
+                start += extra
+                length += inner
+                extra += inner
+                last = end
+            starts.append(base + start)
+            lengths.append(length)
+        pos = chunk_end
+    return MatchList(starts, lengths)
+
+
+def narrow_matches(job, text, pattern, candidates):
+    # Matches of pattern among the starts of candidates, for a query that
+    # extends the one that found them. Only the same as find_matches when
+    # neither query overlaps itself: otherwise the shorter query skipped
+    # starts the longer one matches at, or the longer one would skip some of
+    # the candidates. text must not contain astral characters, so that
+    # positions and str indices agree.
+    starts = array('q')
+    lengths = array('q')
+    match_at = pattern.match
+    for count, start in enumerate(candidates):
+        if job is not None and not count % CHECK_INTERVAL:
+            job.check()
+        match = match_at(text, start)
+        if match is not None:
+            end = match.end()
+            if end > start and text.find('\n', start, end) == -1:
+                starts.append(start)
+                lengths.append(end - start)
+    return MatchList(starts, lengths)
+
+
+def replace_matches(job, text, pattern, replacement, regex=False):
+    # Rewrite every match in one pass. Returns (count, start, end, middle):
+    # the document positions of the first match start and the last match
+    # end, and the text that replaces that range, so the edit only covers
+    # what actually changed. Matches are the same ones find_matches reports.
+    count = 0
+    first = last = -1
+
+    def substitute(match):
+        nonlocal count, first, last
+        start, end = match.span()
+        if start == end or text.find('\n', start, end) != -1:
+            return match.group()
+        count += 1
+        if job is not None and not count % CHECK_INTERVAL:
+            job.check()
+        if first < 0:
+            first = start
+        last = end
+        return match.expand(replacement) if regex else replacement
+
+    rewritten = pattern.sub(substitute, text)
+    if not count:
+        return 0, 0, 0, ''
+    middle = rewritten[first:len(rewritten) - (len(text) - last)]
+    start, end = first, last
+    if has_astral(text):
+        start += len(_ASTRAL.findall(text, 0, first))
+        end = start + (last - first) + len(_ASTRAL.findall(text, first, last))
+    return count, start, end, middle
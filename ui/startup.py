@@ -0,0 +1,28 @@
+import sys
+import time
+
+# Command line flag that prints how long each startup phase took
+PROFILE_FLAG = "--profile-startup"
+
+
+class StartupProfile:
+    # Wall time of each startup phase, from when the profile was created to
+    # the first pass of the event loop after the window is shown
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self, out=None):
+        # Each phase with the time since startup at its end
+        out = out or sys.stderr
+        width = max((len(phase) for phase, _ in self.phases), default=0)
+        total = 0
+        for phase, elapsed in self.phases:
+            total += elapsed
+            print(f"{phase:<{width}}  {elapsed * 1000:7.1f} ms  {total * 1000:7.1f} ms", file=out)
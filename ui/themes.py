@@ -0,0 +1,206 @@
+from string import Template
+
+from PyQt5.QtGui import QColor, QPalette, QTextCharFormat
+
+from .syntax import KEYWORD, STRING, COMMENT, NUMBER, FUNCTION, CLASS, BUILTIN
+
+# Colors of the editor, its gutter and the large file viewer
+DARK_EDITOR = {
+    'background': '#1E1E1E',
+    'text': '#D4D4D4',
+    'selection': '#264F78',
+    'selected_text': '#FFFFFF',
+    'current_line': '#2A2D2E',
+    'line_number': '#858585',
+    'button': '#424242',
+}
+
+# Token colors, bright for better visibility on the dark editor
+DARK_SYNTAX = {
+    KEYWORD: '#569CD6',
+    STRING: '#CE9178',
+    COMMENT: '#6A9955',
+    NUMBER: '#B5CEA8',
+    # Only used for tokens coming from Pygments
+    FUNCTION: '#DCDCAA',
+    CLASS: '#4EC9B0',
+    BUILTIN: '#4FC1FF',
+}
+
+# Every theme as data: colors for the editors, their tokens, and the rest
+# of the window or None to leave it to the platform style. Light keeps the
+# dark editor it always had.
+THEMES = {
+    'Light': {
+        'editor': DARK_EDITOR,
+        'syntax': DARK_SYNTAX,
+        'window': None,
+    },
+    'Dark': {
+        'editor': DARK_EDITOR,
+        'syntax': DARK_SYNTAX,
+        'window': {
+            'background': '#1E1E1E',
+            'text': '#D4D4D4',
+            'panel': '#252526',
+            'selected': '#2D2D2D',
+            'border': '#333333',
+            'handle': '#424242',
+            'handle_hover': '#4F4F4F',
+        },
+    },
+}
+DEFAULT_THEME = 'Light'
+
+# Palette roles each editor color sets. Qt hands the palette down to the
+# scroll bars and other children of the editor.
+EDITOR_ROLES = {
+    'background': (QPalette.Base, QPalette.Window),
+    'text': (QPalette.Text, QPalette.WindowText, QPalette.ButtonText),
+    'selection': (QPalette.Highlight,),
+    'selected_text': (QPalette.HighlightedText,),
+    'current_line': (QPalette.AlternateBase,),
+    'line_number': (QPalette.PlaceholderText,),
+    'button': (QPalette.Button,),
+}
+
+# Stylesheet for the main window when a theme has window colors
+WINDOW_STYLE = Template("""
+QMainWindow, QWidget {
+    background-color: $background;
+    color: $text;
+}
+QTabWidget::pane {
+    border: 1px solid $border;
+    background-color: $background;
+}
+QTabBar::tab {
+    background-color: $panel;
+    color: $text;
+    padding: 8px 12px;
+    border: 1px solid $border;
+}
+QTabBar::tab:selected {
+    background-color: $selected;
+}
+QTreeView {
+    background-color: $background;
+    color: $text;
+    border: 1px solid $border;
+}
+QTreeView::item:selected {
+    background-color: $selected;
+}
+QStatusBar {
+    background-color: $background;
+    color: $text;
+}
+QToolBar {
+    background-color: $background;
+    border: none;
+}
+QMenuBar {
+    background-color: $background;
+    color: $text;
+}
+QMenuBar::item:selected {
+    background-color: $selected;
+}
+QMenu {
+    background-color: $background;
+    color: $text;
+}
+QMenu::item:selected {
+    background-color: $selected;
+}
+QPushButton {
+    background-color: $panel;
+    color: $text;
+    border: 1px solid $border;
+    padding: 5px;
+}
+QPushButton:hover {
+    background-color: $selected;
+}
+QLineEdit {
+    background-color: $panel;
+    color: $text;
+    border: 1px solid $border;
+    padding: 5px;
+}
+QScrollBar:vertical {
+    background-color: $background;
+    width: 14px;
+    margin: 0px;
+}
+QScrollBar::handle:vertical {
+    background-color: $handle;
+    min-height: 20px;
+    border-radius: 7px;
+}
+QScrollBar::handle:vertical:hover {
+    background-color: $handle_hover;
+}
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+    height: 0px;
+}
+QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
+    background: none;
+}
+QSplitter::handle {
+    background-color: $border;
+}
+QSplitter::handle:horizontal {
+    width: 2px;
+}
+QSplitter::handle:vertical {
+    height: 2px;
+}
+""")
+
+_palettes = {}
+_stylesheets = {}
+_formats = {}
+
+
+def theme_palette(name, base):
+    # Palette for the editor widgets of a theme, on top of the application
+    # palette base; built once per theme
+    try:
+        return _palettes[name]
+    except KeyError:
+        palette = QPalette(base)
+        for key, color in THEMES[name]['editor'].items():
+            for role in EDITOR_ROLES[key]:
+                palette.setColor(role, QColor(color))
+        _palettes[name] = palette
+        return palette
+
+
+def theme_stylesheet(name):
+    # Main window stylesheet of a theme, built once per theme
+    try:
+        return _stylesheets[name]
+    except KeyError:
+        window = THEMES[name]['window']
+        stylesheet = WINDOW_STYLE.substitute(window) if window is not None else ""
+        _stylesheets[name] = stylesheet
+        return stylesheet
+
+
+def theme_formats(name):
+    # Format of each token kind, built once per set of token colors and
+    # shared by every highlighter; themes with the same colors share one
+    # table, so switching between them leaves the highlighting alone.
+    # Treat the formats as read-only.
+    syntax = THEMES[name]['syntax']
+    key = tuple(sorted(syntax.items()))
+    try:
+        return _formats[key]
+    except KeyError:
+        formats = {}
+        for kind, color in syntax.items():
+            formats[kind] = QTextCharFormat()
+            formats[kind].setForeground(QColor(color))
+        _formats[key] = formats
+        return formats